@@ -13,12 +13,12 @@ from views.reports import (
     menu_view, abc_view, simulator_view,
     weekday_view, procurement_view
 )
-from services import data_loader, analytics_service, category_service
+from services import data_loader, analytics_service, dataset_store, period_summary_service
 import auth
 import ui
 from utils import session_manager
 from use_cases import auth_flow, bootstrap, report_flow
-from views import admin_view, login_view
+from views import admin_view, login_view, sync_view
 from datetime import datetime
 import time
 
@@ -31,7 +31,7 @@ st.set_page_config(page_title="RestoAnalytics: Место", layout="wide", initi
 FORCE_HTTPS = os.getenv("FORCE_HTTPS", "False").lower() == "true"
 TRUST_PROXY = os.getenv("TRUST_PROXY", "False").lower() == "true"
 
-# Health Check (Basic load-balancer heartbeat)
+# Health Check (legacy heartbeat; probes should use health_server.py, which skips app bootstrap)
 if st.query_params.get("health") == "1":
     st.write({"status": "ok", "version": "1.0", "uptime": datetime.utcnow().isoformat()})
     st.stop()
@@ -197,60 +197,43 @@ with st.sidebar:
             if not yd_token:
                 st.error("Нет токена Yandex Disk!")
             else:
-                if st.button("🔄 Скачать и Обновить", type="primary", use_container_width=True):
-                    from use_cases import rbac_policy
-                    if not rbac_policy.enforce(st.session_state.auth_user, "SYNC_DATA"):
-                        st.error("Недостаточно прав для выполнения синхронизации.")
-                    else:
-                        ui.show_loading_overlay("Связываюсь с облаком...")
-                        success, msg = data_loader.download_and_process_yandex(yd_token, st.session_state.yandex_path)
-                        if success:
-                            st.success("Данные обновлены!")
-                            st.session_state.dropped_stats = data_loader.get_last_sync_meta().get(
-                                "dropped_stats",
-                                {"count": 0, "cost": 0.0, "items": []},
-                            )
-                            st.session_state.data_version = st.session_state.get('data_version', 1) + 1
-                            st.session_state.df_full = None
-                            st.rerun()
-                        else:
-                            st.error(msg)
+                sync_view.render_sync_controls(yd_token, st.session_state.yandex_path)
         elif source_type == "📂 Локальная папка":
             if st.button("🔄 Загрузить из кэша"):
                  st.session_state.data_version = st.session_state.get('data_version', 1) + 1
                  st.session_state.df_full = None
+                 st.session_state.dish_index = None
+                 st.session_state.price_index = None
                  st.rerun()
 
     # --- AUTO-LOAD ---
+    sync_view.apply_completed_sync()
     if st.session_state.df_full is None:
-        if os.path.exists(data_loader.CACHE_FILE):
+        # Published versions are immutable: reading never races a running sync
+        dataset = dataset_store.resolve()
+        if dataset is not None and os.path.exists(dataset.path):
              try:
-                 meta_ok = False
-                 if os.path.exists(data_loader.SCHEMA_META_FILE):
-                     try:
-                         import json
-                         with open(data_loader.SCHEMA_META_FILE, "r", encoding="utf-8") as f:
-                             meta = json.load(f)
-                         meta_ok = meta.get("schema_version") == data_loader.SCHEMA_VERSION
-                     except Exception:
-                         meta_ok = False
-                 if not meta_ok:
+                 if dataset.schema_version != data_loader.SCHEMA_VERSION:
                      st.warning("Кэш устарел. Нажмите «Скачать и обновить».")
                  else:
                      with st.spinner("Загрузка и подготовка данных..."):
                          if True:
-                             df = pd.read_parquet(data_loader.CACHE_FILE)
-                             # Always re-apply categories from current mapping,
-                             # so category edits survive app/server restarts.
-                             df = category_service.apply_categories(df)
-                             st.session_state.df_full = df
+                             # Categorized frame and indexes are shared by all sessions of this process
+                             prepared = data_loader.load_prepared(dataset)
+                             st.session_state.df_full = prepared.df
+                             st.session_state.loaded_dataset = dataset.version
+                             st.session_state.dataset_key = prepared.key
+                             st.session_state.dish_index = prepared.dish_index
+                             st.session_state.price_index = prepared.price_index
              except Exception as e:
                  st.error(f"Ошибка чтения кэша: {e}")
     
     # --- FILTERS ---
     if st.session_state.df_full is not None:
         with st.expander("🗓️ Фильтры периода", expanded=False):
-            df_full = st.session_state.df_full.copy()
+            # Shared read-only frame: filters below build new frames, never modify it
+            df_full = st.session_state.df_full
+            active_venue = None
             
             # 1. Venue Filter
             venue_col = "Точка" if "Точка" in df_full.columns else ("Venue" if "Venue" in df_full.columns else None)
@@ -259,9 +242,13 @@ with st.sidebar:
                 selected_venue = st.selectbox("📍 Точка:", ["Все"] + venues, index=0)
                 if selected_venue != "Все":
                     df_full = df_full[df_full[venue_col].astype(str) == selected_venue]
+                    active_venue = selected_venue
             else:
                 st.info("Колонка заведения не найдена, фильтр по точкам отключен.")
                 
+            # The shared frame lives long and ids get reused, so cache by content identity instead of id()
+            frame_key = (st.session_state.get('dataset_key'), st.session_state.get('data_version', 1), active_venue)
+
             # 2. Date Filter
             min_date = df_full['Дата_Отчета'].min().date()
             max_date = df_full['Дата_Отчета'].max().date()
@@ -279,7 +266,7 @@ with st.sidebar:
                 if period_mode == "📌 Последний загруженный день":
                     report_context = _cached_build_report_context(
                         df_full,
-                        id(df_full),
+                        frame_key,
                         period_mode,
                         None,
                         "",
@@ -289,8 +276,7 @@ with st.sidebar:
                     )
 
                 elif period_mode == "📅 Месяц (Сравнение)":
-                     df_full['YearMonth'] = df_full['Дата_Отчета'].dt.to_period('M')
-                     available_ym = sorted(df_full['YearMonth'].unique(), reverse=True)
+                     available_ym = sorted(df_full['Дата_Отчета'].dt.to_period('M').unique(), reverse=True)
                      
                      if not available_ym:
                          st.warning("Нет данных")
@@ -310,7 +296,7 @@ with st.sidebar:
                          compare_mode = st.selectbox("Сравнить с:", ["Предыдущий месяц", "Год назад", "Нет"], index=1)
                          report_context = _cached_build_report_context(
                             df_full,
-                            id(df_full),
+                            frame_key,
                             period_mode,
                             selected_ym,
                             scope_mode,
@@ -323,7 +309,7 @@ with st.sidebar:
                     d_range = st.date_input("Диапазон:", value=(min_date, max_date), min_value=min_date, max_value=max_date)
                     report_context = _cached_build_report_context(
                         df_full,
-                        id(df_full),
+                        frame_key,
                         period_mode,
                         None,
                         "",
@@ -338,10 +324,6 @@ with st.sidebar:
                 current_label = report_context.current_label
                 prev_label = report_context.prev_label
         
-        # --- RENDER EXPORT SIDEBAR ---
-        if selected_period is not None:
-            export_view.render_sidebar_export(df_current, df_full, tg_token, tg_chat, pd.to_datetime(selected_period.end))
-
         # --- BUILD CACHE KEY SIGNATURE ---
         from utils.signature import build_selection_signature
         
@@ -354,6 +336,13 @@ with st.sidebar:
         )
         if os.environ.get("DEBUG_TIMINGS") == "1":
             print(f"[DEBUG] prev_mode/venue cached signature: {selection_signature}")
+
+        # --- RENDER EXPORT SIDEBAR ---
+        if selected_period is not None:
+            export_view.render_sidebar_export(
+                df_current, df_full, tg_token, tg_chat, pd.to_datetime(selected_period.end), selection_signature,
+                venue=active_venue,
+            )
         
         st.divider()
         
@@ -372,17 +361,18 @@ with st.sidebar:
 # --- ТЕЛО ОТЧЕТА ---
 
 if not df_current.empty:
-    kpi_view.render_kpi(df_current, df_prev, current_label)
+    dataset_version = st.session_state.get('loaded_dataset')
+    cur_summary = period_summary_service.period_summary(df_current, dataset_version, active_venue)
+    prev_summary = period_summary_service.period_summary(df_prev, dataset_version, active_venue)
+    kpi_view.render_kpi(cur_summary, prev_summary, current_label)
     
     # --- SMART INSIGHTS ---
-    cur_rev = df_current['Выручка с НДС'].sum()
-    prev_rev = df_prev['Выручка с НДС'].sum() if not df_prev.empty else 0
-    cur_cost = df_current['Себестоимость'].sum()
-    cur_fc = (cur_cost / cur_rev * 100) if cur_rev else 0
-    
     with st.expander("💡 Smart Insights", expanded=True):
         if True:
-            insights = _cached_calculate_insights(df_current, df_prev, id(df_current), cur_rev, prev_rev, cur_fc)
+            insights = _cached_calculate_insights(
+                df_current, df_prev, id(df_current),
+                cur_summary.revenue, prev_summary.revenue, cur_summary.food_cost_pct,
+            )
         for i in insights:
             if i.level == 'error': st.error(i.message)
             elif i.level == 'warning': st.warning(i.message)
@@ -425,13 +415,13 @@ if not df_current.empty:
                 with st.expander("🔬 Расширенные разделы", expanded=False):
                     adv_tab = st.radio("Дополнительно", ["📉 Динамика"], horizontal=True, label_visibility="collapsed")
                     if adv_tab == "📉 Динамика":
-                        menu_view.render_dynamics(_df_f, _df_curr)
+                        menu_view.render_dynamics(_df_f, _df_curr, venue=active_venue)
             elif route == report_flow.ReportRoute.INFLATION and _sel_p:
-                inflation_view.render_inflation(_df_f, _df_curr, _sel_p.end, _sel_p.inflation_start, _sig)
+                inflation_view.render_inflation(_df_f, _df_curr, _sel_p.end, _sel_p.inflation_start, _sig, venue=active_venue)
             elif route == report_flow.ReportRoute.ABC:
-                abc_view.render_abc(_df_curr, _sig)
+                abc_view.render_abc(_df_curr, _sig, _df_f)
             elif route == report_flow.ReportRoute.SIMULATOR:
-                simulator_view.render_simulator(_df_curr, _df_f)
+                simulator_view.render_simulator(_df_curr, _df_f, _sig)
             elif route == report_flow.ReportRoute.WEEKDAYS:
                 weekday_view.render_weekdays(_df_curr, _df_p, _cur_l, _prev_l)
             elif route == report_flow.ReportRoute.PROCUREMENT and _sel_p:
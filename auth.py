@@ -1,6 +1,8 @@
 from infrastructure.repositories.sqlite_user_repository import SQLiteUserRepository
 from infrastructure.repositories.sqlite_audit_repository import SQLiteAuditRepository, AuditAction
+from infrastructure.repositories.sqlite_connection import get_connection_manager
 from infrastructure.storage.yandex_disk_storage import YandexDiskStorage
+from infrastructure.password_hashing import HashCapacityError, get_hash_executor
 import hashlib
 import hmac
 import secrets
@@ -9,6 +11,10 @@ import streamlit as st
 from datetime import datetime, timedelta
 import base64
 import logging
+from utils.file_lock import FileLock
+from utils.periodic import PeriodicTask
+from utils.ttl_cache import TTLCache
+from utils.version_file import VersionFile
 
 log = logging.getLogger(__name__)
 
@@ -18,10 +24,29 @@ class UserAlreadyExistsError(Exception):
 class InvalidCredentialsError(Exception):
     pass
 
+class AuthBusyError(InvalidCredentialsError):
+    """Password hashing pool is saturated; the user should retry shortly."""
+    pass
+
+BUSY_MESSAGE = "⚠️ Сервер занят. Повторите попытку через несколько секунд."
+
 USERS_DB = "users.db"
 YANDEX_USERS_PATH = "RestoAnalytic/config/users.db"
 PASSWORD_ITERATIONS = 200_000
 SESSION_TTL_HOURS = int(os.getenv("SESSION_TTL_HOURS", 12))
+USER_CACHE_TTL_SEC = int(os.getenv("USER_CACHE_TTL_SEC", 30))
+SESSION_LAST_SEEN_INTERVAL_SEC = int(os.getenv("SESSION_LAST_SEEN_INTERVAL_SEC", 60))
+SESSION_STORE_MAX = int(os.getenv("SESSION_STORE_MAX", 10000))
+SESSION_SWEEP_INTERVAL_SEC = int(os.getenv("SESSION_SWEEP_INTERVAL_SEC", 900))
+# Logins with this many recent failures are shed first while the hashing pool is saturated
+LOGIN_SHED_ATTEMPTS = int(os.getenv("LOGIN_SHED_ATTEMPTS", 2))
+AUDIT_ASYNC = os.getenv("AUDIT_ASYNC", "true").lower() == "true"
+# Bumped next to users.db on logout / user changes so other replicas drop their caches
+AUTH_EPOCH_SUFFIX = ".epoch"
+# Only the designated process pulls users.db from the cloud (replicas set USERS_DB_PULL=false)
+USERS_DB_PULL = os.getenv("USERS_DB_PULL", "true").lower() == "true"
+# Held across processes while users.db is being replaced
+USERS_DB_PULL_LOCK_SUFFIX = ".pull.lock"
 
 def _mask_identifier(identifier: str) -> str:
     if not identifier: return "***"
@@ -41,16 +66,48 @@ _user_repo = None
 _storage_provider = None
 _audit_repo = None
 
+# Per-process caches for the per-rerun auth checks (user row by id, token -> (user_id, expires_at)).
+_user_cache = TTLCache(USER_CACHE_TTL_SEC)
+# The session store is bounded (LRU) and entries never outlive the session itself.
+_session_cache = TTLCache(USER_CACHE_TTL_SEC, maxsize=SESSION_STORE_MAX)
+# Tokens whose last_seen_at was written recently; entries expire after the coalescing interval.
+_last_seen_writes = TTLCache(SESSION_LAST_SEEN_INTERVAL_SEC, maxsize=SESSION_STORE_MAX)
+_last_sweep = {"at": None, "deleted": 0}
+_auth_epoch = None
+
+def invalidate_auth_caches():
+    """Drop cached users/sessions (users.db replaced or switched)."""
+    _user_cache.clear()
+    _session_cache.clear()
+    _last_seen_writes.clear()
+
+def _get_auth_epoch() -> VersionFile:
+    global _auth_epoch
+    if _auth_epoch is None or _auth_epoch.path != USERS_DB + AUTH_EPOCH_SUFFIX:
+        _auth_epoch = VersionFile(USERS_DB + AUTH_EPOCH_SUFFIX)
+    return _auth_epoch
+
+def _sync_auth_epoch():
+    # Another process sharing users.db logged someone out or changed a user
+    if _get_auth_epoch().changed():
+        invalidate_auth_caches()
+
+def _bump_auth_epoch():
+    _get_auth_epoch().bump()
+
 def get_user_repo() -> SQLiteUserRepository:
     global _user_repo
     if _user_repo is None or _user_repo.db_path != USERS_DB:
         _user_repo = SQLiteUserRepository(USERS_DB)
+        invalidate_auth_caches()
     return _user_repo
 
 def get_audit_repo() -> SQLiteAuditRepository:
     global _audit_repo
     if _audit_repo is None or _audit_repo.db_path != USERS_DB:
-        _audit_repo = SQLiteAuditRepository(USERS_DB)
+        if _audit_repo is not None:
+            _audit_repo.close()
+        _audit_repo = SQLiteAuditRepository(USERS_DB, async_writes=AUDIT_ASYNC)
     return _audit_repo
 
 def get_storage_provider() -> YandexDiskStorage:
@@ -60,7 +117,58 @@ def get_storage_provider() -> YandexDiskStorage:
     return _storage_provider
 
 def sync_users_from_yandex(token, remote_path=YANDEX_USERS_PATH, force=False):
-    return get_storage_provider().download_file(remote_path, USERS_DB, token, force=force)
+    if not USERS_DB_PULL:
+        return os.path.exists(USERS_DB)
+    with FileLock(USERS_DB + USERS_DB_PULL_LOCK_SUFFIX) as lock:
+        if not lock.acquired:
+            log.info("⏭ users.db is being pulled by another process")
+            return os.path.exists(USERS_DB)
+        if not force:
+            return get_storage_provider().download_file(
+                remote_path, USERS_DB, token, force=False, replace=_restore_users_db
+            )
+        if _pull_users_db(token, remote_path) != "unknown":
+            return True
+        # Sessions, last-seen and audit rows written since the last push would be lost
+        if get_storage_provider().has_newer_local_changes(USERS_DB):
+            log.warning("⚠️ users.db has unpushed local writes, keeping it")
+            return True
+        # No remote metadata (missing file or API hiccup): fall back to a plain download
+        downloaded = get_storage_provider().download_file(
+            remote_path, USERS_DB, token, force=True, replace=_restore_users_db
+        )
+        if downloaded:
+            invalidate_auth_caches()
+            _bump_auth_epoch()
+        return downloaded
+
+def _restore_users_db(downloaded_path, users_db_path):
+    # In place under SQLite's locks: other threads and replicas keep their connections
+    get_connection_manager(users_db_path).restore_from(downloaded_path)
+
+def refresh_users_from_yandex(token, remote_path=YANDEX_USERS_PATH):
+    """
+    Conditional pull: replaces users.db only when the cloud copy changed and is newer than
+    the local writes made since the last sync. Returns the storage status ("local_newer" when
+    local writes win), "skipped" outside the designated process or "locked" while another pull runs.
+    """
+    if not USERS_DB_PULL:
+        return "skipped"
+    with FileLock(USERS_DB + USERS_DB_PULL_LOCK_SUFFIX) as lock:
+        if not lock.acquired:
+            return "locked"
+        return _pull_users_db(token, remote_path)
+
+def _pull_users_db(token, remote_path):
+    status = get_storage_provider().download_file_if_changed(
+        remote_path, USERS_DB, token, replace=_restore_users_db, keep_local_changes=True
+    )
+    if status == "downloaded":
+        # Cloud copy may come from an older release: bring the schema up to date
+        init_auth_db()
+        invalidate_auth_caches()
+        _bump_auth_epoch()
+    return status
 
 def sync_users_to_yandex(token, remote_path=YANDEX_USERS_PATH):
     # SAFETY GUARD: Prevent wiping a populated cloud DB with a fresh 1-user local DB.
@@ -82,19 +190,55 @@ def sync_users_to_yandex(token, remote_path=YANDEX_USERS_PATH):
     except Exception as e:
         log.warning(f"⚠️ DB Safety guard check encountered an issue: {e}")
 
-    return get_storage_provider().upload_file(USERS_DB, remote_path, token)
-
-@st.cache_resource
-def get_runtime_sessions():
-    # token -> user_id (in-memory, resets on server reboot)
-    return {}
+    # Queued audit events and recent commits (still in the WAL file) go into users.db before upload
+    get_audit_repo().flush()
+    get_connection_manager(USERS_DB).checkpoint()
+    uploaded = get_storage_provider().upload_file(USERS_DB, remote_path, token)
+    if uploaded:
+        get_storage_provider().mark_synced(remote_path, USERS_DB, token)
+    return uploaded
+
+def get_runtime_sessions() -> TTLCache:
+    # token -> (user_id, expires_at), in-memory per process, resets on server reboot
+    return _session_cache
+
+def _remember_session(token, user_id, expires_at):
+    ttl = min(USER_CACHE_TTL_SEC, (expires_at - datetime.utcnow()).total_seconds())
+    if ttl > 0:
+        _session_cache.set(token, (user_id, expires_at), ttl=ttl)
+
+def sweep_expired_sessions() -> int:
+    """Delete expired DB sessions and purge stale in-memory entries."""
+    deleted = get_user_repo().delete_expired_sessions(datetime.utcnow().isoformat())
+    _session_cache.purge_expired()
+    _last_seen_writes.purge_expired()
+    _last_sweep.update(at=datetime.utcnow().isoformat(timespec="seconds"), deleted=deleted)
+    if deleted:
+        log.info(f"Auth: Swept {deleted} expired session(s)")
+    return deleted
+
+_session_sweeper = PeriodicTask("session-sweeper", SESSION_SWEEP_INTERVAL_SEC, sweep_expired_sessions)
+
+def start_session_sweeper() -> bool:
+    return _session_sweeper.start()
+
+def session_metrics() -> dict:
+    live_db, expired_db = get_user_repo().count_sessions(datetime.utcnow().isoformat())
+    return {
+        "store_entries": len(_session_cache),
+        "store_bytes": _session_cache.approx_bytes() + _last_seen_writes.approx_bytes(),
+        "db_live_sessions": live_db,
+        "db_expired_sessions": expired_db,
+        "last_sweep_at": _last_sweep["at"],
+        "last_sweep_deleted": _last_sweep["deleted"],
+    }
 
 def init_auth_db():
     get_user_repo().init_auth_db()
 
 def _hash_password(password, salt_hex):
-    salt = bytes.fromhex(salt_hex)
-    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PASSWORD_ITERATIONS).hex()
+    # Runs in the bounded hashing pool, off the Streamlit script thread
+    return get_hash_executor().hash(password, salt_hex, PASSWORD_ITERATIONS)
 
 def _make_password(password):
     salt_hex = os.urandom(16).hex()
@@ -149,7 +293,10 @@ def _unsign_token(token: str):
 def create_user(full_name, login, email, phone, password, role="user", status="pending"):
     login = login.strip().lower()
     email = email.strip().lower()
-    salt_hex, pw_hash = _make_password(password)
+    try:
+        salt_hex, pw_hash = _make_password(password)
+    except HashCapacityError as e:
+        raise AuthBusyError(BUSY_MESSAGE) from e
     created_at = datetime.utcnow().isoformat()
     success, err = get_user_repo().create_user(
         full_name, login, email, phone, salt_hex, pw_hash, role, status, created_at
@@ -178,6 +325,7 @@ def authenticate_user(login, password):
     
     # 1. Check Rate Limits (Brute-Force protection)
     limit_dict = repo.get_login_attempts(login)
+    recent_failures = limit_dict["attempts"] if limit_dict else 0
     if limit_dict:
         attempts = limit_dict["attempts"]
         last_attempt_str = limit_dict["last_attempt"]
@@ -202,6 +350,15 @@ def authenticate_user(login, password):
         except ValueError:
             pass
 
+    # 1b. Load shedding: while hashing is backed up, retries after failures wait their turn
+    if recent_failures >= LOGIN_SHED_ATTEMPTS and get_hash_executor().is_saturated():
+        log.warning(f"Auth: Shed login for {_mask_identifier(login)} under hashing load. Attempts: {recent_failures}")
+        get_audit_repo().log_action(
+            AuditAction.LOGIN_BLOCKED, "system", target_id=login, result="fail",
+            metadata={"reason": "hash_backpressure", "attempts": recent_failures}
+        )
+        raise AuthBusyError(BUSY_MESSAGE)
+
     # 2. Lookup User
     user = repo.get_user_by_login(login)
 
@@ -212,7 +369,11 @@ def authenticate_user(login, password):
         raise InvalidCredentialsError("Неверный логин или пароль.")
     
     # 3. Verify Pass
-    if not _verify_password(password, user["password_salt"], user["password_hash"]):
+    try:
+        password_ok = _verify_password(password, user["password_salt"], user["password_hash"])
+    except HashCapacityError as e:
+        raise AuthBusyError(BUSY_MESSAGE) from e
+    if not password_ok:
         _record_failed_attempt(login, now_iso)
         log.warning(f"Auth: Failed login attempt (invalid password) for {_mask_identifier(login)}")
         get_audit_repo().log_action(AuditAction.LOGIN_FAIL, "system", target_id=login, result="fail", metadata={"reason": "invalid_password"})
@@ -255,7 +416,14 @@ def get_all_users():
     return get_user_repo().get_all_users()
 
 def get_user_by_id(user_id):
-    return get_user_repo().get_user_by_id(user_id)
+    _sync_auth_epoch()
+    return _user_cache.get_or_load(user_id, lambda: get_user_repo().get_user_by_id(user_id))
+
+def _touch_session(repo, token, now):
+    # At most one last_seen_at write per token per SESSION_LAST_SEEN_INTERVAL_SEC
+    if _last_seen_writes.get(token) is None:
+        repo.update_session_last_seen(token, now.isoformat())
+        _last_seen_writes.set(token, True)
 
 def create_runtime_session(user_id, user_agent=None):
     now_iso = datetime.utcnow().isoformat()
@@ -265,15 +433,22 @@ def create_runtime_session(user_id, user_agent=None):
     token = _sign_payload(f"{user_id}:{exp_ts}")
     ua_hash = _hash_user_agent(user_agent)
     get_user_repo().create_session(token, user_id, expires_iso, now_iso, ua_hash)
-
-    # Keep in-memory mirror for quick access inside same process.
-    sessions = get_runtime_sessions()
-    sessions[token] = {"user_id": user_id, "expires_at": expires_iso, "ua_hash": ua_hash}
+    _remember_session(token, user_id, expires_at)
+    _last_seen_writes.set(token, True)
     return token
 
 def resolve_runtime_session(token, user_agent=None):
     now = datetime.utcnow()
     repo = get_user_repo()
+    _sync_auth_epoch()
+    cached = _session_cache.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        if now <= expires_at:
+            _touch_session(repo, token, now)
+            return user_id
+        _session_cache.pop(token)
+
     row = repo.get_session(token)
 
     if not row:
@@ -281,9 +456,11 @@ def resolve_runtime_session(token, user_agent=None):
         user_id = _unsign_token(token)
         if user_id is None:
             return None
-        expires_iso = (datetime.utcnow() + timedelta(hours=SESSION_TTL_HOURS)).isoformat()
+        expires_at = now + timedelta(hours=SESSION_TTL_HOURS)
         ua_hash = _hash_user_agent(user_agent)
-        repo.create_session(token, user_id, expires_iso, now.isoformat(), ua_hash)
+        repo.create_session(token, user_id, expires_at.isoformat(), now.isoformat(), ua_hash)
+        _remember_session(token, user_id, expires_at)
+        _last_seen_writes.set(token, True)
         return user_id
 
     user_id, expires_raw, expected_ua_hash = row
@@ -297,21 +474,20 @@ def resolve_runtime_session(token, user_agent=None):
         repo.delete_session(token)
         return None
 
-    repo.update_session_last_seen(token, now.isoformat())
-
-    # Backward compatibility / in-memory mirror.
-    sessions = get_runtime_sessions()
-    sessions[token] = {"user_id": user_id, "expires_at": expires_raw, "ua_hash": _hash_user_agent(user_agent)}
+    _touch_session(repo, token, now)
+    _remember_session(token, user_id, expires_at)
     return user_id
 
 def drop_runtime_session(token):
     get_user_repo().delete_session(token)
-
-    sessions = get_runtime_sessions()
-    sessions.pop(token, None)
+    _session_cache.pop(token)
+    _last_seen_writes.pop(token)
+    _bump_auth_epoch()
 
 def update_user_status(user_id, status):
     get_user_repo().update_user_status(user_id, status)
+    _user_cache.pop(user_id)
+    _bump_auth_epoch()
     
     try:
         current_admin = st.session_state.auth_user
@@ -335,6 +511,8 @@ def update_user_status(user_id, status):
 
 def update_user_role(user_id, role):
     get_user_repo().update_user_role(user_id, role)
+    _user_cache.pop(user_id)
+    _bump_auth_epoch()
     
     try:
         current_admin = st.session_state.auth_user
@@ -371,6 +549,8 @@ def bootstrap_admin():
         # Force sync secrets.toml to the database
         salt_hex, pw_hash = _make_password(admin_password)
         repo.update_admin_credentials(admin_login, admin_name, admin_email, admin_phone, salt_hex, pw_hash)
+        _user_cache.clear()
+        _bump_auth_epoch()
         
         token = get_secret("YANDEX_TOKEN") or os.getenv("YANDEX_TOKEN")
         if token:
@@ -0,0 +1,80 @@
+import os
+import time
+import logging
+
+import pandas as pd
+
+from infrastructure.observability import setup_observability
+setup_observability()
+
+from services import category_service, parsing_service
+
+log = logging.getLogger(__name__)
+
+CACHE_FILE = 'data_cache.parquet'
+REPEAT = 20
+
+
+def legacy_detect(name_input, config):
+    """Pre-compiled reference: per-category keyword loop with nested exclusion scans."""
+    name = parsing_service.normalize_name(str(name_input))
+    categories = config.get("categories", {})
+    exclusions = config.get("exclusions", {})
+    for cat_name in category_service.PRIORITY_ORDER:
+        cat_exclusions = exclusions.get(cat_name, [])
+        for k in categories.get(cat_name, []):
+            if k in name:
+                if cat_exclusions and any(ex in name for ex in cat_exclusions):
+                    continue
+                return cat_name
+    return category_service.FALLBACK_CATEGORY
+
+
+def legacy_macro(cat, config):
+    for macro, subcats in config.get("macro_categories", {}).items():
+        if cat in subcats:
+            return macro
+    return cat
+
+
+def load_dish_dictionary():
+    names = set(category_service.load_categories().keys())
+    if os.path.exists(CACHE_FILE):
+        names.update(pd.read_parquet(CACHE_FILE, columns=['Блюдо'])['Блюдо'].astype(str).unique())
+    config = category_service.load_config()
+    for keywords in config.get("categories", {}).values():
+        names.update(f"{k} 0,5" for k in keywords)
+    return sorted(names)
+
+
+def bench():
+    config = category_service.load_config()
+    names = load_dish_dictionary()
+    log.info(f"📚 Dish dictionary: {len(names)} names, repeat x{REPEAT}")
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        legacy = [legacy_detect(n, config) for n in names]
+        legacy_macros = [legacy_macro(c, config) for c in legacy]
+    legacy_time = time.perf_counter() - start
+
+    category_service.get_keyword_matcher()  # compile outside the timed loop
+    start = time.perf_counter()
+    compiled = [category_service.detect_category_granular(n) for n in names]
+    cold_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        compiled = [category_service.detect_category_granular(n) for n in names]
+        compiled_macros = [category_service.get_macro_category(c) for c in compiled]
+    compiled_time = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(legacy, compiled)) + sum(a != b for a, b in zip(legacy_macros, compiled_macros))
+    log.info(f"🐢 Legacy loop:   {legacy_time:.3f} sec")
+    log.info(f"🧊 Compiled, first pass: {cold_time * REPEAT:.3f} sec (extrapolated x{REPEAT})")
+    log.info(f"🚀 Compiled matcher: {compiled_time:.3f} sec")
+    log.info(f"⚡ Speedup: {legacy_time / compiled_time:.1f}x, mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    bench()
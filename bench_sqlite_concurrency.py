@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+
+from infrastructure.observability import setup_observability
+setup_observability()
+
+from infrastructure.repositories.sqlite_audit_repository import SQLiteAuditRepository, AuditAction
+from infrastructure.repositories.sqlite_connection import close_all
+from infrastructure.repositories.sqlite_user_repository import SQLiteUserRepository
+
+log = logging.getLogger(__name__)
+
+SESSIONS = int(os.getenv("BENCH_SESSIONS", 16))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", 200))
+
+
+class LegacyUserRepository(SQLiteUserRepository):
+    """Pre-pool reference: new rollback-journal connection on every call."""
+    def _conn(self):
+        return sqlite3.connect(self.db_path)
+
+
+class LegacyAuditRepository(SQLiteAuditRepository):
+    def _conn(self):
+        return sqlite3.connect(self.db_path)
+
+
+def seed(db_path):
+    repo = SQLiteUserRepository(db_path)
+    repo.init_auth_db()
+    now = datetime.utcnow()
+    for i in range(SESSIONS):
+        repo.create_user(f"User{i}", f"user{i}", f"u{i}@a.com", "1", "salt", "hash", "user", "approved", now.isoformat())
+        repo.create_session(f"token{i}", i + 1, (now + timedelta(hours=12)).isoformat(), now.isoformat(), None)
+    close_all(db_path)
+
+
+def simulate_session(i, user_repo, audit_repo, errors):
+    login, token = f"user{i}", f"token{i}"
+    try:
+        for _ in range(ROUNDS):
+            # Login: lookup + attempts reset + audit
+            user = user_repo.get_user_by_login(login)
+            user_repo.delete_login_attempts(login)
+            audit_repo.log_action(AuditAction.LOGIN_SUCCESS, "system", actor_user_id=user["id"], target_id=login)
+            # Rerun: session lookup + last seen
+            user_repo.get_session(token)
+            user_repo.update_session_last_seen(token, datetime.utcnow().isoformat())
+            user_repo.get_user_by_id(user["id"])
+    except sqlite3.OperationalError as e:
+        errors.append(str(e))
+
+
+def run(user_cls, audit_cls, db_path):
+    user_repo, audit_repo = user_cls(db_path), audit_cls(db_path)
+    errors = []
+    threads = [
+        threading.Thread(target=simulate_session, args=(i, user_repo, audit_repo, errors))
+        for i in range(SESSIONS)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, errors
+
+
+def bench():
+    ops = SESSIONS * ROUNDS * 6
+    log.info(f"👥 {SESSIONS} sessions x {ROUNDS} rounds ({ops} repository calls)")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        pooled_db = os.path.join(tmp, "pooled.db")
+        seed(legacy_db)
+        # Legacy mode must run on a rollback-journal file
+        with sqlite3.connect(legacy_db) as conn:
+            conn.execute("PRAGMA journal_mode = DELETE")
+        seed(pooled_db)
+
+        legacy_time, legacy_errors = run(LegacyUserRepository, LegacyAuditRepository, legacy_db)
+        pooled_time, pooled_errors = run(SQLiteUserRepository, SQLiteAuditRepository, pooled_db)
+        close_all()
+
+    log.info(f"🐢 Fresh connection per call: {legacy_time:.3f} sec ({ops / legacy_time:.0f} ops/sec), lock errors: {len(legacy_errors)}")
+    log.info(f"🚀 Pooled WAL connections:    {pooled_time:.3f} sec ({ops / pooled_time:.0f} ops/sec), lock errors: {len(pooled_errors)}")
+    log.info(f"⚡ Speedup: {legacy_time / pooled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,68 @@
+"""
+Health/readiness endpoint running next to the Streamlit app.
+
+    GET /health  -> 200 while the app answers (container healthcheck)
+    GET /ready   -> 200 when the app, users.db and a dataset are available;
+                    JSON body with dataset version, age and last sync time
+
+Stdlib HTTP server that never imports the UI stack, so load balancers can probe it often.
+"""
+
+import argparse
+import json
+import logging
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from infrastructure.observability import setup_observability
+setup_observability()
+
+from services import health_service
+from utils.ttl_cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", 8502))
+# Probes arriving within this window share one check
+HEALTH_CACHE_SEC = float(os.getenv("HEALTH_CACHE_SEC", 2))
+
+_cache = TTLCache(HEALTH_CACHE_SEC, maxsize=2)
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            ok = _cache.get_or_load("app", lambda: {"app": health_service.check_app()})["app"]
+            self._send(200 if ok else 503, {"status": "ok" if ok else "down"})
+        elif path == "/ready":
+            report = _cache.get_or_load("ready", health_service.readiness)
+            self._send(200 if report["ready"] else 503, report)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _send(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Probes every few seconds would flood the log
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Health/readiness server")
+    parser.add_argument("--port", type=int, default=HEALTH_PORT)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), HealthHandler)
+    log.info(f"✅ Health server on :{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Bounded PBKDF2 executor.
+
+PBKDF2 releases the GIL, so hashing in a small thread pool keeps the Streamlit
+script threads of other sessions responsive during a burst of logins.
+At most `max_pending` hashes may be queued or running; beyond that callers
+are rejected immediately instead of piling up.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict
+
+log = logging.getLogger(__name__)
+
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+HASH_TIMEOUT_SEC = float(os.getenv("PASSWORD_HASH_TIMEOUT_SEC", 15))
+
+
+class HashCapacityError(RuntimeError):
+    """Hashing pool is saturated (queue full or wait timed out)."""
+
+
+class PasswordHashExecutor:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING, timeout: float = HASH_TIMEOUT_SEC):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._metrics = {
+            "completed": 0, "rejected": 0, "timeouts": 0,
+            "queue_wait_total": 0.0, "queue_wait_max": 0.0, "hash_time_total": 0.0,
+        }
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def is_saturated(self) -> bool:
+        """More hashes waiting than there are workers."""
+        return self._pending > self.workers
+
+    def _run(self, password: str, salt_hex: str, iterations: int, enqueued_at: float) -> str:
+        started = time.perf_counter()
+        try:
+            return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt_hex), iterations).hex()
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                wait = started - enqueued_at
+                self._pending -= 1
+                self._metrics["completed"] += 1
+                self._metrics["queue_wait_total"] += wait
+                self._metrics["queue_wait_max"] = max(self._metrics["queue_wait_max"], wait)
+                self._metrics["hash_time_total"] += finished - started
+            self._slots.release()
+
+    def hash(self, password: str, salt_hex: str, iterations: int) -> str:
+        """PBKDF2-HMAC-SHA256 hex digest computed in the pool; raises HashCapacityError when saturated."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._metrics["rejected"] += 1
+            log.warning(f"⚠️ Password hashing saturated ({self.max_pending} pending), request rejected")
+            raise HashCapacityError("Password hashing queue is full")
+        with self._lock:
+            self._pending += 1
+        future = self._pool.submit(self._run, password, salt_hex, iterations, time.perf_counter())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError as e:
+            # The job keeps its slot until it finishes, so the bound still holds
+            with self._lock:
+                self._metrics["timeouts"] += 1
+            raise HashCapacityError("Password hashing timed out") from e
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            m = dict(self._metrics)
+        done = m["completed"] or 1
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "completed": m["completed"],
+            "rejected": m["rejected"],
+            "timeouts": m["timeouts"],
+            "queue_wait_avg_ms": m["queue_wait_total"] / done * 1000,
+            "queue_wait_max_ms": m["queue_wait_max"] * 1000,
+            "hash_time_avg_ms": m["hash_time_total"] / done * 1000,
+        }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor() -> PasswordHashExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = PasswordHashExecutor()
+    return _executor
@@ -1,10 +1,15 @@
-import sqlite3
+import atexit
 import json
-from typing import Optional, Dict, Any, List, Tuple
-from datetime import datetime
+import queue
+import threading
+from typing import Callable, Optional, Dict, Any, List, Tuple
+from datetime import datetime, timedelta
 import os
 import logging
 from enum import Enum
+import pyarrow as pa
+import pyarrow.parquet as pq
+from infrastructure.repositories.sqlite_connection import get_connection_manager
 
 log = logging.getLogger(__name__)
 
@@ -30,12 +35,130 @@ ALLOWED_METADATA_KEYS = {
     "target_action", "role", "status"
 }
 
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", 10000))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 200))
+AUDIT_FLUSH_INTERVAL_SEC = float(os.getenv("AUDIT_FLUSH_INTERVAL_SEC", 1.0))
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", 90))
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "audit_archive")
+
+AUDIT_COLUMNS = [
+    "id", "ts", "actor_user_id", "actor_role", "action", "target_type",
+    "target_id", "metadata_json", "ip_address", "result"
+]
+_ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()), ("ts", pa.string()), ("actor_user_id", pa.int64()), ("actor_role", pa.string()),
+    ("action", pa.string()), ("target_type", pa.string()), ("target_id", pa.string()),
+    ("metadata_json", pa.string()), ("ip_address", pa.string()), ("result", pa.string()),
+])
+
+# Cursor for keyset pagination: (ts, id) of the last row on the previous page
+AuditCursor = Tuple[str, int]
+
+_INSERT_SQL = """
+    INSERT INTO audit_log 
+    (ts, actor_user_id, actor_role, action, target_type, target_id, metadata_json, ip_address, result) 
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+class AuditBatchWriter:
+    """
+    Background writer: rows are queued from the request path and inserted
+    in one transaction per batch (on batch_size, every flush_interval seconds and at exit).
+    When the bounded queue is full new rows are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Tuple]], None],
+        max_queue: int = AUDIT_QUEUE_MAX,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_SEC
+    ):
+        self._write_batch = write_batch
+        self._queue: "queue.Queue[Tuple]" = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, row: Tuple) -> bool:
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                log.warning(f"⚠️ Audit queue full, dropped {self.dropped} event(s)")
+            return False
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def flush(self) -> int:
+        """Write everything queued so far; safe to call from any thread."""
+        with self._flush_lock:
+            rows = []
+            while True:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not rows:
+                return 0
+            try:
+                self._write_batch(rows)
+                self.written += len(rows)
+            except Exception as e:
+                self.dropped += len(rows)
+                log.error(f"Audit batch of {len(rows)} failed: {e}", exc_info=True)
+                return 0
+            return len(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        atexit.unregister(self.close)
+
 class SQLiteAuditRepository:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, async_writes: bool = False):
         self.db_path = db_path
+        self._writer = AuditBatchWriter(self._insert_rows) if async_writes else None
 
     def _conn(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection_manager(self.db_path).connection()
+
+    def _insert_rows(self, rows: List[Tuple]):
+        with self._conn() as conn:
+            conn.executemany(_INSERT_SQL, rows)
+            conn.commit()
+
+    def flush(self) -> int:
+        """Write queued events now (no-op in synchronous mode)."""
+        return self._writer.flush() if self._writer else 0
+
+    def stats(self) -> Dict[str, int]:
+        return self._writer.stats() if self._writer else {"pending": 0, "written": 0, "dropped": 0}
+
+    def close(self):
+        if self._writer:
+            self._writer.close()
 
     def log_action(
         self,
@@ -75,19 +198,41 @@ class SQLiteAuditRepository:
             ip_address = str(ip_address)[:45] if ip_address is not None else None
             result = str(result)[:20] if result else "unknown"
 
-            with self._conn() as conn:
-                conn.execute("""
-                    INSERT INTO audit_log 
-                    (ts, actor_user_id, actor_role, action, target_type, target_id, metadata_json, ip_address, result) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (ts, actor_user_id, actor_role, action_val, target_type, target_id, meta_str, ip_address, result))
-                conn.commit()
+            row = (ts, actor_user_id, actor_role, action_val, target_type, target_id, meta_str, ip_address, result)
+            if self._writer:
+                self._writer.submit(row)
+            else:
+                self._insert_rows([row])
         except Exception as e:
             # Audit failures must not crash the main application
             log.error(f"Audit log failed for action {action}: {e}", exc_info=True)
 
     def get_logs(self, limit: int = 100, action_filter: Optional[str] = None, user_filter: Optional[str] = None) -> List[Tuple]:
         """Fetches the most recent audit logs for the admin view."""
+        return self.get_logs_page(limit, action_filter, user_filter)[0]
+
+    def _actor_ids(self, conn, user_filter: str) -> List[int]:
+        # Resolve the login filter first, so the page query can use the (actor_user_id, ts) index
+        ids = [r[0] for r in conn.execute("SELECT id FROM users WHERE login LIKE ?", (f"%{user_filter}%",))]
+        try:
+            ids.append(int(user_filter))
+        except ValueError:
+            pass
+        return ids
+
+    def get_logs_page(
+        self,
+        limit: int = 100,
+        action_filter: Optional[str] = None,
+        user_filter: Optional[str] = None,
+        before: Optional[AuditCursor] = None
+    ) -> Tuple[List[Tuple], Optional[AuditCursor]]:
+        """
+        One page of logs, newest first, strictly older than `before`.
+        Returns (rows, cursor for the next page or None when this is the last page).
+        """
+        # Read through queued events so the admin view sees everything logged so far
+        self.flush()
         try:
             with self._conn() as conn:
                 query = """
@@ -105,17 +250,73 @@ class SQLiteAuditRepository:
                     query += " AND a.action = ?"
                     params.append(action_filter)
                 if user_filter and user_filter != "Все":
-                    query += " AND (u.login LIKE ? OR a.actor_user_id = ?)"
-                    params.append(f"%{user_filter}%")
-                    try:
-                        params.append(int(user_filter))
-                    except ValueError:
-                        params.append(-1)
-                
-                query += " ORDER BY a.ts DESC LIMIT ?"
-                params.append(limit)
-                
-                return conn.execute(query, tuple(params)).fetchall()
+                    actor_ids = self._actor_ids(conn, user_filter)
+                    if not actor_ids:
+                        return [], None
+                    query += f" AND a.actor_user_id IN ({', '.join('?' * len(actor_ids))})"
+                    params.extend(actor_ids)
+                if before is not None:
+                    query += " AND a.ts <= ? AND (a.ts < ? OR a.id < ?)"
+                    params.extend([before[0], before[0], before[1]])
+
+                query += " ORDER BY a.ts DESC, a.id DESC LIMIT ?"
+                params.append(limit + 1)
+
+                rows = conn.execute(query, tuple(params)).fetchall()
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    return rows, (rows[-1][1], rows[-1][0])
+                return rows, None
         except Exception as e:
             log.error(f"Failed to fetch audit logs: {e}", exc_info=True)
-            return []
+            return [], None
+
+    def archive_old_logs(
+        self,
+        retention_days: int = AUDIT_RETENTION_DAYS,
+        archive_dir: str = AUDIT_ARCHIVE_DIR,
+        vacuum: bool = True
+    ) -> int:
+        """
+        Move entries older than retention_days to a zstd Parquet file in archive_dir,
+        keep per-day counts in audit_daily_rollup and shrink the DB file.
+        Returns the number of archived rows.
+
+        Select, export and delete run in one BEGIN IMMEDIATE transaction capped at
+        the selected max id: a second process archiving at the same time waits and
+        then finds nothing, instead of exporting the same rows again.
+        """
+        self.flush()
+        cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                f"SELECT {', '.join(AUDIT_COLUMNS)} FROM audit_log WHERE ts < ? ORDER BY ts, id", (cutoff,)
+            ).fetchall()
+            if not rows:
+                return 0
+            max_id = max(r[0] for r in rows)
+
+            os.makedirs(archive_dir, exist_ok=True)
+            archive_path = os.path.join(archive_dir, f"audit_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{rows[-1][0]}.parquet")
+            columns = list(zip(*rows))
+            table = pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, _ARCHIVE_SCHEMA)],
+                schema=_ARCHIVE_SCHEMA,
+            )
+            pq.write_table(table, archive_path, compression="zstd")
+
+            # Archive file is on disk before anything is deleted
+            conn.execute("""
+                INSERT INTO audit_daily_rollup (day, action, result, events)
+                SELECT substr(ts, 1, 10), action, result, COUNT(*) FROM audit_log WHERE ts < ? AND id <= ?
+                GROUP BY substr(ts, 1, 10), action, result
+                ON CONFLICT(day, action, result) DO UPDATE SET events = events + excluded.events
+            """, (cutoff, max_id))
+            conn.execute("DELETE FROM audit_log WHERE ts < ? AND id <= ?", (cutoff, max_id))
+            conn.commit()
+            if vacuum:
+                conn.execute("VACUUM")
+
+        log.info(f"✅ Archived {len(rows)} audit entries older than {retention_days} days to {archive_path}")
+        return len(rows)
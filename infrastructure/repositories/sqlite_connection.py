@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+CACHED_STATEMENTS = 256
+
+
+class SQLiteConnectionManager:
+    """
+    One long-lived connection per thread for a single SQLite file.
+
+    Connections are opened in WAL mode with synchronous=NORMAL and a busy timeout,
+    so readers don't block the writer and short write bursts wait instead of failing.
+    Statements are reused through sqlite3's per-connection statement cache.
+
+    A downloaded copy is swapped in with restore_from(), in place, so the file,
+    its WAL and every open connection stay valid. If the file is replaced anyway,
+    every thread reconnects on its next call: after close_all() bumped the
+    generation, or after the file's inode changed. A connection is only ever
+    closed by the thread that owns it, never in the middle of another thread's
+    transaction.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def _file_identity(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.db_path)
+            return st.st_dev, st.st_ino
+        except FileNotFoundError:
+            return None
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the calling thread (use as `with manager.connection() as conn:`)."""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None:
+            if local.generation == self._generation and local.identity == self._file_identity():
+                return conn
+            self._discard(conn)
+
+        conn = self._open()
+        local.generation = self._generation
+        local.conn = conn
+        local.identity = self._file_identity()
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        self._local.conn = None
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def checkpoint(self) -> None:
+        """Fold the WAL back into the main file (before uploading/copying it)."""
+        if self._file_identity() is None:
+            return
+        try:
+            self.connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            log.warning(f"⚠️ WAL checkpoint failed for {self.db_path}: {e}")
+
+    def close_all(self) -> None:
+        """Invalidate every thread's connection; each owner reopens it on its next call."""
+        with self._lock:
+            self._generation += 1
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._discard(conn)
+
+    def restore_from(self, source_path: str) -> None:
+        """
+        Copy the database at source_path over the live one with SQLite's online backup.
+        The copy takes SQLite's own locks: writers on other threads and processes wait
+        for it (or it waits for them) instead of writing into a file that is about to
+        be unlinked. Raises sqlite3.Error and leaves the live data as is when the source
+        is not a valid database or the live one stays busy.
+        """
+        src = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        try:
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            dst = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+            try:
+                dst.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+                src.backup(dst)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+
+
+_MANAGERS: Dict[str, SQLiteConnectionManager] = {}
+_MANAGERS_LOCK = threading.Lock()
+
+
+def get_connection_manager(db_path: str) -> SQLiteConnectionManager:
+    key = os.path.abspath(db_path)
+    manager = _MANAGERS.get(key)
+    if manager is None:
+        with _MANAGERS_LOCK:
+            manager = _MANAGERS.setdefault(key, SQLiteConnectionManager(db_path))
+    return manager
+
+
+def close_all(db_path: Optional[str] = None) -> None:
+    """Invalidate pooled connections for one file (or for all files)."""
+    with _MANAGERS_LOCK:
+        managers = list(_MANAGERS.values()) if db_path is None else [_MANAGERS.get(os.path.abspath(db_path))]
+    for manager in managers:
+        if manager is not None:
+            manager.close_all()
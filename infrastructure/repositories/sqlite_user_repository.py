@@ -1,11 +1,12 @@
 import sqlite3
+from infrastructure.repositories.sqlite_connection import get_connection_manager
 
 class SQLiteUserRepository:
     def __init__(self, db_path: str):
         self.db_path = db_path
 
     def _conn(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection_manager(self.db_path).connection()
 
     def _get_current_version(self, conn) -> int:
         # Check if schema_info exists and has a row
@@ -86,9 +87,30 @@ class SQLiteUserRepository:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_actor_id ON audit_log(actor_user_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_action ON audit_log(action)")
 
+    def _migrate_v3(self, conn):
+        """V3 schema: composite audit indexes for filtered keyset pages, daily rollup for archived rows."""
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_action_ts ON audit_log(action, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_actor_ts ON audit_log(actor_user_id, ts)")
+        # Superseded by the composite indexes above (same leading column)
+        conn.execute("DROP INDEX IF EXISTS idx_audit_log_action")
+        conn.execute("DROP INDEX IF EXISTS idx_audit_log_actor_id")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit_daily_rollup (
+                day TEXT NOT NULL,
+                action TEXT NOT NULL,
+                result TEXT NOT NULL,
+                events INTEGER NOT NULL,
+                PRIMARY KEY (day, action, result)
+            )
+        """)
+
+    def _migrate_v4(self, conn):
+        """V4 schema: index for the expired-session sweeper."""
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+
     def init_auth_db(self):
         # We assign function pointers, so TypeChecker won't yell if we explicitly ignore or wrap
-        MIGRATIONS = [self._migrate_v1, self._migrate_v2]
+        MIGRATIONS = [self._migrate_v1, self._migrate_v2, self._migrate_v3, self._migrate_v4]
         
         with self._conn() as conn:
             # 1. Ensure schema_info table exists
@@ -241,3 +263,17 @@ class SQLiteUserRepository:
         with self._conn() as conn:
             conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
             conn.commit()
+
+    def delete_expired_sessions(self, now_iso) -> int:
+        with self._conn() as conn:
+            deleted = conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now_iso,)).rowcount
+            conn.commit()
+            return deleted
+
+    def count_sessions(self, now_iso):
+        """(live, expired) session counts."""
+        with self._conn() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) - COUNT(CASE WHEN expires_at < ? THEN 1 END), COUNT(CASE WHEN expires_at < ? THEN 1 END) FROM sessions",
+                (now_iso, now_iso)
+            ).fetchone()
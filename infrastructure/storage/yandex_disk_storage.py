@@ -1,12 +1,40 @@
 import os
+import json
+import tempfile
 import requests
 import logging
-from typing import Optional
+from datetime import datetime
+from typing import Callable, Optional
 
 log = logging.getLogger(__name__)
 
+SYNC_META_SUFFIX = ".sync.json"
+
+def write_file_atomic(local_path: str, content: bytes, replace: Optional[Callable[[str, str], None]] = None) -> None:
+    """Write to a temp file in the same directory, then rename over the target.
+    replace(tmp_path, local_path) swaps it in instead of os.replace (e.g. an in-place
+    SQLite restore for a database other processes have open)."""
+    directory = os.path.dirname(os.path.abspath(local_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        (replace or os.replace)(tmp_path, local_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 class YandexDiskStorage:
-    def download_file(self, remote_path: str, local_path: str, token: str, force: bool = False) -> bool:
+    def download_file(
+        self,
+        remote_path: str,
+        local_path: str,
+        token: str,
+        force: bool = False,
+        replace: Optional[Callable[[str, str], None]] = None
+    ) -> bool:
         if not token:
             return False
         if os.path.exists(local_path) and not force:
@@ -24,8 +52,7 @@ class YandexDiskStorage:
                 href = resp.json().get("href")
                 dl = requests.get(href, timeout=15)
                 if dl.status_code == 200:
-                    with open(local_path, 'wb') as f:
-                        f.write(dl.content)
+                    write_file_atomic(local_path, dl.content, replace)
                     log.info(f"✅ Successfully downloaded {remote_path} to {local_path} ({len(dl.content)} bytes)")
                     return True
                 else:
@@ -105,11 +132,93 @@ class YandexDiskStorage:
             if resp.status_code == 200:
                 item = resp.json()
                 if item.get("type") == "file":
-                    return {"size": item.get("size", 0), "modified": item.get("modified")}
+                    return {"size": item.get("size", 0), "modified": item.get("modified"), "md5": item.get("md5")}
         except Exception as e:
             log.error(f"❌ Failed to get file info for {remote_path}: {e}")
         return None
 
+    # --- Conditional sync: remember which remote revision the local copy came from ---
+
+    @staticmethod
+    def read_sync_meta(local_path: str) -> Optional[dict]:
+        try:
+            with open(local_path + SYNC_META_SUFFIX, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def local_mtime_ns(local_path: str) -> Optional[int]:
+        """Last local write: the file itself or, for a SQLite database in WAL mode, its -wal file."""
+        stamps = [os.stat(p).st_mtime_ns for p in (local_path, local_path + "-wal") if os.path.exists(p)]
+        return max(stamps) if stamps else None
+
+    @classmethod
+    def write_sync_meta(cls, local_path: str, info: dict) -> None:
+        payload = {k: info.get(k) for k in ("md5", "modified", "size")}
+        # Local state the remote revision corresponds to, see has_newer_local_changes()
+        payload["local_mtime_ns"] = cls.local_mtime_ns(local_path)
+        write_file_atomic(local_path + SYNC_META_SUFFIX, json.dumps(payload).encode("utf-8"))
+
+    def has_newer_local_changes(self, local_path: str, info: Optional[dict] = None) -> bool:
+        """
+        True when local_path was written after its last sync and (if the remote revision is
+        known) after that revision was modified, i.e. a download would throw local writes away.
+        """
+        meta = self.read_sync_meta(local_path)
+        current = self.local_mtime_ns(local_path)
+        if not meta or meta.get("local_mtime_ns") is None or current is None:
+            return False
+        if current <= meta["local_mtime_ns"]:
+            return False
+        try:
+            remote_ns = int(datetime.fromisoformat(info["modified"]).timestamp() * 1e9) if info else None
+        except (KeyError, TypeError, ValueError):
+            remote_ns = None
+        return remote_ns is None or current > remote_ns
+
+    @staticmethod
+    def is_same_remote(info: Optional[dict], meta: Optional[dict]) -> bool:
+        if not info or not meta:
+            return False
+        if info.get("md5") and meta.get("md5"):
+            return info["md5"] == meta["md5"]
+        return info.get("modified") == meta.get("modified") and info.get("size") == meta.get("size")
+
+    def download_file_if_changed(
+        self,
+        remote_path: str,
+        local_path: str,
+        token: str,
+        replace: Optional[Callable[[str, str], None]] = None,
+        keep_local_changes: bool = False,
+    ) -> str:
+        """
+        Download only when the remote revision differs from the one recorded for local_path.
+        Returns "downloaded", "unchanged", "local_newer" (keep_local_changes and local writes
+        are newer than the remote revision) or "unknown" (remote info unavailable: missing file
+        or network error).
+        """
+        info = self.get_file_info(remote_path, token)
+        if info is None:
+            return "unknown"
+        if os.path.exists(local_path) and self.is_same_remote(info, self.read_sync_meta(local_path)):
+            log.info(f"✅ {remote_path} unchanged on Yandex Disk, skipping download")
+            return "unchanged"
+        if keep_local_changes and self.has_newer_local_changes(local_path, info):
+            log.warning(f"⚠️ {local_path} has local writes newer than {remote_path}, skipping download")
+            return "local_newer"
+        if not self.download_file(remote_path, local_path, token, force=True, replace=replace):
+            return "unknown"
+        self.write_sync_meta(local_path, info)
+        return "downloaded"
+
+    def mark_synced(self, remote_path: str, local_path: str, token: str) -> None:
+        """After an upload: record the new remote revision so we don't download our own file back."""
+        info = self.get_file_info(remote_path, token)
+        if info:
+            self.write_sync_meta(local_path, info)
+
     def list_directory(self, path: str, token: str, limit: int = 1000) -> list[dict]:
         if not token:
             return []
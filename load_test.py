@@ -0,0 +1,181 @@
+"""
+Load test for the multi-replica setup.
+
+Local mode (default) runs REPLICAS processes with SESSIONS threads each against
+one shared users.db and dataset store, the way the compose replicas share the
+mounted volume. Every simulated rerun resolves the session, reads the user and
+picks up the current dataset; meanwhile the main process publishes new dataset
+versions and logs a user out, so cross-process invalidation is exercised too.
+
+    python load_test.py
+    python load_test.py --url http://localhost:8080   # HTTP against the compose proxy
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import logging
+import urllib.request
+from collections import Counter
+
+from infrastructure.observability import setup_observability
+setup_observability()
+
+import pandas as pd
+
+import auth
+from services import dataset_store
+from infrastructure.repositories.sqlite_connection import close_all
+
+log = logging.getLogger(__name__)
+
+REPLICAS = int(os.getenv("LOAD_REPLICAS", 3))
+SESSIONS = int(os.getenv("LOAD_SESSIONS", 8))
+DURATION_SEC = float(os.getenv("LOAD_DURATION_SEC", 10))
+PUBLISH_EVERY_SEC = float(os.getenv("LOAD_PUBLISH_EVERY_SEC", 2))
+DATASET_ROWS = int(os.getenv("LOAD_DATASET_ROWS", 200_000))
+
+
+def _dataset(rows, seed):
+    return pd.DataFrame({
+        "Дата_Отчета": pd.date_range("2024-01-01", periods=rows, freq="min"),
+        "Блюдо": [f"Блюдо {i % 500}" for i in range(rows)],
+        "Количество": 1.0,
+        "Выручка с НДС": float(seed),
+    })
+
+
+def seed(workdir):
+    os.chdir(workdir)
+    auth.init_auth_db()
+    tokens = []
+    for i in range(SESSIONS * REPLICAS):
+        auth.create_user(f"User{i}", f"user{i}", f"u{i}@a.com", "1", "password", status="approved")
+        user_id = auth.get_user_repo().get_user_by_login(f"user{i}")["id"]
+        tokens.append((auth.create_runtime_session(user_id), user_id))
+    dataset_store.publish(_dataset(DATASET_ROWS, 0), "load-test")
+    close_all()
+    return tokens
+
+
+def simulate_session(token, user_id, deadline, latencies, versions, errors):
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if auth.resolve_runtime_session(token) != user_id:
+                errors.append("session not resolved")
+            auth.get_user_by_id(user_id)
+            ref = dataset_store.resolve()
+            dataset_store.load(ref)
+            versions.add(ref.version)
+        except (sqlite3.OperationalError, OSError) as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - started)
+
+
+def replica(workdir, tokens, deadline, results):
+    os.chdir(workdir)
+    latencies, versions, errors = [], set(), []
+    threads = [
+        threading.Thread(target=simulate_session, args=(token, user_id, deadline, latencies, versions, errors))
+        for token, user_id in tokens
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    close_all()
+    results.put((os.getpid(), latencies, sorted(versions), errors))
+
+
+def churn(deadline):
+    """Writer side: new dataset versions and a logout on every tick."""
+    published = 0
+    while time.monotonic() + PUBLISH_EVERY_SEC < deadline:
+        time.sleep(PUBLISH_EVERY_SEC)
+        published += 1
+        dataset_store.publish(_dataset(DATASET_ROWS, published), "load-test")
+        user_id = auth.get_user_repo().get_user_by_login("user0")["id"]
+        auth.drop_runtime_session(auth.create_runtime_session(user_id))
+    return published
+
+
+def _pct(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] * 1000 if len(values) > 1 else 0.0
+
+
+def run_local():
+    os.environ.setdefault("SESSION_SECRET", "load-test")
+    with tempfile.TemporaryDirectory() as tmp:
+        tokens = seed(tmp)
+        log.info(f"👥 {REPLICAS} replicas x {SESSIONS} sessions for {DURATION_SEC:.0f} sec, dataset of {DATASET_ROWS} rows")
+        ctx = mp.get_context("spawn")
+        results = ctx.Queue()
+        deadline = time.monotonic() + DURATION_SEC
+        procs = [
+            ctx.Process(target=replica, args=(tmp, tokens[i::REPLICAS], deadline, results))
+            for i in range(REPLICAS)
+        ]
+        for p in procs:
+            p.start()
+        published = churn(deadline)
+        reports = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        close_all()
+
+    all_latencies = []
+    for pid, latencies, versions, errors in reports:
+        all_latencies += latencies
+        log.info(f"🖥 Replica {pid}: {len(latencies)} reruns, p95 {_pct(latencies, 95):.1f} ms, versions seen {len(versions)}, errors {len(errors)}")
+    log.info(f"📦 Versions published during the run: {published}")
+    log.info(f"⏱ Rerun latency: p50 {_pct(all_latencies, 50):.1f} ms, p95 {_pct(all_latencies, 95):.1f} ms")
+    log.info(f"🚀 Throughput: {len(all_latencies) / DURATION_SEC:.0f} reruns/sec")
+
+
+def run_http(url, clients):
+    """Page and health requests through the proxy; X-Upstream shows which replica answered."""
+    deadline = time.monotonic() + DURATION_SEC
+    latencies, upstreams, errors = [], Counter(), []
+    lock = threading.Lock()
+
+    def client():
+        while time.monotonic() < deadline:
+            for path in ("/", "/_stcore/health"):
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(url.rstrip("/") + path, timeout=10) as resp:
+                        resp.read()
+                        upstream = resp.headers.get("X-Upstream", "direct")
+                except OSError as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    upstreams[upstream] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    log.info(f"🌐 {url}: {len(latencies)} requests, {len(errors)} errors, {len(latencies) / DURATION_SEC:.0f} req/sec")
+    log.info(f"⏱ Latency: p50 {_pct(latencies, 50):.1f} ms, p95 {_pct(latencies, 95):.1f} ms")
+    log.info(f"🔀 Upstreams: {dict(upstreams)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for multi-replica deployment")
+    parser.add_argument("--url", help="proxy URL; without it the shared stores are tested locally")
+    parser.add_argument("--clients", type=int, default=REPLICAS * SESSIONS)
+    args = parser.parse_args()
+    if args.url:
+        run_http(args.url, args.clients)
+    else:
+        run_local()
@@ -0,0 +1,32 @@
+import argparse
+import signal
+
+from infrastructure.observability import setup_observability
+setup_observability()
+
+from use_cases.job_scheduler import JobScheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync / daily report scheduler")
+    parser.add_argument("--once", choices=["sync", "report", "retention"], help="run one job and exit")
+    args = parser.parse_args()
+
+    scheduler = JobScheduler.from_env()
+    if args.once == "sync":
+        scheduler.run_sync()
+        return
+    if args.once == "report":
+        scheduler.run_report()
+        return
+    if args.once == "retention":
+        scheduler.run_retention()
+        return
+
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
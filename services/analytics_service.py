@@ -3,6 +3,7 @@ import numpy as np
 from datetime import timedelta
 from typing import List, Dict, Any, Tuple, Optional, Union
 from use_cases.domain_models import InsightMetric
+from services import holiday_calendar, parsing_service, price_index_service, simulation_service
 
 def calculate_insights(df_curr: pd.DataFrame, df_prev: pd.DataFrame, cur_rev: float, prev_rev: float, cur_fc: float) -> List[InsightMetric]:
     """
@@ -90,23 +91,8 @@ def compute_inflation_metrics(df_scope: pd.DataFrame, df_v: pd.DataFrame) -> Tup
         return 0, 0, pd.DataFrame()
     last_prices = df_scope.sort_values('Дата_Отчета').groupby('Блюдо')['Unit_Cost'].last()
     current_prices = df_v.groupby('Блюдо')['Unit_Cost'].mean()
-
-    merged = pd.concat([last_prices, current_prices], axis=1, keys=['Old', 'New']).dropna()
-    merged['Diff'] = merged['New'] - merged['Old']
-    merged['Pct'] = (merged['Diff'] / merged['Old']) * 100
-
     qty_map = df_v.groupby('Блюдо')['Количество'].sum()
-    merged['Qty'] = qty_map
-    merged['Effect'] = merged['Diff'] * merged['Qty']
-
-    loss = merged[merged['Effect'] > 0]['Effect'].sum()
-    save = abs(merged[merged['Effect'] < 0]['Effect'].sum())
-
-    detail = merged[merged['Effect'] != 0].copy()
-    detail['Товар'] = detail.index
-    detail['Рост %'] = detail['Pct']
-    detail['Эффект (₽)'] = detail['Effect']
-    return loss, save, detail
+    return price_index_service.inflation_detail(last_prices, current_prices, qty_map, drop_infinite=False)
 
 
 def compute_supplier_stats(df: pd.DataFrame) -> pd.DataFrame:
@@ -141,6 +127,21 @@ def compute_menu_tab_data(df: pd.DataFrame, group_col: str) -> Tuple[pd.DataFram
     return cat_df, menu_df
 
 
+ABC_CLASSES = ["⭐ Звезда", "🐎 Лошадка", "❓ Загадка", "🐶 Собака"]
+
+def classify_menu_engineering(qty, unit_margin, avg_qty, avg_margin) -> np.ndarray:
+    """
+    Vectorized menu-engineering class. avg_qty/avg_margin may be scalars
+    or arrays aligned with qty (e.g. per-month means).
+    """
+    high_vol = np.asarray(qty >= avg_qty, dtype=bool)
+    high_prof = np.asarray(unit_margin >= avg_margin, dtype=bool)
+    return np.select(
+        [high_vol & high_prof, high_vol & ~high_prof, ~high_vol & high_prof],
+        ABC_CLASSES[:3],
+        default=ABC_CLASSES[3]
+    )
+
 def compute_abc_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, float, float]:
     if df.empty:
         return pd.DataFrame(), 0, 0
@@ -155,21 +156,68 @@ def compute_abc_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, float, float]:
     avg_qty = abc['Количество'].mean()
     avg_margin = abc['Unit_Margin'].mean()
 
-    def classify(row):
-        high_vol = row['Количество'] >= avg_qty
-        high_prof = row['Unit_Margin'] >= avg_margin
-        if high_vol and high_prof:
-            return "⭐ Звезда"
-        if high_vol and not high_prof:
-            return "🐎 Лошадка"
-        if not high_vol and high_prof:
-            return "❓ Загадка"
-        return "🐶 Собака"
-
-    abc['Класс'] = abc.apply(classify, axis=1)
+    abc['Класс'] = classify_menu_engineering(abc['Количество'], abc['Unit_Margin'], avg_qty, avg_margin)
     return abc, avg_qty, avg_margin
 
 
+def compute_abc_history(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Monthly ABC membership for every dish in one grouped pass.
+    Each month is classified against its own averages, same as compute_abc_data on that month.
+
+    Returns:
+        DataFrame with columns ['Месяц', 'Блюдо', 'Выручка с НДС', 'Количество', 'Себестоимость',
+        'Margin', 'Unit_Margin', 'Класс'], sorted by dish and month.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['Месяц', 'Блюдо', 'Выручка с НДС', 'Количество', 'Себестоимость', 'Margin', 'Unit_Margin', 'Класс'])
+    month = df['Дата_Отчета'].dt.to_period('M').rename('Месяц')
+    cube = df.groupby([month, 'Блюдо'])[['Выручка с НДС', 'Количество', 'Себестоимость']].sum().reset_index()
+    cube['Margin'] = cube['Выручка с НДС'] - cube['Себестоимость']
+    cube['Unit_Margin'] = cube['Margin'] / cube['Количество']
+
+    by_month = cube.groupby('Месяц')
+    avg_qty = by_month['Количество'].transform('mean')
+    avg_margin = by_month['Unit_Margin'].transform('mean')
+    cube['Класс'] = classify_menu_engineering(cube['Количество'], cube['Unit_Margin'], avg_qty, avg_margin)
+    return cube.sort_values(['Блюдо', 'Месяц']).reset_index(drop=True)
+
+
+def compute_abc_transitions(
+    history: pd.DataFrame,
+    from_class: Optional[str] = None,
+    to_class: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Class changes between consecutive months in which a dish was sold.
+
+    Args:
+        history: output of compute_abc_history
+        from_class / to_class: optional filters, e.g. "⭐ Звезда" -> "🐶 Собака"
+
+    Returns:
+        DataFrame with columns ['Блюдо', 'Месяц_с', 'Месяц_по', 'Из', 'В']
+    """
+    cols = ['Блюдо', 'Месяц_с', 'Месяц_по', 'Из', 'В']
+    if history.empty:
+        return pd.DataFrame(columns=cols)
+    hist = history.sort_values(['Блюдо', 'Месяц'])
+    by_dish = hist.groupby('Блюдо')
+    res = pd.DataFrame({
+        'Блюдо': hist['Блюдо'],
+        'Месяц_с': by_dish['Месяц'].shift(),
+        'Месяц_по': hist['Месяц'],
+        'Из': by_dish['Класс'].shift(),
+        'В': hist['Класс'],
+    })
+    res = res[res['Из'].notna() & (res['Из'] != res['В'])]
+    if from_class:
+        res = res[res['Из'] == from_class]
+    if to_class:
+        res = res[res['В'] == to_class]
+    return res[cols].reset_index(drop=True)
+
+
 def compute_weekday_stats(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     if df.empty:
         return pd.DataFrame(), pd.DataFrame()
@@ -182,6 +230,7 @@ def compute_weekday_stats(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]
     daily = df.groupby('Дата_Отчета')['Выручка с НДС'].sum().reset_index()
     daily['ДеньРус'] = daily['Дата_Отчета'].dt.weekday.map(ru_days)
     daily['Дата_Подпись'] = daily['Дата_Отчета'].dt.strftime('%d.%m')
+    daily['Праздник'] = holiday_calendar.lookup(daily['Дата_Отчета'])['is_holiday'].to_numpy()
 
     dates_per_weekday = df[['Дата_Отчета']].drop_duplicates()
     dates_per_weekday['Day'] = dates_per_weekday['Дата_Отчета'].dt.weekday.map(ru_days)
@@ -220,31 +269,9 @@ def compute_purchase_plan(df: pd.DataFrame, days: int, safety: int) -> pd.DataFr
 def compute_simulation(df: pd.DataFrame, cats: List[str], d_price: float, d_cost: float, d_vol: float) -> Optional[Dict[str, float]]:
     if df.empty:
         return None
-    mask = df['Категория'].isin(cats)
-    target = df[mask].copy()
-    other = df[~mask].copy()
-
-    base_rev = df['Выручка с НДС'].sum()
-    base_cost = df['Себестоимость'].sum()
-    base_margin = base_rev - base_cost
-
-    sim_rev_target = target['Выручка с НДС'].sum() * (1 + d_price/100) * (1 + d_vol/100)
-    sim_cost_target = target['Себестоимость'].sum() * (1 + d_cost/100) * (1 + d_vol/100)
-
-    sim_rev = other['Выручка с НДС'].sum() + sim_rev_target
-    sim_cost = other['Себестоимость'].sum() + sim_cost_target
-    sim_margin = sim_rev - sim_cost
-
-    return {
-        'base_revenue': base_rev,
-        'base_margin': base_margin,
-        'sim_revenue': sim_rev,
-        'sim_margin': sim_margin,
-        'diff_rev': sim_rev - base_rev,
-        'diff_margin': sim_margin - base_margin,
-        'old_profitability': (base_margin / base_rev * 100) if base_rev else 0,
-        'new_profitability': (sim_margin / sim_rev * 100) if sim_rev else 0
-    }
+    totals = simulation_service.precompute_category_totals(df)
+    res = simulation_service.evaluate_scenarios(totals, cats, d_price, d_cost, d_vol)
+    return {k: float(v) for k, v in res.items()}
 
 def get_unique_ingredients(recipes_db: Dict[str, List[Dict[str, Any]]]) -> List[str]:
     """
@@ -276,61 +303,33 @@ def simulate_forecast(
     if not recipes_db or not ingredient_deltas or df_current.empty:
         return pd.DataFrame()
 
-    dish_impacts = {}
-
-    # 1. Calculate impact per dish based on recipes
-    for dish_name, ingredients in recipes_db.items():
-        # Recipe dish names are typically normalized (lowercase) by parsing_service
-        # But we ensure it here just in case
-        norm_dish = str(dish_name).lower().strip()
-        
-        impact = 0.0
-        for ing in ingredients:
-            ing_name = ing.get('ingredient') # normalized by parsing_service
-            qty = ing.get('qty_per_dish', 0)
-            
-            # check if this ingredient has a price increase
-            if ing_name in ingredient_deltas:
-                delta = ingredient_deltas[ing_name]
-                impact += qty * delta
-        
-        if impact > 0:
-            dish_impacts[norm_dish] = impact
-
-    if not dish_impacts:
+    # 1. Impact per dish: one sparse product over the dish x ingredient matrix
+    matrix = simulation_service.get_recipe_matrix(recipes_db)
+    impacts = simulation_service.dish_cost_impacts(
+        matrix, simulation_service.delta_vector(matrix, ingredient_deltas)
+    )
+    dish_impacts = pd.Series(impacts, index=list(matrix.dishes))
+    dish_impacts = dish_impacts[dish_impacts > 0]
+    if dish_impacts.empty:
         return pd.DataFrame()
 
-    # 2. Map impact to existing dishes in DataFrame
-    # Create a normalized lookup column for sales data
-    df_work = df_current.copy()
-    df_work['dish_norm'] = df_work['Блюдо'].astype(str).str.lower().str.strip()
-    
-    # Filter only relevant dishes using normalized names
-    affected_mask = df_work['dish_norm'].isin(dish_impacts.keys())
-    affected_dishes = df_work[affected_mask].copy()
-    
-    if affected_dishes.empty:
+    # 2. Map impact to sales rows via normalized names (normalized once per unique dish)
+    codes, uniques = pd.factorize(df_current['Блюдо'].astype(str))
+    unique_impacts = dish_impacts.reindex([parsing_service.normalize_name(u) for u in uniques]).to_numpy()
+    row_impacts = unique_impacts[codes]
+    affected_mask = ~np.isnan(row_impacts)
+    if not affected_mask.any():
         return pd.DataFrame()
-        
-    results = []
-    
-    for _, row in affected_dishes.iterrows():
-        dish_display = row['Блюдо']
-        dish_norm = row['dish_norm']
-        
-        current_cost = row.get('Unit_Cost', 0)
-        # Look up impact using normalized key
-        impact = dish_impacts.get(dish_norm, 0)
-        
-        new_cost = current_cost + impact
-        qty = row.get('Количество', 0)
-        
-        results.append({
-            'Блюдо': dish_display,
-            'Текущая с/с': current_cost,
-            'Рост с/с': impact,
-            'Новая с/с': new_cost,
-            'Количество': qty
-        })
-        
-    return pd.DataFrame(results)
+
+    affected = df_current[affected_mask]
+    impact = row_impacts[affected_mask]
+    current_cost = affected['Unit_Cost'].to_numpy() if 'Unit_Cost' in affected.columns else np.zeros(len(affected))
+    qty = affected['Количество'].to_numpy() if 'Количество' in affected.columns else np.zeros(len(affected))
+
+    return pd.DataFrame({
+        'Блюдо': affected['Блюдо'].to_numpy(),
+        'Текущая с/с': current_cost,
+        'Рост с/с': impact,
+        'Новая с/с': current_cost + impact,
+        'Количество': qty
+    })
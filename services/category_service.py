@@ -1,15 +1,24 @@
+import hashlib
 import json
 import os
+import re
+import uuid
 import requests
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import logging
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Iterable, Optional, Set, Union
 from services import parsing_service
+from infrastructure.storage.yandex_disk_storage import YandexDiskStorage, write_file_atomic
 
 log = logging.getLogger(__name__)
 
 MAPPING_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "categories.json")
 YANDEX_MAPPING_PATH = "RestoAnalytic/categories.json"
+# Persisted dish -> (category, macro) dimension table, versioned by config hash
+CATEGORY_TABLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "category_assignments.parquet")
 
 DEFAULT_CATEGORIES = [
     "🍔 Еда (Кухня)", "![Cocktail](data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHZpZXdCb3g9IjAgMCA2NCA2NCIgd2lkdGg9IjY0IiBoZWlnaHQ9IjY0Ij4gIDxkZWZzPiAgICA8bGluZWFyR3JhZGllbnQgaWQ9ImdsQmFzZSIgeDE9IjAlIiB5MT0iMCUiIHgyPSIxMDAlIiB5Mj0iMTAwJSI+ICAgICAgPHN0b3Agb2Zmc2V0PSIwJSIgc3RvcC1jb2xvcj0iIzJhMmEyYSIgc3RvcC1vcGFjaXR5PSIwLjgiLz4gICAgICA8c3RvcCBvZmZzZXQ9IjEwMCUiIHN0b3AtY29sb3I9IiMwNTA1MDUiIHN0b3Atb3BhY2l0eT0iMC45Ii8+ICAgIDwvbGluZWFyR3JhZGllbnQ+ICAgIDxsaW5lYXJHcmFkaWVudCBpZD0iZ2xIaWdobGlnaHQiIHgxPSIwJSIgeTE9IjAlIiB4Mj0iMCUiIHkyPSIxMDAlIj4gICAgICA8c3RvcCBvZmZzZXQ9IjAlIiBzdG9wLWNvbG9yPSIjZmZmZmZmIiBzdG9wLW9wYWNpdHk9IjAuMyIvPiAgICAgIDxzdG9wIG9mZnNldD0iNTAlIiBzdG9wLWNvbG9yPSIjZmZmZmZmIiBzdG9wLW9wYWNpdHk9IjAuMCIvPiAgICA8L2xpbmVhckdyYWRpZW50PiAgICA8ZmlsdGVyIGlkPSJnbG93ZmYwMDg4IiB4PSItMjAlIiB5PSItMjAlIiB3aWR0aD0iMTQwJSIgaGVpZ2h0PSIxNDAlIj4gICAgICA8ZmVHYXVzc2lhbkJsdXIgc3RkRGV2aWF0aW9uPSIzIiByZXN1bHQ9ImJsdXIiIC8+ICAgICAgPGZlQ29tcG9zaXRlIGluPSJTb3VyY2VHcmFwaGljIiBpbjI9ImJsdXIiIG9wZXJhdG9yPSJvdmVyIiAvPiAgICA8L2ZpbHRlcj4gIDwvZGVmcz4gICAgPCEtLSBPdXRlciBnbGFzcyBib3VuZGFyeSAmIGRyb3Agc2hhZG93IC0tPiAgPHJlY3QgeD0iNCIgeT0iNCIgd2lkdGg9IjU2IiBoZWlnaHQ9IjU2IiByeD0iMTQiIGZpbGw9InVybCgjZ2xCYXNlKSIvPiAgPHJlY3QgeD0iNCIgeT0iNCIgd2lkdGg9IjU2IiBoZWlnaHQ9IjU2IiByeD0iMTQiIGZpbGw9InVybCgjZ2xIaWdobGlnaHQpIi8+ICAgIDwhLS0gR2xhc3MgaW5uZXIgcmltICh0b3AgcmltIGhpZ2hsaWdodCB0byBtYWtlIGl0IDNEKSAtLT4gIDxwYXRoIGQ9Ik0gMTYsNCBMIDQ4LDQgQyA1NSw0IDYwLDkgNjAsMTYiIGZpbGw9Im5vbmUiIHN0cm9rZT0iI2ZmZmZmZiIgc3Ryb2tlLW9wYWNpdHk9IjAuNCIgc3Ryb2tlLXdpZHRoPSIxLjUiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIvPiAgPCEtLSBHbGFzcyBib3R0b20gcmltIHJlZmxlY3Rpb24gLS0+ICA8cGF0aCBkPSJNIDQsNDggQyA0LDU1IDksNjAgMTYsNjAgTCA0OCw2MCIgZmlsbD0ibm9uZSIgc3Ryb2tlPSIjZmZmZmZmIiBzdHJva2Utb3BhY2l0eT0iMC4xIiBzdHJva2Utd2lkdGg9IjEiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIvPiAgICA8IS0tIElubmVyIEljb24gQ2VudGVyZWQgLS0+ICA8ZyB0cmFuc2Zvcm09InRyYW5zbGF0ZSgxNiwgMTYpIHNjYWxlKDEuMzMzKSI+ICAgIDxnIGZpbHRlcj0idXJsKCNnbG93ZmYwMDg4KSIgc3Ryb2tlPSIjZmYwMDg4IiBzdHJva2Utd2lkdGg9IjIiIGZpbGw9Im5vbmUiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIgc3Ryb2tlLWxpbmVqb2luPSJyb3VuZCI+ICAgICAgPHBhdGggZD0iTTggMjJoOCIvPjxwYXRoIGQ9Ik0xMiAxMXYxMSIvPjxwYXRoIGQ9Im0xOSAzLTcgOC03LThaIi8+ICAgIDwvZz4gICAgPCEtLSBTaGFycCB3aGl0ZSBjb3JlIGZvciB0aGUgbmVvbiB0dWJlIGVmZmVjdCAtLT4gICAgPGcgc3Ryb2tlPSIjZmZmZmZmIiBzdHJva2Utd2lkdGg9IjEiIGZpbGw9Im5vbmUiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIgc3Ryb2tlLWxpbmVqb2luPSJyb3VuZCI+ICAgICAgPHBhdGggZD0iTTggMjJoOCIvPjxwYXRoIGQ9Ik0xMiAxMXYxMSIvPjxwYXRoIGQ9Im0xOSAzLTcgOC03LThaIi8+ICAgIDwvZz4gIDwvZz48L3N2Zz4=) Коктейли", "![Coffee](data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHZpZXdCb3g9IjAgMCA2NCA2NCIgd2lkdGg9IjY0IiBoZWlnaHQ9IjY0Ij4gIDxkZWZzPiAgICA8bGluZWFyR3JhZGllbnQgaWQ9ImdsQmFzZSIgeDE9IjAlIiB5MT0iMCUiIHgyPSIxMDAlIiB5Mj0iMTAwJSI+ICAgICAgPHN0b3Agb2Zmc2V0PSIwJSIgc3RvcC1jb2xvcj0iIzJhMmEyYSIgc3RvcC1vcGFjaXR5PSIwLjgiLz4gICAgICA8c3RvcCBvZmZzZXQ9IjEwMCUiIHN0b3AtY29sb3I9IiMwNTA1MDUiIHN0b3Atb3BhY2l0eT0iMC45Ii8+ICAgIDwvbGluZWFyR3JhZGllbnQ+ICAgIDxsaW5lYXJHcmFkaWVudCBpZD0iZ2xIaWdobGlnaHQiIHgxPSIwJSIgeTE9IjAlIiB4Mj0iMCUiIHkyPSIxMDAlIj4gICAgICA8c3RvcCBvZmZzZXQ9IjAlIiBzdG9wLWNvbG9yPSIjZmZmZmZmIiBzdG9wLW9wYWNpdHk9IjAuMyIvPiAgICAgIDxzdG9wIG9mZnNldD0iNTAlIiBzdG9wLWNvbG9yPSIjZmZmZmZmIiBzdG9wLW9wYWNpdHk9IjAuMCIvPiAgICA8L2xpbmVhckdyYWRpZW50PiAgICA8ZmlsdGVyIGlkPSJnbG93ZmZhYTAwIiB4PSItMjAlIiB5PSItMjAlIiB3aWR0aD0iMTQwJSIgaGVpZ2h0PSIxNDAlIj4gICAgICA8ZmVHYXVzc2lhbkJsdXIgc3RkRGV2aWF0aW9uPSIzIiByZXN1bHQ9ImJsdXIiIC8+ICAgICAgPGZlQ29tcG9zaXRlIGluPSJTb3VyY2VHcmFwaGljIiBpbjI9ImJsdXIiIG9wZXJhdG9yPSJvdmVyIiAvPiAgICA8L2ZpbHRlcj4gIDwvZGVmcz4gICAgPCEtLSBPdXRlciBnbGFzcyBib3VuZGFyeSAmIGRyb3Agc2hhZG93IC0tPiAgPHJlY3QgeD0iNCIgeT0iNCIgd2lkdGg9IjU2IiBoZWlnaHQ9IjU2IiByeD0iMTQiIGZpbGw9InVybCgjZ2xCYXNlKSIvPiAgPHJlY3QgeD0iNCIgeT0iNCIgd2lkdGg9IjU2IiBoZWlnaHQ9IjU2IiByeD0iMTQiIGZpbGw9InVybCgjZ2xIaWdobGlnaHQpIi8+ICAgIDwhLS0gR2xhc3MgaW5uZXIgcmltICh0b3AgcmltIGhpZ2hsaWdodCB0byBtYWtlIGl0IDNEKSAtLT4gIDxwYXRoIGQ9Ik0gMTYsNCBMIDQ4LDQgQyA1NSw0IDYwLDkgNjAsMTYiIGZpbGw9Im5vbmUiIHN0cm9rZT0iI2ZmZmZmZiIgc3Ryb2tlLW9wYWNpdHk9IjAuNCIgc3Ryb2tlLXdpZHRoPSIxLjUiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIvPiAgPCEtLSBHbGFzcyBib3R0b20gcmltIHJlZmxlY3Rpb24gLS0+ICA8cGF0aCBkPSJNIDQsNDggQyA0LDU1IDksNjAgMTYsNjAgTCA0OCw2MCIgZmlsbD0ibm9uZSIgc3Ryb2tlPSIjZmZmZmZmIiBzdHJva2Utb3BhY2l0eT0iMC4xIiBzdHJva2Utd2lkdGg9IjEiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIvPiAgICA8IS0tIElubmVyIEljb24gQ2VudGVyZWQgLS0+ICA8ZyB0cmFuc2Zvcm09InRyYW5zbGF0ZSgxNiwgMTYpIHNjYWxlKDEuMzMzKSI+ICAgIDxnIGZpbHRlcj0idXJsKCNnbG93ZmZhYTAwKSIgc3Ryb2tlPSIjZmZhYTAwIiBzdHJva2Utd2lkdGg9IjIiIGZpbGw9Im5vbmUiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIgc3Ryb2tlLWxpbmVqb2luPSJyb3VuZCI+ICAgICAgPHBhdGggZD0iTTE4IDhoMWE0IDQgMCAwIDEgMCA4aC0xIi8+PHBhdGggZD0iTTIgOGgxNnY5YTQgNCAwIDAgMS00IDRINmE0IDQgMCAwIDEtNC00Vjh6Ii8+PGxpbmUgeDE9IjYiIHkxPSIxIiB4Mj0iNiIgeTI9IjQiLz48bGluZSB4MT0iMTAiIHkxPSIxIiB4Mj0iMTAiIHkyPSI0Ii8+PGxpbmUgeDE9IjE0IiB5MT0iMSIgeDI9IjE0IiB5Mj0iNCIvPiAgICA8L2c+ICAgIDwhLS0gU2hhcnAgd2hpdGUgY29yZSBmb3IgdGhlIG5lb24gdHViZSBlZmZlY3QgLS0+ICAgIDxnIHN0cm9rZT0iI2ZmZmZmZiIgc3Ryb2tlLXdpZHRoPSIxIiBmaWxsPSJub25lIiBzdHJva2UtbGluZWNhcD0icm91bmQiIHN0cm9rZS1saW5lam9pbj0icm91bmQiPiAgICAgIDxwYXRoIGQ9Ik0xOCA4aDFhNCA0IDAgMCAxIDAgOGgtMSIvPjxwYXRoIGQ9Ik0yIDhoMTZ2OWE0IDQgMCAwIDEtNCA0SDZhNCA0IDAgMCAxLTQtNFY4eiIvPjxsaW5lIHgxPSI2IiB5MT0iMSIgeDI9IjYiIHkyPSI0Ii8+PGxpbmUgeDE9IjEwIiB5MT0iMSIgeDI9IjEwIiB5Mj0iNCIvPjxsaW5lIHgxPSIxNCIgeTE9IjEiIHgyPSIxNCIgeTI9IjQiLz4gICAgPC9nPiAgPC9nPjwvc3ZnPg==) Кофе", "🍵 Чай", "![Beer](data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHZpZXdCb3g9IjAgMCA2NCA2NCIgd2lkdGg9IjY0IiBoZWlnaHQ9IjY0Ij4gIDxkZWZzPiAgICA8bGluZWFyR3JhZGllbnQgaWQ9ImdsQmFzZSIgeDE9IjAlIiB5MT0iMCUiIHgyPSIxMDAlIiB5Mj0iMTAwJSI+ICAgICAgPHN0b3Agb2Zmc2V0PSIwJSIgc3RvcC1jb2xvcj0iIzJhMmEyYSIgc3RvcC1vcGFjaXR5PSIwLjgiLz4gICAgICA8c3RvcCBvZmZzZXQ9IjEwMCUiIHN0b3AtY29sb3I9IiMwNTA1MDUiIHN0b3Atb3BhY2l0eT0iMC45Ii8+ICAgIDwvbGluZWFyR3JhZGllbnQ+ICAgIDxsaW5lYXJHcmFkaWVudCBpZD0iZ2xIaWdobGlnaHQiIHgxPSIwJSIgeTE9IjAlIiB4Mj0iMCUiIHkyPSIxMDAlIj4gICAgICA8c3RvcCBvZmZzZXQ9IjAlIiBzdG9wLWNvbG9yPSIjZmZmZmZmIiBzdG9wLW9wYWNpdHk9IjAuMyIvPiAgICAgIDxzdG9wIG9mZnNldD0iNTAlIiBzdG9wLWNvbG9yPSIjZmZmZmZmIiBzdG9wLW9wYWNpdHk9IjAuMCIvPiAgICA8L2xpbmVhckdyYWRpZW50PiAgICA8ZmlsdGVyIGlkPSJnbG93ZmZlZTAwIiB4PSItMjAlIiB5PSItMjAlIiB3aWR0aD0iMTQwJSIgaGVpZ2h0PSIxNDAlIj4gICAgICA8ZmVHYXVzc2lhbkJsdXIgc3RkRGV2aWF0aW9uPSIzIiByZXN1bHQ9ImJsdXIiIC8+ICAgICAgPGZlQ29tcG9zaXRlIGluPSJTb3VyY2VHcmFwaGljIiBpbjI9ImJsdXIiIG9wZXJhdG9yPSJvdmVyIiAvPiAgICA8L2ZpbHRlcj4gIDwvZGVmcz4gICAgPCEtLSBPdXRlciBnbGFzcyBib3VuZGFyeSAmIGRyb3Agc2hhZG93IC0tPiAgPHJlY3QgeD0iNCIgeT0iNCIgd2lkdGg9IjU2IiBoZWlnaHQ9IjU2IiByeD0iMTQiIGZpbGw9InVybCgjZ2xCYXNlKSIvPiAgPHJlY3QgeD0iNCIgeT0iNCIgd2lkdGg9IjU2IiBoZWlnaHQ9IjU2IiByeD0iMTQiIGZpbGw9InVybCgjZ2xIaWdobGlnaHQpIi8+ICAgIDwhLS0gR2xhc3MgaW5uZXIgcmltICh0b3AgcmltIGhpZ2hsaWdodCB0byBtYWtlIGl0IDNEKSAtLT4gIDxwYXRoIGQ9Ik0gMTYsNCBMIDQ4LDQgQyA1NSw0IDYwLDkgNjAsMTYiIGZpbGw9Im5vbmUiIHN0cm9rZT0iI2ZmZmZmZiIgc3Ryb2tlLW9wYWNpdHk9IjAuNCIgc3Ryb2tlLXdpZHRoPSIxLjUiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIvPiAgPCEtLSBHbGFzcyBib3R0b20gcmltIHJlZmxlY3Rpb24gLS0+ICA8cGF0aCBkPSJNIDQsNDggQyA0LDU1IDksNjAgMTYsNjAgTCA0OCw2MCIgZmlsbD0ibm9uZSIgc3Ryb2tlPSIjZmZmZmZmIiBzdHJva2Utb3BhY2l0eT0iMC4xIiBzdHJva2Utd2lkdGg9IjEiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIvPiAgICA8IS0tIElubmVyIEljb24gQ2VudGVyZWQgLS0+ICA8ZyB0cmFuc2Zvcm09InRyYW5zbGF0ZSgxNiwgMTYpIHNjYWxlKDEuMzMzKSI+ICAgIDxnIGZpbHRlcj0idXJsKCNnbG93ZmZlZTAwKSIgc3Ryb2tlPSIjZmZlZTAwIiBzdHJva2Utd2lkdGg9IjIiIGZpbGw9Im5vbmUiIHN0cm9rZS1saW5lY2FwPSJyb3VuZCIgc3Ryb2tlLWxpbmVqb2luPSJyb3VuZCI+ICAgICAgPHBhdGggZD0ibTYgOCAxLjc1IDEyLjI4QTIgMiAwIDAgMCA5Ljc0IDIyaDQuNTJhMiAyIDAgMCAwIDEuOTktMS43MkwxOCA4Ii8+PHBhdGggZD0iTTUgOGgxNCIvPjxwYXRoIGQ9Ik03IDUgNiA4Ii8+PHBhdGggZD0iTTE3IDUgMTggOCIvPjxwYXRoIGQ9Ik0xMiA1VjIiLz4gICAgPC9nPiAgICA8IS0tIFNoYXJwIHdoaXRlIGNvcmUgZm9yIHRoZSBuZW9uIHR1YmUgZWZmZWN0IC0tPiAgICA8ZyBzdHJva2U9IiNmZmZmZmYiIHN0cm9rZS13aWR0aD0iMSIgZmlsbD0ibm9uZSIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIj4gICAgICA8cGF0aCBkPSJtNiA4IDEuNzUgMTIuMjhBMiAyIDAgMCAwIDkuNzQgMjJoNC41MmEyIDIgMCAwIDAgMS45OS0xLjcyTDE4IDgiLz48cGF0aCBkPSJNNSA4aDE0Ii8+PHBhdGggZD0iTTcgNSA2IDgiLz48cGF0aCBkPSJNMTcgNSAxOCA4Ii8+PHBhdGggZD0iTTEyIDVWMiIvPiAgICA8L2c+ICA8L2c+PC9zdmc+) Пиво Розлив", "💧 Водка",
@@ -30,9 +39,14 @@ def load_categories() -> Dict[str, str]:
             return {}
     return {}
 
+def _changed_keys(old: Dict[str, str], new: Dict[str, str]) -> Set[str]:
+    return {k for k in set(old) | set(new) if old.get(k) != new.get(k)}
+
 def save_categories(new_map: Dict[str, str]) -> Dict[str, str]:
     """Save category mapping to local JSON."""
     current = load_categories()
+    previous_version = category_config_version()
+    changed = _changed_keys(current, {**current, **new_map})
     current.update(new_map)
     try:
         with open(MAPPING_FILE, 'w', encoding='utf-8') as f:
@@ -40,15 +54,19 @@ def save_categories(new_map: Dict[str, str]) -> Dict[str, str]:
             log.info(f"Updated categories saved to {MAPPING_FILE}")
     except Exception as e:
         log.error(f"Error saving categories: {e}")
+    _patch_category_table(changed, previous_version)
     return current
 
 def save_categories_full(full_map: Dict[str, str]) -> Dict[str, str]:
     """Overwrite full category mapping JSON."""
+    previous_version = category_config_version()
+    changed = _changed_keys(load_categories(), full_map)
     try:
         with open(MAPPING_FILE, 'w', encoding='utf-8') as f:
             json.dump(full_map, f, ensure_ascii=False, indent=4)
     except Exception as e:
         log.error(f"Error saving full categories: {e}")
+    _patch_category_table(changed, previous_version)
     return full_map
 
 def get_all_known_categories() -> List[str]:
@@ -59,11 +77,16 @@ def get_all_known_categories() -> List[str]:
         cats.update(mapping.values())
     return sorted(list(cats))
 
-def sync_from_yandex(token: str, remote_path: str = YANDEX_MAPPING_PATH) -> bool:
-    """Download categories.json from Yandex Disk."""
+def sync_from_yandex(token: str, remote_path: str = YANDEX_MAPPING_PATH, force: bool = False) -> bool:
+    """Download categories.json from Yandex Disk (skipped when the cloud copy is unchanged, unless force)."""
     if not token: return False
     headers = {'Authorization': f'OAuth {token}'}
+    storage = YandexDiskStorage()
     try:
+        remote_info = storage.get_file_info(remote_path, token)
+        if not force and os.path.exists(MAPPING_FILE) and storage.is_same_remote(remote_info, storage.read_sync_meta(MAPPING_FILE)):
+            log.info("Remote categories unchanged, skipping download.")
+            return True
         # Get download link
         resp = requests.get(
             "https://cloud-api.yandex.net/v1/disk/resources/download",
@@ -90,14 +113,17 @@ def sync_from_yandex(token: str, remote_path: str = YANDEX_MAPPING_PATH) -> bool
                     remote_data = {}
 
                 local_data = load_categories()
+                previous_version = category_config_version()
                 
                 # Merge logic: Local (base) + Remote (updates). 
                 # Remote entries MUST overwrite local ones to ensure we get the latest state from cloud.
                 merged = local_data.copy()
                 merged.update(remote_data)
                 
-                with open(MAPPING_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(merged, f, ensure_ascii=False, indent=4)
+                write_file_atomic(MAPPING_FILE, json.dumps(merged, ensure_ascii=False, indent=4).encode('utf-8'))
+                if remote_info:
+                    storage.write_sync_meta(MAPPING_FILE, remote_info)
+                _patch_category_table(_changed_keys(local_data, merged), previous_version)
                 log.info("Synced from Yandex successfully.")
                 return True
         elif resp.status_code == 404:
@@ -127,6 +153,7 @@ def sync_to_yandex(token: str, remote_path: str = YANDEX_MAPPING_PATH) -> bool:
                 up = requests.put(href, data=f)
                 if up.status_code in [201, 202]:
                     log.info("Synced to Yandex successfully.")
+                    YandexDiskStorage().mark_synced(remote_path, MAPPING_FILE, token)
                     return True
                 else:
                     log.error(f"Upload failed: {up.status_code} {up.text}")
@@ -155,13 +182,113 @@ def load_config() -> Dict[str, Any]:
             return {}
     return {}
 
-def get_macro_category(cat: str) -> str:
+PRIORITY_ORDER = [
+     "🍔 Еда (Кухня)", "🍬 Доп. ингредиенты", "☕ Кофе", "🍵 Чай", 
+     "🍓 Милк/Фреш/Смузи", "🧉 Коктейль Б/А", "🚰 Розлив Б/А", "🥤 Стекло/Банка Б/А",
+     "🍏 Сидр ШТ", "🍾 Пиво ШТ", "🍺 Пиво Розлив", "🥃 Виски", "💧 Водка",
+     "🏴‍☠️ Ром", "🌵 Текила", "🌲 Джин", "🍇 Коньяк/Бренди", "🍒 Ликер/Настойка",
+     "🍷 Вино", "🍹 Коктейли"
+]
+FALLBACK_CATEGORY = '📦 Прочее'
+
+
+class KeywordMatcher:
+    """
+    All category keywords and exclusions compiled into one regex.
+
+    Semantics match the old per-category loop: a category hits when any of its
+    keywords is a substring of the name and none of its exclusions is;
+    the first hit in priority order wins. Categories are bits in a mask.
+    """
+
+    def __init__(self, priority: List[str], categories: Dict[str, List[str]], exclusions: Dict[str, List[str]]):
+        self.priority = list(priority)
+        masks: Dict[str, List[int]] = {}  # pattern -> [keyword_mask, exclusion_mask]
+        self.always_kw = 0
+        self.always_ex = 0
+        for i, cat in enumerate(self.priority):
+            bit = 1 << i
+            for kw in categories.get(cat, []) or []:
+                if kw == "":
+                    self.always_kw |= bit
+                else:
+                    masks.setdefault(kw, [0, 0])[0] |= bit
+            for ex in exclusions.get(cat, []) or []:
+                if ex == "":
+                    self.always_ex |= bit
+                else:
+                    masks.setdefault(ex, [0, 0])[1] |= bit
+
+        # The trie regex reports only the longest pattern at each position;
+        # fold in masks of every pattern that is its prefix.
+        self._closure: Dict[str, tuple] = {}
+        for p in masks:
+            kw_mask, ex_mask = 0, 0
+            for q, (k, e) in masks.items():
+                if p.startswith(q):
+                    kw_mask |= k
+                    ex_mask |= e
+            self._closure[p] = (kw_mask, ex_mask)
+        self._regex = re.compile("(?=(" + _trie_pattern(masks) + "))") if masks else None
+        self._memo: Dict[str, Optional[str]] = {}
+
+    def match(self, text: str) -> Optional[str]:
+        if text in self._memo:
+            return self._memo[text]
+        kw_mask, ex_mask = self.always_kw, self.always_ex
+        if self._regex is not None:
+            for m in self._regex.finditer(text):
+                k, e = self._closure[m.group(1)]
+                kw_mask |= k
+                ex_mask |= e
+        hits = kw_mask & ~ex_mask
+        result = self.priority[(hits & -hits).bit_length() - 1] if hits else None
+        if len(self._memo) >= _MATCH_MEMO_LIMIT:
+            self._memo.clear()
+        self._memo[text] = result
+        return result
+
+
+_MATCH_MEMO_LIMIT = 200_000
+
+def _trie_pattern(words) -> str:
+    """Regex for a set of literals shaped as a trie; greedy, so the longest literal wins."""
+    trie: Dict[str, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+_MATCHER_CACHE = None  # (config, KeywordMatcher, macro_lookup)
+
+def _get_compiled_config():
+    global _MATCHER_CACHE
     config = load_config()
-    macro_map = config.get("macro_categories", {})
-    for macro, subcats in macro_map.items():
-        if cat in subcats:
-            return macro
-    return cat
+    if _MATCHER_CACHE is None or _MATCHER_CACHE[0] is not config:
+        matcher = KeywordMatcher(PRIORITY_ORDER, config.get("categories", {}), config.get("exclusions", {}))
+        macro_lookup = {}
+        for macro, subcats in config.get("macro_categories", {}).items():
+            for cat in subcats:
+                macro_lookup.setdefault(cat, macro)
+        _MATCHER_CACHE = (config, matcher, macro_lookup)
+    return _MATCHER_CACHE
+
+def get_keyword_matcher() -> KeywordMatcher:
+    return _get_compiled_config()[1]
+
+def get_macro_category(cat: str) -> str:
+    return _get_compiled_config()[2].get(cat, cat)
 
 def detect_category_granular(name_input: Union[str, Any], mapping: Optional[Dict[str, str]] = None) -> str:
     name = parsing_service.normalize_name(str(name_input))
@@ -174,58 +301,145 @@ def detect_category_granular(name_input: Union[str, Any], mapping: Optional[Dict
         if raw_name in mapping:
              return mapping[raw_name]
 
-    # 2. CONFIG KEYWORDS
-    config = load_config()
-    
-    def check_keywords(text, keyword_list, exclusions=None):
-        if not keyword_list: return False
-        for k in keyword_list:
-            if k in text:
-                if exclusions:
-                    if any(ex in text for ex in exclusions):
-                        continue
-                return True
-        return False
-
-    categories = config.get("categories", {})
-    exclusions = config.get("exclusions", {})
-
-    priority_order = [
-         "🍔 Еда (Кухня)", "🍬 Доп. ингредиенты", "☕ Кофе", "🍵 Чай", 
-         "🍓 Милк/Фреш/Смузи", "🧉 Коктейль Б/А", "🚰 Розлив Б/А", "🥤 Стекло/Банка Б/А",
-         "🍏 Сидр ШТ", "🍾 Пиво ШТ", "🍺 Пиво Розлив", "🥃 Виски", "💧 Водка",
-         "🏴‍☠️ Ром", "🌵 Текила", "🌲 Джин", "🍇 Коньяк/Бренди", "🍒 Ликер/Настойка",
-         "🍷 Вино", "🍹 Коктейли"
-    ]
-    
-    for cat_name in priority_order:
-        keywords = categories.get(cat_name, [])
-        cat_exclusions = exclusions.get(cat_name, [])
-        if check_keywords(name, keywords, cat_exclusions):
-            return cat_name
+    # 2. CONFIG KEYWORDS (compiled once)
+    return get_keyword_matcher().match(name) or FALLBACK_CATEGORY
+
+# --- CATEGORY ASSIGNMENT TABLE ---
+
+_TABLE_COLUMNS = ['Категория', 'Макро_Категория']
+_TABLE_CACHE = None  # (version, DataFrame indexed by 'Блюдо')
+
+def category_config_version() -> str:
+    """Hash of categories.json + keywords.json: any change invalidates stored assignments."""
+    h = hashlib.sha256()
+    for path in (MAPPING_FILE, CONFIG_FILE):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+def _empty_category_table() -> pd.DataFrame:
+    return pd.DataFrame(columns=_TABLE_COLUMNS, index=pd.Index([], name='Блюдо', dtype=object), dtype=object)
+
+def _read_category_table(version: str) -> Optional[pd.DataFrame]:
+    if not os.path.exists(CATEGORY_TABLE_FILE):
+        return None
+    try:
+        meta = pq.read_schema(CATEGORY_TABLE_FILE).metadata or {}
+        if meta.get(b"category_version", b"").decode() != version:
+            return None
+        return pd.read_parquet(CATEGORY_TABLE_FILE).set_index('Блюдо')
+    except Exception as e:
+        log.warning(f"⚠️ Category table unreadable, rebuilding: {e}")
+        return None
+
+def _save_category_table(version: str, table: pd.DataFrame) -> None:
+    global _TABLE_CACHE
+    _TABLE_CACHE = (version, table)
+    try:
+        pa_table = pa.Table.from_pandas(table.reset_index(), preserve_index=False)
+        pa_table = pa_table.replace_schema_metadata({
+            **(pa_table.schema.metadata or {}),
+            b"category_version": version.encode(),
+        })
+        # Unique temp name: sessions/replicas saving at once must not share a file
+        tmp_path = f"{CATEGORY_TABLE_FILE}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            pq.write_table(pa_table, tmp_path)
+            os.replace(tmp_path, CATEGORY_TABLE_FILE)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    except Exception as e:
+        log.error(f"Error saving category table: {e}")
+
+def load_category_table() -> pd.DataFrame:
+    """Dish -> (category, macro) table valid for the current config version."""
+    global _TABLE_CACHE
+    version = category_config_version()
+    if _TABLE_CACHE is not None and _TABLE_CACHE[0] == version:
+        return _TABLE_CACHE[1]
+    table = _read_category_table(version)
+    if table is None:
+        table = _empty_category_table()
+    _TABLE_CACHE = (version, table)
+    return table
 
-    return '📦 Прочее'
+def _detect_rows(names: Iterable[str], mapping: Dict[str, str]) -> pd.DataFrame:
+    names = list(names)
+    cats = [detect_category_granular(name, mapping) for name in names]
+    return pd.DataFrame(
+        {'Категория': cats, 'Макро_Категория': [get_macro_category(c) for c in cats]},
+        index=pd.Index(names, name='Блюдо', dtype=object),
+    )
+
+def resolve_categories(names: Iterable[str]) -> pd.DataFrame:
+    """Table rows for the given dish names; unseen names are detected once and persisted."""
+    table = load_category_table()
+    missing = pd.Index(list(names), dtype=object).unique().difference(table.index)
+    if len(missing):
+        new_rows = _detect_rows(missing, load_categories())
+        table = new_rows if table.empty else pd.concat([table, new_rows])
+        _save_category_table(_TABLE_CACHE[0], table)
+    return table
+
+def _affected_names(names: pd.Index, keys: Set[str]) -> pd.Index:
+    """Dish names whose mapping lookup (normalized or raw) hits one of the keys."""
+    if not keys or len(names) == 0:
+        return names[:0]
+    norm = names.map(lambda n: parsing_service.normalize_name(str(n)))
+    return names[norm.isin(keys) | names.isin(keys)]
+
+def _patch_category_table(changed_keys: Set[str], previous_version: str) -> None:
+    """After a categories.json edit: recompute only the affected dishes and restamp the table."""
+    if _TABLE_CACHE is not None and _TABLE_CACHE[0] == previous_version:
+        table = _TABLE_CACHE[1]
+    else:
+        table = _read_category_table(previous_version)
+    if table is None:
+        return  # nothing valid to patch; rebuilt lazily on next load
+    affected = _affected_names(table.index, set(changed_keys))
+    if len(affected):
+        table = table.copy()
+        table.loc[affected, _TABLE_COLUMNS] = _detect_rows(affected, load_categories())[_TABLE_COLUMNS]
+    _save_category_table(category_config_version(), table)
 
 def apply_categories(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
     if df is None or df.empty or "Блюдо" not in df.columns:
         return df
-    cat_mapping = load_categories()
-    
-    # Fast path: Map only unique dishes instead of every row (reduces 200ms -> 10ms)
-    unique_names = df['Блюдо'].unique()
-    
-    cats = [detect_category_granular(name, cat_mapping) for name in unique_names]
-    macros = [get_macro_category(cat) for cat in cats]
-    
-    mapping_df = pd.DataFrame({
-        'Блюдо': unique_names,
-        'Категория': cats,
-        'Макро_Категория': macros
-    })
-    
-    df = df.copy()
-    if 'Категория' in df.columns:
-        df = df.drop(columns=['Категория', 'Макро_Категория'], errors='ignore')
-        
-    df = df.merge(mapping_df, on='Блюдо', how='left')
+
+    # Dictionary-encoded join: map unique dishes through the persisted table, then take by code
+    codes, uniques = pd.factorize(df['Блюдо'], use_na_sentinel=False)
+    keys = [str(u) for u in uniques]
+    rows = resolve_categories(keys).reindex(keys)
+
+    # New frame: the input may be the dataset version shared by all sessions
+    df = df.drop(columns=['Категория', 'Макро_Категория'], errors='ignore')
+    df['Категория'] = rows['Категория'].to_numpy()[codes]
+    df['Макро_Категория'] = rows['Макро_Категория'].to_numpy()[codes]
+    return df
+
+def reapply_categories(df: Optional[pd.DataFrame], changed_keys: Iterable[str]) -> Optional[pd.DataFrame]:
+    """
+    Frame with category columns updated only for rows of dishes hit by the changed mapping keys.
+    Copy-on-write: df itself (shared between sessions) is left untouched.
+    """
+    if df is None or df.empty or "Блюдо" not in df.columns or 'Категория' not in df.columns:
+        return apply_categories(df)
+    codes, uniques = pd.factorize(df['Блюдо'], use_na_sentinel=False)
+    keys = pd.Index([str(u) for u in uniques], dtype=object)
+    affected = _affected_names(keys, set(changed_keys))
+    if len(affected) == 0:
+        return df
+
+    affected_u = keys.isin(affected)
+    rows = resolve_categories(affected).reindex(keys)
+    mask = affected_u[codes]
+    # Only the two category columns are replaced, the rest stays shared with df
+    df = df.copy(deep=False)
+    for col in ('Категория', 'Макро_Категория'):
+        values = df[col].to_numpy(dtype=object, copy=True)
+        values[mask] = rows[col].to_numpy()[codes[mask]]
+        df[col] = values
     return df
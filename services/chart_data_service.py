@@ -0,0 +1,110 @@
+"""
+Chart data layer: keeps Plotly payloads bounded regardless of history length.
+
+Long ranges are first pre-aggregated to a coarser calendar resolution
+(day -> week -> month), then line series are thinned with LTTB
+(Largest-Triangle-Three-Buckets), which keeps the visual shape and peaks.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+MAX_LINE_POINTS = 400
+# Series shorter than this still get per-point markers
+MARKERS_MAX_POINTS = 60
+
+# (max span in days, pandas period alias)
+RESOLUTIONS = ((120, 'D'), (730, 'W'), (None, 'M'))
+
+
+def choose_resolution(start, end) -> str:
+    """'D' / 'W' / 'M' depending on the length of the date range."""
+    span = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    for max_days, freq in RESOLUTIONS:
+        if max_days is None or span <= max_days:
+            return freq
+    return 'M'
+
+
+def resample_series(
+    df: pd.DataFrame,
+    date_col: str,
+    value_col: str,
+    weight_col: Optional[str] = None,
+    freq: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    One point per period: weighted mean of value_col when weight_col is given
+    (e.g. unit cost weighted by quantity), plain mean otherwise.
+    Output dates are period starts, sorted.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=[date_col, value_col])
+    dates = pd.to_datetime(df[date_col])
+    freq = freq or choose_resolution(dates.min(), dates.max())
+    keys = dates.dt.to_period(freq).dt.start_time
+    values = df[value_col].astype(float)
+
+    if weight_col is not None:
+        weights = df[weight_col].astype(float).where(values.notna(), 0.0).fillna(0.0)
+        grouped = pd.DataFrame({'k': keys, 'vw': values.fillna(0.0) * weights, 'w': weights}).groupby('k', sort=True).sum()
+        plain = values.groupby(keys, sort=True).mean()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weighted = grouped['vw'] / grouped['w']
+        # Periods without weights (zero qty) fall back to the plain mean
+        result = weighted.where(grouped['w'] > 0, plain)
+    else:
+        result = values.groupby(keys, sort=True).mean()
+    return result.rename(value_col).rename_axis(date_col).reset_index()
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points LTTB keeps; first and last are always kept."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(float)
+    y = np.nan_to_num(y.astype(float))
+
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket (or the last point for the final bucket)
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        nhi = max(nhi, nlo + 1)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def downsample_line(df: pd.DataFrame, x_col: str, y_col: str, max_points: int = MAX_LINE_POINTS) -> pd.DataFrame:
+    """Row subset of df (sorted by x) with at most max_points rows, extra columns preserved."""
+    if len(df) <= max_points:
+        return df
+    ordered = df.sort_values(x_col, kind='stable')
+    x = ordered[x_col]
+    x_num = x.astype('int64').to_numpy() if pd.api.types.is_datetime64_any_dtype(x) else x.to_numpy()
+    keep = lttb_indices(x_num, ordered[y_col].to_numpy(), max_points)
+    return ordered.iloc[keep]
+
+
+def line_series(
+    df: pd.DataFrame,
+    date_col: str,
+    value_col: str,
+    weight_col: Optional[str] = None,
+    max_points: int = MAX_LINE_POINTS,
+) -> pd.DataFrame:
+    """Resample to a range-appropriate resolution, then cap the point count with LTTB."""
+    return downsample_line(resample_series(df, date_col, value_col, weight_col), date_col, value_col, max_points)
+
+
+def use_markers(n_points: int) -> bool:
+    return n_points <= MARKERS_MAX_POINTS
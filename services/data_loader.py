@@ -7,13 +7,14 @@ import json
 import pandera as pa
 from io import BytesIO
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple, Union
-from services import category_service, parsing_service
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from services import category_service, dataset_store, parsing_service, price_history_index, price_index_service
 
 # --- CONSTANTS ---
-CACHE_FILE = "data_cache.parquet"
+# Legacy single-file cache; new syncs publish versions via dataset_store
+CACHE_FILE = dataset_store.LEGACY_CACHE_FILE
 SCHEMA_VERSION = "2026-02-18"
-SCHEMA_META_FILE = "data_cache_meta.json"
+SCHEMA_META_FILE = dataset_store.LEGACY_META_FILE
 CONFIG_FILE = "config/keywords.json"
 
 LAST_SYNC_META = {
@@ -21,16 +22,64 @@ LAST_SYNC_META = {
     "warnings": [],
 }
 
-# --- IN-MEMORY STORAGE ---
-_RECIPES_DB = {}
-_STOCK_DF = None
-_TURNOVER_HISTORY_DF = None
+# Side tables published next to the sales data in every dataset version
+RECIPES_TABLE = "recipes"
+STOCK_TABLE = "stock"
+TURNOVER_TABLE = "turnover_history"
 
-def get_recipes_map(): return _RECIPES_DB
-def get_stock_data(): return _STOCK_DF
-def get_turnover_history(): return _TURNOVER_HISTORY_DF
+# --- IN-MEMORY STORAGE ---
+# (dataset version, recipes, stock, turnover history), replaced as one tuple so
+# readers never see tables from two different versions
+_SIDE_TABLES: Tuple[Optional[str], Dict[str, List[Dict[str, Any]]], Optional[pd.DataFrame], Optional[pd.DataFrame]] = (None, {}, None, None)
+
+def _recipes_to_frame(recipes: Dict[str, List[Dict[str, Any]]]) -> Optional[pd.DataFrame]:
+    if not recipes:
+        return None
+    return pd.DataFrame([{"dish_name": dish, **ing} for dish, ingredients in recipes.items() for ing in ingredients])
+
+def _recipes_from_frame(df: Optional[pd.DataFrame]) -> Dict[str, List[Dict[str, Any]]]:
+    recipes: Dict[str, List[Dict[str, Any]]] = {}
+    for row in ([] if df is None else df.to_dict("records")):
+        recipes.setdefault(row.pop("dish_name"), []).append(row)
+    return recipes
+
+def _side_tables():
+    """Side tables of the current dataset version, read once per version (rollback and other replicas included)."""
+    global _SIDE_TABLES
+    ref = dataset_store.resolve()
+    version = ref.version if ref else None
+    snapshot = _SIDE_TABLES
+    if snapshot[0] != version:
+        tables = dataset_store.load_tables(ref)
+        snapshot = (version, _recipes_from_frame(tables.get(RECIPES_TABLE)), tables.get(STOCK_TABLE), tables.get(TURNOVER_TABLE))
+        _SIDE_TABLES = snapshot
+    return snapshot
+
+def get_recipes_map(): return _side_tables()[1]
+def get_stock_data(): return _side_tables()[2]
+def get_turnover_history(): return _side_tables()[3]
 def get_last_sync_meta(): return LAST_SYNC_META
 
+class PreparedDataset(NamedTuple):
+    key: Tuple[str, str]  # (dataset version, category config version)
+    df: pd.DataFrame
+    dish_index: price_history_index.DishHistoryIndex
+    price_index: price_index_service.PriceIndex
+
+def load_prepared(ref: dataset_store.DatasetRef) -> PreparedDataset:
+    """
+    Categorized frame of a dataset version with its dish and price indexes, built once per
+    (version, category config) in this process and shared by all sessions. Read-only.
+    """
+    key = (ref.version, category_service.category_config_version())
+
+    def build(df):
+        # Categories always come from the current mapping, so edits survive restarts
+        df = category_service.apply_categories(df)
+        return PreparedDataset(key, df, price_history_index.DishHistoryIndex.build(df), price_index_service.PriceIndex.build(df))
+
+    return dataset_store.load_prepared(ref, key[1], build)
+
 # --- HELPERS ---
 _CONFIG = None
 def _get_config() -> Dict[str, Any]:
@@ -231,13 +280,42 @@ def process_single_file(file_content: Union[BytesIO, str], filename: str = "") -
     except Exception as exc:
         return None, f"Ошибка обработки: {exc}", warnings, dropped_stats
 
-def download_and_process_yandex(yandex_token: str, yandex_path: str = "RestoAnalytic") -> Tuple[bool, str]:
+def _build_side_tables(
+    recipes_list: List[Dict[str, Any]],
+    stock_parts: List[pd.DataFrame],
+    turnover_history_parts: List[pd.DataFrame],
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+    """Recipes map, latest stock per ingredient and turnover history from the parsed parts."""
+    recipes = {r['dish_name']: r['ingredients'] for r in recipes_list}
+
+    stock = None
+    if stock_parts:
+        stock = pd.concat(stock_parts, ignore_index=True)
+        if "report_date" in stock.columns:
+            stock["report_date"] = pd.to_datetime(stock["report_date"], errors="coerce")
+            stock = stock.sort_values("report_date")
+        stock = stock.groupby("ingredient", as_index=False).last()
+
+    turnover = None
+    if turnover_history_parts:
+        turnover = pd.concat(turnover_history_parts, ignore_index=True).drop_duplicates()
+    return recipes, stock, turnover
+
+def download_and_process_yandex(
+    yandex_token: str,
+    yandex_path: str = "RestoAnalytic",
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[bool, str]:
     """
     Sync data from Yandex.Disk, process files, and update the cache.
+    progress(event) is called after listing and after every file with
+    files_total / files_done / files_downloaded / files_parsed / rows.
     Returns: (Success, Message)
     """
     if not yandex_token:
         return False, "Не задан токен Яндекс.Диска."
+    progress = progress or (lambda event: None)
+    counters = {"files_total": 0, "files_done": 0, "files_downloaded": 0, "files_parsed": 0, "rows": 0}
 
     headers = {"Authorization": f"OAuth {yandex_token}"}
     api_url = "https://cloud-api.yandex.net/v1/disk/resources"
@@ -246,7 +324,7 @@ def download_and_process_yandex(yandex_token: str, yandex_path: str = "RestoAnal
     dropped_items = []
     warnings_total = []
     
-    global _RECIPES_DB, _STOCK_DF, _TURNOVER_HISTORY_DF
+    global _SIDE_TABLES
     recipes_list = []
     stock_parts = []
     turnover_history_parts = []
@@ -295,6 +373,7 @@ def download_and_process_yandex(yandex_token: str, yandex_path: str = "RestoAnal
             return
             
         content = BytesIO(resp.content)
+        counters["files_downloaded"] += 1
         
         if "TechnologicalMaps" in path:
             res_list, err = parsing_service.parse_ttk(content, filename)
@@ -327,6 +406,8 @@ def download_and_process_yandex(yandex_token: str, yandex_path: str = "RestoAnal
             if df is not None and not df.empty:
                 df["Точка"] = venue
                 data_frames.append(df)
+                counters["files_parsed"] += 1
+                counters["rows"] += len(df)
 
     try:
         root_items = list_items(yandex_path)
@@ -336,47 +417,41 @@ def download_and_process_yandex(yandex_token: str, yandex_path: str = "RestoAnal
         root_files = [i for i in root_items if i.get("type") == "file" and str(i.get("name", "")).lower().endswith((".xlsx", ".csv"))]
         subfolders = [i for i in root_items if i.get("type") == "dir"]
 
-        for f in root_files:
-            process_remote_file(f, "Mesto")
-            
+        # List everything first so progress has a total
+        queue = [(f, "Mesto") for f in root_files]
         for folder in subfolders:
             venue = folder.get("name", "Unknown")
-            for f in get_files_recursive(folder.get("path")):
-                process_remote_file(f, venue)
+            queue.extend((f, venue) for f in get_files_recursive(folder.get("path")))
+        counters["files_total"] = len(queue)
+        progress({"stage": "listed", **counters})
+
+        for f, venue in queue:
+            process_remote_file(f, venue)
+            counters["files_done"] += 1
+            progress({"stage": "processing", "file": f.get("name", ""), **counters})
 
         if not data_frames and not recipes_list and not stock_parts:
              return False, "Файлы найдены, но данные не были распознаны."
 
+        # Built before publishing and written into the same version
+        side_tables = _build_side_tables(recipes_list, stock_parts, turnover_history_parts)
+        recipes, stock, turnover = side_tables
+        tables = {RECIPES_TABLE: _recipes_to_frame(recipes), STOCK_TABLE: stock, TURNOVER_TABLE: turnover}
+
         if data_frames:
             full_df = pd.concat(data_frames, ignore_index=True)
             if "Дата_Отчета" in full_df.columns:
                 full_df["Дата_Отчета"] = pd.to_datetime(full_df["Дата_Отчета"], errors="coerce")
                 full_df = full_df.dropna(subset=["Дата_Отчета"]).sort_values("Дата_Отчета")
-            full_df.to_parquet(CACHE_FILE, index=False)
-            with open(SCHEMA_META_FILE, "w", encoding="utf-8") as f:
-                json.dump({"schema_version": SCHEMA_VERSION}, f)
-
-        # Update Globals
-        _RECIPES_DB = {}
-        for r in recipes_list:
-            _RECIPES_DB[r['dish_name']] = r['ingredients']
-            
-        if stock_parts:
-            _STOCK_DF = pd.concat(stock_parts, ignore_index=True)
-            if "report_date" in _STOCK_DF.columns:
-                _STOCK_DF["report_date"] = pd.to_datetime(_STOCK_DF["report_date"], errors="coerce")
-                _STOCK_DF = _STOCK_DF.sort_values("report_date")
-                _STOCK_DF = _STOCK_DF.groupby("ingredient", as_index=False).last()
-            else:
-                _STOCK_DF = _STOCK_DF.groupby("ingredient", as_index=False).last()
-        else:
-            _STOCK_DF = None
-            
-        if turnover_history_parts:
-            _TURNOVER_HISTORY_DF = pd.concat(turnover_history_parts, ignore_index=True)
-            _TURNOVER_HISTORY_DF = _TURNOVER_HISTORY_DF.drop_duplicates()
+            progress({"stage": "saving", **counters})
+            ref = dataset_store.publish(full_df, SCHEMA_VERSION, source=yandex_path, tables=tables)
         else:
-            _TURNOVER_HISTORY_DF = None
+            # Only recipes/stock in this sync: republish the current sales data with them
+            current = dataset_store.resolve()
+            ref = None
+            if current is not None:
+                ref = dataset_store.publish(dataset_store.load(current), current.schema_version, source=yandex_path, tables=tables)
+        _SIDE_TABLES = (ref.version if ref else None, *side_tables)
 
         dropped_df = pd.DataFrame(dropped_items)
         if not dropped_df.empty and "Себестоимость" in dropped_df.columns:
@@ -393,7 +468,7 @@ def download_and_process_yandex(yandex_token: str, yandex_path: str = "RestoAnal
         LAST_SYNC_META["warnings"] = warnings_total
 
         msg = f"Обновлено строк продаж: {len(full_df) if data_frames else 0}. "
-        msg += f"Рецептов: {len(_RECIPES_DB)}. Товаров: {len(_STOCK_DF) if _STOCK_DF is not None else 0}."
+        msg += f"Рецептов: {len(recipes)}. Товаров: {len(stock) if stock is not None else 0}."
         if warnings_total:
             msg += f" Предупреждений: {len(warnings_total)}."
             
@@ -403,4 +478,4 @@ def download_and_process_yandex(yandex_token: str, yandex_path: str = "RestoAnal
         return False, f"Ошибка синхронизации: {exc}"
 
 def get_recipes_map() -> Dict[str, List[Dict[str, Any]]]:
-    return _RECIPES_DB
+    return _side_tables()[1]
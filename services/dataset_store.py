@@ -0,0 +1,321 @@
+"""
+Versioned dataset store.
+
+    datasets/
+      CURRENT                    <- name of the live version (swapped with os.replace)
+      v20260301-120000-123456789/
+        data.parquet
+        recipes.parquet          <- optional side tables published with the data
+        manifest.json            <- schema version, files, row counts, sha256
+
+A version directory is written under a temporary name and renamed into place
+complete, then CURRENT is swapped. Published versions are immutable, so
+readers never see a half-written cache and never wait for a writer.
+Rolling back is just pointing CURRENT at an older version, side tables included.
+
+Several app replicas can share one store: CURRENT doubles as the version
+file they poll, and each process reads a version once (memory-mapped) and
+hands the same frame to all of its sessions.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+STORE_DIR = os.getenv("DATASET_STORE_DIR", "datasets")
+KEEP_VERSIONS = int(os.getenv("DATASET_KEEP_VERSIONS", 5))
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+DATA_FILE = "data.parquet"
+TABLE_SUFFIX = ".parquet"
+TMP_PREFIX = ".tmp-"
+# Unfinished publishes older than this are removed by gc()
+TMP_MAX_AGE_SEC = 3600
+
+# Pre-store single-file cache, still readable until the first publish
+LEGACY_CACHE_FILE = "data_cache.parquet"
+LEGACY_META_FILE = "data_cache_meta.json"
+LEGACY_VERSION = "legacy"
+
+_LOADED = None  # ((version, mtime_ns), DataFrame) of the last version read in this process
+_LOAD_LOCK = threading.Lock()
+_LAST_VERSION_NS = 0  # strictly increasing version stamps within this process
+_VERSION_LOCK = threading.Lock()
+_PREPARED = None  # ((version, mtime_ns, key), value) built from that version, see load_prepared()
+_PREPARE_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class DatasetRef:
+    version: str
+    path: str
+    manifest: Dict[str, Any]
+
+    @property
+    def schema_version(self) -> Optional[str]:
+        return self.manifest.get("schema_version")
+
+    @property
+    def tables(self) -> List[str]:
+        """Names of the side tables published with this version."""
+        return [f["name"][:-len(TABLE_SUFFIX)] for f in self.manifest.get("files", []) if f["name"] != DATA_FILE]
+
+
+def _store(store_dir: Optional[str]) -> str:
+    return store_dir or STORE_DIR
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_json_atomic(path: str, payload: Any) -> None:
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _version_ns() -> int:
+    global _LAST_VERSION_NS
+    with _VERSION_LOCK:
+        _LAST_VERSION_NS = max(time.time_ns(), _LAST_VERSION_NS + 1)
+        return _LAST_VERSION_NS
+
+
+def _version_name(ns: int) -> str:
+    """Sortable by name: second + nanoseconds within it, both from the same clock reading."""
+    seconds, nanos = divmod(ns, 10**9)
+    return f"v{datetime.fromtimestamp(seconds):%Y%m%d-%H%M%S}-{nanos:09d}"
+
+
+def _write_file(df: pd.DataFrame, path: str) -> Dict[str, Any]:
+    df.to_parquet(path, index=False)
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+    return {
+        "name": os.path.basename(path),
+        "rows": int(len(df)),
+        "bytes": os.path.getsize(path),
+        "sha256": _sha256(path),
+    }
+
+
+def publish(
+    df: pd.DataFrame,
+    schema_version: str,
+    source: str = "",
+    store_dir: Optional[str] = None,
+    make_current: bool = True,
+    tables: Optional[Dict[str, Optional[pd.DataFrame]]] = None,
+) -> DatasetRef:
+    """
+    Write df as a new immutable version and (by default) make it current.
+    tables are side tables (recipes, stock...) stored next to it; None values are skipped.
+    """
+    root = _store(store_dir)
+    os.makedirs(root, exist_ok=True)
+    ns = _version_ns()
+    version = _version_name(ns)
+    tmp_dir = os.path.join(root, f"{TMP_PREFIX}{version}")
+    os.makedirs(tmp_dir)
+    try:
+        files = [_write_file(df, os.path.join(tmp_dir, DATA_FILE))]
+        for name, table in (tables or {}).items():
+            if table is not None:
+                files.append(_write_file(table, os.path.join(tmp_dir, f"{name}{TABLE_SUFFIX}")))
+        manifest = {
+            "version": version,
+            "schema_version": schema_version,
+            "created_at": datetime.fromtimestamp(ns // 10**9).isoformat(timespec="seconds"),
+            "source": source,
+            "rows": int(len(df)),
+            "files": files,
+        }
+        _write_json_atomic(os.path.join(tmp_dir, MANIFEST_FILE), manifest)
+        _fsync_dir(tmp_dir)
+        final_dir = os.path.join(root, version)
+        os.rename(tmp_dir, final_dir)
+        _fsync_dir(root)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if make_current:
+        set_current(version, store_dir)
+    log.info(f"✅ Dataset {version} published ({len(df)} rows)")
+    gc(store_dir=store_dir)
+    return DatasetRef(version, os.path.join(final_dir, DATA_FILE), manifest)
+
+
+def set_current(version: str, store_dir: Optional[str] = None) -> None:
+    root = _store(store_dir)
+    if read_manifest(version, store_dir) is None:
+        raise ValueError(f"Unknown dataset version: {version}")
+    tmp = os.path.join(root, f"{CURRENT_FILE}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+
+def current_version(store_dir: Optional[str] = None) -> Optional[str]:
+    """Live version name; LEGACY_VERSION while only the old single-file cache exists."""
+    try:
+        with open(os.path.join(_store(store_dir), CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return LEGACY_VERSION if store_dir is None and os.path.exists(LEGACY_CACHE_FILE) else None
+
+
+def read_manifest(version: str, store_dir: Optional[str] = None) -> Optional[dict]:
+    return _read_json(os.path.join(_store(store_dir), version, MANIFEST_FILE))
+
+
+def resolve(version: Optional[str] = None, store_dir: Optional[str] = None) -> Optional[DatasetRef]:
+    """Ref of `version` (default: current), or None when there is no dataset yet."""
+    version = version or current_version(store_dir)
+    if version is None:
+        return None
+    if version == LEGACY_VERSION:
+        meta = _read_json(LEGACY_META_FILE) or {}
+        return DatasetRef(LEGACY_VERSION, LEGACY_CACHE_FILE, {"schema_version": meta.get("schema_version")})
+    manifest = read_manifest(version, store_dir)
+    if manifest is None:
+        log.error(f"❌ Dataset {version} has no manifest")
+        return None
+    return DatasetRef(version, os.path.join(_store(store_dir), version, DATA_FILE), manifest)
+
+
+def load(ref: DatasetRef) -> pd.DataFrame:
+    """
+    Frame of a dataset version, read once per process and shared by all sessions.
+    Callers must not modify it in place.
+    """
+    global _LOADED
+    key = (ref.version, os.stat(ref.path).st_mtime_ns)
+    # Held while reading: sessions that arrive together wait for one read
+    with _LOAD_LOCK:
+        if _LOADED is not None and _LOADED[0] == key:
+            return _LOADED[1]
+        df = pd.read_parquet(ref.path, memory_map=True)
+        _LOADED = (key, df)
+    return df
+
+
+def load_prepared(ref: DatasetRef, key: Hashable, build: Callable[[pd.DataFrame], Any]) -> Any:
+    """
+    build(load(ref)) done once per process for (version, key) and shared by all sessions,
+    e.g. the categorized frame with its indexes. Callers must not modify the result in place.
+    """
+    global _PREPARED
+    cache_key = (ref.version, os.stat(ref.path).st_mtime_ns, key)
+    with _PREPARE_LOCK:
+        if _PREPARED is not None and _PREPARED[0] == cache_key:
+            return _PREPARED[1]
+        value = build(load(ref))
+        _PREPARED = (cache_key, value)
+    return value
+
+
+def load_tables(ref: Optional[DatasetRef]) -> Dict[str, pd.DataFrame]:
+    """Side tables of a version by name (empty for the legacy cache and versions without them)."""
+    if ref is None:
+        return {}
+    folder = os.path.dirname(ref.path)
+    return {name: pd.read_parquet(os.path.join(folder, f"{name}{TABLE_SUFFIX}")) for name in ref.tables}
+
+
+def list_versions(store_dir: Optional[str] = None) -> List[dict]:
+    """Manifests of all published versions, newest first."""
+    root = _store(store_dir)
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    manifests = [read_manifest(n, store_dir) for n in names if n.startswith("v")]
+    return sorted((m for m in manifests if m), key=lambda m: m["version"], reverse=True)
+
+
+def verify(version: str, store_dir: Optional[str] = None) -> bool:
+    """Row-independent integrity check: every file exists and matches its checksum."""
+    manifest = read_manifest(version, store_dir)
+    if manifest is None:
+        return False
+    for entry in manifest.get("files", []):
+        path = os.path.join(_store(store_dir), version, entry["name"])
+        if not os.path.exists(path) or _sha256(path) != entry["sha256"]:
+            return False
+    return True
+
+
+def rollback(to_version: Optional[str] = None, store_dir: Optional[str] = None) -> Optional[str]:
+    """Point CURRENT at to_version (default: the version published before the current one)."""
+    current = current_version(store_dir)
+    if to_version is None:
+        older = [m["version"] for m in list_versions(store_dir) if current is None or m["version"] < current]
+        if not older:
+            return None
+        to_version = older[0]
+    if not verify(to_version, store_dir):
+        raise ValueError(f"Dataset {to_version} failed verification")
+    set_current(to_version, store_dir)
+    log.warning(f"⚠️ Dataset rolled back: {current} -> {to_version}")
+    return to_version
+
+
+def gc(keep: int = KEEP_VERSIONS, store_dir: Optional[str] = None) -> List[str]:
+    """Remove all but the `keep` newest versions (the current one is always kept) and stale temp dirs."""
+    root = _store(store_dir)
+    current = current_version(store_dir)
+    removed = []
+    for m in list_versions(store_dir)[keep:]:
+        if m["version"] != current:
+            shutil.rmtree(os.path.join(root, m["version"]), ignore_errors=True)
+            removed.append(m["version"])
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        path = os.path.join(root, name)
+        if name.startswith(TMP_PREFIX) and time.time() - os.path.getmtime(path) > TMP_MAX_AGE_SEC:
+            shutil.rmtree(path, ignore_errors=True)
+    if removed:
+        log.info(f"🧹 Dataset versions removed: {removed}")
+    return removed
@@ -0,0 +1,195 @@
+import logging
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+log = logging.getLogger(__name__)
+
+# Source column -> Excel header
+EXPORT_COLUMNS = {
+    'Точка': 'Точка',
+    'Месяц': 'Месяц',
+    'Блюдо': 'Наименование',
+    'Количество': 'Кол-во',
+    'Себестоимость': 'Себест.',
+    'Выручка с НДС': 'Выручка',
+    'Кост %': 'Кост %',
+    'Категория': 'Категория',
+    'Макро_Категория': 'Макро_Категория',
+}
+
+# Sort option keyword -> (source metric column, Excel header)
+SORT_OPTIONS = {
+    "Выручке": ('Выручка с НДС', 'Выручка'),
+    "Фуд-косту": ('Кост %', 'Кост %'),
+    "Количеству": ('Количество', 'Кол-во'),
+}
+
+COLUMN_WIDTHS = {'Наименование': 40, 'Выручка': 18, 'Себест.': 18, 'Кост %': 12, 'Кол-во': 10}
+
+
+def resolve_sort(sort_mode: str) -> Tuple[str, str, bool]:
+    """(source metric column, Excel header, sort?) for a UI sort option."""
+    for keyword, (source_col, header) in SORT_OPTIONS.items():
+        if keyword in sort_mode:
+            return source_col, header, True
+    return 'Выручка с НДС', 'Выручка', False
+
+
+def _cost_pct(df: pd.DataFrame) -> np.ndarray:
+    if 'Кост %' in df.columns:
+        return df['Кост %'].to_numpy(dtype=float)
+    if 'Фудкост' in df.columns:
+        return df['Фудкост'].to_numpy(dtype=float)
+    rev = df['Выручка с НДС'].to_numpy(dtype=float)
+    cost = df['Себестоимость'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = cost / rev * 100
+    return np.where(np.isfinite(pct), pct, 0.0)
+
+
+def export_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Column arrays for the Report sheet (no full-frame copy).
+    Точка / Месяц are included only when the slice spans several venues / months.
+    """
+    cols: Dict[str, np.ndarray] = {}
+    if 'Точка' in df.columns and df['Точка'].nunique() > 1:
+        cols['Точка'] = df['Точка'].to_numpy()
+    if 'Дата_Отчета' in df.columns:
+        months = pd.to_datetime(df['Дата_Отчета']).dt.to_period('M')
+        if months.nunique() > 1:
+            cols['Месяц'] = months.astype(str).to_numpy()
+    for src in ('Блюдо', 'Количество', 'Себестоимость', 'Выручка с НДС'):
+        if src in df.columns:
+            cols[src] = df[src].to_numpy()
+    cols['Кост %'] = _cost_pct(df)
+    for src in ('Категория', 'Макро_Категория'):
+        if src in df.columns:
+            cols[src] = df[src].to_numpy()
+    return cols
+
+
+def group_totals(keys: np.ndarray, values: np.ndarray) -> Tuple[List, np.ndarray]:
+    """Sum of values per key, sorted descending (one pass, no iterrows)."""
+    codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+    sums = np.bincount(codes, weights=np.nan_to_num(values.astype(float)), minlength=len(uniques))
+    order = np.argsort(-sums, kind='stable')
+    return [uniques[i] for i in order], sums[order]
+
+
+def _cell(value):
+    # xlsxwriter can't store NaN/NaT; pandas wrote them as empty cells
+    if value is None or (isinstance(value, float) and value != value) or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def build_excel_report(df: pd.DataFrame, sort_mode: str) -> Optional[bytes]:
+    """
+    Report + Charts workbook written row by row in xlsxwriter constant_memory mode:
+    worksheets never hold more than one row, so wide multi-venue/multi-month slices
+    don't spike memory. Returns None on failure.
+    """
+    output = BytesIO()
+    try:
+        cols = export_columns(df)
+        metric_src, sort_col, do_sort = resolve_sort(sort_mode)
+        if do_sort and metric_src in cols:
+            order = np.argsort(-np.nan_to_num(cols[metric_src].astype(float)), kind='stable')
+        else:
+            order = np.arange(len(df))
+        headers = [EXPORT_COLUMNS[c] for c in cols]
+        arrays = [cols[c] for c in cols]
+        pct_idx = headers.index('Кост %')
+
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        fmt_header = workbook.add_format({'bold': True, 'bg_color': '#D3D3D3', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
+        fmt_money = workbook.add_format({'num_format': '#,##0 ₽'})
+        fmt_pct = workbook.add_format({'num_format': '0.0%'})
+        fmt_int = workbook.add_format({'num_format': '0'})
+        col_formats = {'Выручка': fmt_money, 'Себест.': fmt_money, 'Кост %': fmt_pct, 'Кол-во': fmt_int}
+
+        report = workbook.add_worksheet('Report')
+        for i, header in enumerate(headers):
+            report.set_column(i, i, COLUMN_WIDTHS.get(header, 15), col_formats.get(header))
+        report.write_row(0, 0, headers, fmt_header)
+        for r, pos in enumerate(order, start=1):
+            row = [_cell(a[pos]) for a in arrays]
+            if row[pct_idx] is not None:
+                row[pct_idx] = row[pct_idx] / 100.0
+            report.write_row(r, 0, row)
+
+        charts_sheet = workbook.add_worksheet('Charts')
+        n_rows = len(order)
+
+        # 1. Top 10 Column
+        if n_rows and sort_col in headers:
+            val_idx = headers.index(sort_col)
+            max_row = min(10, n_rows)
+            name_idx = headers.index('Наименование') if 'Наименование' in headers else 0
+            chart_col = workbook.add_chart({'type': 'column'})
+            chart_col.add_series({
+                'name':       ['Report', 0, val_idx],
+                'categories': ['Report', 1, name_idx, max_row, name_idx],
+                'values':     ['Report', 1, val_idx, max_row, val_idx],
+                'data_labels': {'value': True},
+            })
+            chart_col.set_title({'name': f'Топ-10: {sort_col}'})
+            charts_sheet.insert_chart('B2', chart_col, {'x_scale': 2.5, 'y_scale': 2})
+
+        # 2-3. Group totals, precomputed; rows are written interleaved because
+        # constant_memory mode can't go back to an already flushed row.
+        sort_values = cols[metric_src].astype(float) if metric_src in cols else np.zeros(n_rows)
+        if sort_col == 'Кост %':
+            sort_values = sort_values / 100.0
+        cat = group_totals(cols['Категория'], sort_values) if 'Категория' in cols else None
+        macro = group_totals(cols['Макро_Категория'], sort_values) if 'Макро_Категория' in cols else None
+
+        value_fmt = col_formats.get(sort_col, fmt_money)
+        if cat:
+            charts_sheet.write(0, 14, 'Категория', fmt_header)
+            charts_sheet.write(0, 15, sort_col, fmt_header)
+        if macro:
+            charts_sheet.write(0, 17, 'Макро', fmt_header)
+            charts_sheet.write(0, 18, sort_col, fmt_header)
+        for r in range(max(len(cat[0]) if cat else 0, len(macro[0]) if macro else 0)):
+            if cat and r < len(cat[0]):
+                charts_sheet.write(r + 1, 14, _cell(cat[0][r]))
+                charts_sheet.write(r + 1, 15, float(cat[1][r]), value_fmt)
+            if macro and r < len(macro[0]):
+                charts_sheet.write(r + 1, 17, _cell(macro[0][r]))
+                charts_sheet.write(r + 1, 18, float(macro[1][r]), value_fmt)
+
+        if cat:
+            chart_pie = workbook.add_chart({'type': 'pie'})
+            chart_pie.add_series({
+                'name': 'Доли',
+                'categories': ['Charts', 1, 14, len(cat[0]), 14],
+                'values': ['Charts', 1, 15, len(cat[0]), 15],
+                'data_labels': {'percentage': True},
+            })
+            chart_pie.set_title({'name': f'Доли: {sort_col}'})
+            charts_sheet.insert_chart('J2', chart_pie, {'x_scale': 1.5, 'y_scale': 1.5})
+        if macro:
+            chart_donut = workbook.add_chart({'type': 'doughnut'})
+            chart_donut.add_series({
+                'name': 'Структура (Макро)',
+                'categories': ['Charts', 1, 17, len(macro[0]), 17],
+                'values': ['Charts', 1, 18, len(macro[0]), 18],
+                'data_labels': {'percentage': True},
+            })
+            chart_donut.set_title({'name': 'Структура (Макро)'})
+            chart_donut.set_rotation(90)
+            charts_sheet.insert_chart('B18', chart_donut, {'x_scale': 1.5, 'y_scale': 1.5})
+
+        workbook.close()
+    except Exception as e:
+        log.exception("Excel export failed: %s", e)
+        return None
+    return output.getvalue()
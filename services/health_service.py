@@ -0,0 +1,102 @@
+"""
+Readiness report for load balancers: dataset version and age, last sync, users.db.
+
+Only reads small files (CURRENT, manifest, scheduler status) and opens users.db
+read-only, so it can run in a tiny process next to the app (health_server.py)
+without importing Streamlit or the views.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import urllib.request
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from services import dataset_store
+
+log = logging.getLogger(__name__)
+
+USERS_DB = os.getenv("HEALTH_USERS_DB", "users.db")
+# Same env and default as the scheduler's status file
+SCHEDULER_STATUS_FILE = os.getenv("SCHEDULER_STATUS_FILE", "scheduler_status.json")
+APP_HEALTH_URL = os.getenv("HEALTH_APP_URL", "http://127.0.0.1:8501/_stcore/health")
+PROBE_TIMEOUT_SEC = float(os.getenv("HEALTH_PROBE_TIMEOUT_SEC", 1))
+# Dataset older than this is reported as stale (0 disables the check)
+MAX_DATASET_AGE_SEC = int(os.getenv("HEALTH_MAX_DATASET_AGE_SEC", 0))
+
+SYNC_OK_STATUSES = ("synced", "unchanged")
+
+
+def check_db(path: Optional[str] = None) -> bool:
+    path = path or USERS_DB
+    if not os.path.exists(path):
+        return False
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=PROBE_TIMEOUT_SEC)
+        try:
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error as e:
+        log.warning(f"⚠️ Health: users.db unreachable: {e}")
+        return False
+
+
+def check_app(url: Optional[str] = None) -> bool:
+    """Streamlit's own endpoint, so the container is restarted when the app hangs."""
+    try:
+        with urllib.request.urlopen(url or APP_HEALTH_URL, timeout=PROBE_TIMEOUT_SEC) as resp:
+            return resp.status == 200
+    except OSError:
+        return False
+
+
+def last_scheduler_sync(status_path: Optional[str] = None) -> Optional[str]:
+    try:
+        with open(status_path or SCHEDULER_STATUS_FILE, "r", encoding="utf-8") as f:
+            runs = json.load(f).get("runs", [])
+    except (OSError, ValueError):
+        return None
+    ok = [r["started_at"] for r in runs if r.get("job") == "sync" and r.get("status") in SYNC_OK_STATUSES]
+    return max(ok) if ok else None
+
+
+def dataset_info(store_dir: Optional[str] = None) -> Dict[str, Any]:
+    ref = dataset_store.resolve(store_dir=store_dir)
+    if ref is None or not os.path.exists(ref.path):
+        return {"version": None, "rows": None, "created_at": None, "age_sec": None}
+    created_at = ref.manifest.get("created_at")
+    if created_at:
+        age = time.time() - datetime.fromisoformat(created_at).timestamp()
+    else:
+        # Legacy cache has no manifest timestamp
+        age = time.time() - os.path.getmtime(ref.path)
+        created_at = datetime.fromtimestamp(os.path.getmtime(ref.path)).isoformat(timespec="seconds")
+    return {"version": ref.version, "rows": ref.manifest.get("rows"), "created_at": created_at, "age_sec": int(age)}
+
+
+def readiness(
+    store_dir: Optional[str] = None,
+    db_path: Optional[str] = None,
+    status_path: Optional[str] = None,
+    app_url: Optional[str] = None,
+    max_age_sec: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Ready = app answers, users.db is readable and there is a dataset to show."""
+    max_age_sec = MAX_DATASET_AGE_SEC if max_age_sec is None else max_age_sec
+    dataset = dataset_info(store_dir)
+    # A version published from the app counts as a sync too
+    syncs = [t for t in (last_scheduler_sync(status_path), dataset["created_at"]) if t]
+    report = {
+        "app": check_app(app_url),
+        "db": check_db(db_path),
+        "dataset": dataset,
+        "last_sync_at": max(syncs) if syncs else None,
+        "stale": bool(max_age_sec and dataset["age_sec"] is not None and dataset["age_sec"] > max_age_sec),
+    }
+    report["ready"] = report["app"] and report["db"] and dataset["version"] is not None
+    return report
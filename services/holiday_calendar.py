@@ -0,0 +1,167 @@
+import json
+import os
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+EXTRA_HOLIDAYS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "extra_holidays.json"
+)
+
+# РФ: периоды отдыха с переносами (производственный календарь)
+# Источник: КонсультантПлюс (праздники и перенос выходных)
+RU_HOLIDAY_PERIODS: Dict[int, List[Tuple[str, str]]] = {
+    2025: [
+        ("2024-12-29", "2025-01-08"),
+        ("2025-02-22", "2025-02-23"),
+        ("2025-03-08", "2025-03-09"),
+        ("2025-05-01", "2025-05-04"),
+        ("2025-05-08", "2025-05-11"),
+        ("2025-06-12", "2025-06-15"),
+        ("2025-11-02", "2025-11-04"),
+        ("2025-12-31", "2025-12-31"),
+    ],
+    2026: [
+        ("2025-12-31", "2026-01-11"),
+        ("2026-02-21", "2026-02-23"),
+        ("2026-03-07", "2026-03-09"),
+        ("2026-05-01", "2026-05-03"),
+        ("2026-05-09", "2026-05-11"),
+        ("2026-06-12", "2026-06-14"),
+        ("2026-11-04", "2026-11-04"),
+        ("2026-12-31", "2026-12-31"),
+    ],
+}
+
+# Фиксированные даты (MM-DD) для лет без производственного календаря
+BASE_HOLIDAYS = {
+    "01-01", "01-02", "01-03", "01-04", "01-05", "01-06", "01-07", "01-08",
+    "02-23", "03-08", "05-01", "05-09", "06-12", "11-04"
+}
+
+# Доля праздничного коэффициента для "мостиков" (рабочий день между выходными).
+# По умолчанию 0: мостики только помечаются и не меняют прогноз закупок.
+BRIDGE_BOOST_SHARE = float(os.getenv("HOLIDAY_BRIDGE_BOOST_SHARE", 0))
+
+_CALENDAR_CACHE: Dict[Tuple[int, int, Tuple[date, ...], float], pd.DataFrame] = {}
+_EXTRAS_CACHE: Optional[Tuple[int, Set[date]]] = None  # (file mtime_ns, dates)
+
+
+def parse_holiday_text(text: str) -> Set[date]:
+    """Parse admin input: one date per line (YYYY-MM-DD or DD.MM.YYYY). Bad lines are skipped."""
+    result = set()
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            result.add(pd.to_datetime(line, dayfirst="." in line).date())
+        except Exception:
+            log.warning(f"⚠️ Не удалось распознать дату праздника: {line}")
+    return result
+
+
+def load_extra_holidays() -> Set[date]:
+    """Load admin-entered extra holidays from local JSON (re-read only when the file changes)."""
+    global _EXTRAS_CACHE
+    try:
+        mtime = os.stat(EXTRA_HOLIDAYS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return set()
+    if _EXTRAS_CACHE is not None and _EXTRAS_CACHE[0] == mtime:
+        return set(_EXTRAS_CACHE[1])
+    try:
+        with open(EXTRA_HOLIDAYS_FILE, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        dates = {date.fromisoformat(d) for d in raw}
+    except Exception as e:
+        log.error(f"Error loading extra holidays: {e}")
+        return set()
+    _EXTRAS_CACHE = (mtime, dates)
+    return set(dates)
+
+
+def save_extra_holidays(dates: Iterable[date]) -> Set[date]:
+    """Overwrite the extra holidays JSON and drop cached calendars."""
+    global _EXTRAS_CACHE
+    dates = set(dates)
+    try:
+        os.makedirs(os.path.dirname(EXTRA_HOLIDAYS_FILE), exist_ok=True)
+        with open(EXTRA_HOLIDAYS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(sorted(d.isoformat() for d in dates), f, ensure_ascii=False, indent=4)
+    except Exception as e:
+        log.error(f"Error saving extra holidays: {e}")
+    _EXTRAS_CACHE = None
+    _CALENDAR_CACHE.clear()
+    return dates
+
+
+def build_holiday_calendar(
+    start_year: int, end_year: int, extra_dates: Optional[Iterable[date]] = None, bridge_share: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Build a daily table for [start_year, end_year] indexed by normalized date.
+
+    Columns:
+        is_holiday: official/base/extra holiday.
+        is_bridge: working weekday squeezed between two days off.
+        boost_weight: 1.0 for holidays, bridge_share (default BRIDGE_BOOST_SHARE) for bridges, 0.0 otherwise.
+    """
+    bridge_share = BRIDGE_BOOST_SHARE if bridge_share is None else bridge_share
+    idx = pd.date_range(f"{start_year}-01-01", f"{end_year}-12-31", freq="D")
+    holidays = set(extra_dates or ())
+    for year in range(start_year, end_year + 1):
+        for start, end in RU_HOLIDAY_PERIODS.get(year, []):
+            holidays.update(pd.date_range(start, end).date)
+
+    is_holiday = idx.isin(pd.to_datetime(sorted(holidays))) if holidays else np.zeros(len(idx), dtype=bool)
+    is_holiday = is_holiday | idx.strftime("%m-%d").isin(BASE_HOLIDAYS)
+
+    day_off = is_holiday | (idx.weekday >= 5)
+    prev_off = np.concatenate(([False], day_off[:-1]))
+    next_off = np.concatenate((day_off[1:], [False]))
+    is_bridge = ~day_off & prev_off & next_off
+
+    boost_weight = np.where(is_holiday, 1.0, np.where(is_bridge, bridge_share, 0.0))
+    return pd.DataFrame(
+        {"is_holiday": is_holiday, "is_bridge": is_bridge, "boost_weight": boost_weight},
+        index=idx,
+    )
+
+
+def get_holiday_calendar(start_year: int, end_year: int) -> pd.DataFrame:
+    """Cached calendar including persisted extra holidays."""
+    extras = tuple(sorted(load_extra_holidays()))
+    key = (start_year, end_year, extras, BRIDGE_BOOST_SHARE)
+    cal = _CALENDAR_CACHE.get(key)
+    if cal is None:
+        cal = build_holiday_calendar(start_year, end_year, extras)
+        _CALENDAR_CACHE[key] = cal
+    return cal
+
+
+def lookup(dates) -> pd.DataFrame:
+    """Vectorized calendar lookup for an array of dates (same order, positional index)."""
+    dt = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+    if len(dt) == 0:
+        return pd.DataFrame(columns=["is_holiday", "is_bridge", "boost_weight"])
+    cal = get_holiday_calendar(int(dt.year.min()), int(dt.year.max()))
+    res = cal.reindex(dt)
+    res["is_holiday"] = res["is_holiday"].fillna(False).astype(bool)
+    res["is_bridge"] = res["is_bridge"].fillna(False).astype(bool)
+    res["boost_weight"] = res["boost_weight"].fillna(0.0)
+    return res.reset_index(drop=True)
+
+
+def boost_factors(dates, holiday_boost: float, extra_dates: Optional[Iterable[date]] = None) -> np.ndarray:
+    """Demand multiplier per date: 1 + weight * holiday_boost%. `extra_dates` are treated as holidays (not persisted)."""
+    weights = lookup(dates)["boost_weight"].to_numpy(dtype=float)
+    if extra_dates:
+        dt = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        weights = np.where(dt.isin(pd.to_datetime(sorted(extra_dates))), 1.0, weights)
+    return 1.0 + weights * (holiday_boost / 100.0)
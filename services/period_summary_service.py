@@ -0,0 +1,81 @@
+"""
+Headline totals of a period slice, computed once and shared by the KPI row,
+Smart Insights and the Telegram report.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.ttl_cache import TTLCache
+
+PERIOD_SUMMARY_CACHE_MAX = int(os.getenv("PERIOD_SUMMARY_CACHE_MAX", 256))
+PERIOD_SUMMARY_TTL_SEC = int(os.getenv("PERIOD_SUMMARY_TTL_SEC", 3600))
+
+_cache = TTLCache(ttl=PERIOD_SUMMARY_TTL_SEC, maxsize=PERIOD_SUMMARY_CACHE_MAX)
+
+
+@dataclass(frozen=True)
+class PeriodSummary:
+    revenue: float = 0.0
+    cost: float = 0.0
+    quantity: float = 0.0
+    lines: int = 0
+    dishes: int = 0
+
+    @property
+    def margin(self) -> float:
+        return self.revenue - self.cost
+
+    @property
+    def food_cost_pct(self) -> float:
+        return self.cost / self.revenue * 100 if self.revenue > 0 else 0.0
+
+
+EMPTY_SUMMARY = PeriodSummary()
+
+
+def _total(df: pd.DataFrame, col: str) -> float:
+    if col not in df.columns:
+        return 0.0
+    return float(np.nansum(df[col].to_numpy(dtype=float)))
+
+
+def summarize(df: Optional[pd.DataFrame]) -> PeriodSummary:
+    """All headline totals in one pass over the needed columns."""
+    if df is None or df.empty:
+        return EMPTY_SUMMARY
+    return PeriodSummary(
+        revenue=_total(df, 'Выручка с НДС'),
+        cost=_total(df, 'Себестоимость'),
+        quantity=_total(df, 'Количество'),
+        lines=len(df),
+        dishes=int(df['Блюдо'].nunique()) if 'Блюдо' in df.columns else 0,
+    )
+
+
+def summary_key(df: pd.DataFrame, dataset_version: str, venue: Optional[str]) -> Hashable:
+    """
+    (dataset version, venue, period): the cache is shared by all sessions, so it is
+    keyed by the immutable dataset_store version, never a per-session counter.
+    Period slices are date ranges of the same venue-filtered dataset, so the
+    first/last date and row count identify them.
+    """
+    dates = df['Дата_Отчета']
+    return dataset_version, venue or "Все", dates.min(), dates.max(), len(df)
+
+
+def period_summary(df: Optional[pd.DataFrame], dataset_version: Optional[str] = None, venue: Optional[str] = None) -> PeriodSummary:
+    """Cached summarize(); without a dataset_version (scripts, bots) it is computed directly."""
+    if df is None or df.empty:
+        return EMPTY_SUMMARY
+    if dataset_version is None:
+        return summarize(df)
+    return _cache.get_or_load(summary_key(df, dataset_version, venue), lambda: summarize(df))
+
+
+def clear_cache() -> None:
+    _cache.clear()
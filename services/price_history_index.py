@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class DishHistoryIndex:
+    """
+    Per-dish unit-cost history, built once when the dataset is loaded.
+
+    Rows are sorted by (dish, date); the history of dish i is the slice
+    offsets[i]:offsets[i+1] of the column arrays, so the product list and a
+    product's price series are lookups instead of scans over the full frame.
+    """
+    dishes: Tuple[str, ...]
+    offsets: np.ndarray
+    dates: np.ndarray
+    unit_cost: np.ndarray
+    quantity: np.ndarray
+    venues: np.ndarray
+    _positions: Dict[str, int] = field(repr=False, compare=False)
+    _venue_dishes: Dict[str, Tuple[str, ...]] = field(repr=False, compare=False)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "DishHistoryIndex":
+        # Same venue column detection as the venue filter in app.py
+        venue_col = 'Точка' if 'Точка' in df.columns else 'Venue'
+        has_venue = venue_col in df.columns
+        if df.empty:
+            codes, dishes = np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+        else:
+            # sort=True: codes follow the alphabetical order of names
+            codes, dishes = pd.factorize(df['Блюдо'].astype(str), sort=True)
+        dates = pd.to_datetime(df['Дата_Отчета']).to_numpy() if not df.empty else np.empty(0, dtype='datetime64[ns]')
+        order = np.lexsort((dates, codes))
+        counts = np.bincount(codes, minlength=len(dishes))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+        quantity = df['Количество'].to_numpy(dtype=float) if 'Количество' in df.columns else np.ones(len(df))
+        venues = df[venue_col].astype(str).to_numpy() if has_venue else np.full(len(df), '', dtype=object)
+        dish_names = tuple(str(d) for d in dishes)
+
+        venue_dishes: Dict[str, Tuple[str, ...]] = {}
+        if has_venue and len(df):
+            pairs = pd.DataFrame({'v': venues, 'c': codes}).drop_duplicates()
+            for venue, group in pairs.groupby('v', sort=False):
+                venue_dishes[venue] = tuple(dish_names[c] for c in np.sort(group['c'].to_numpy()))
+
+        return cls(
+            dishes=dish_names,
+            offsets=offsets,
+            dates=dates[order],
+            unit_cost=df['Unit_Cost'].to_numpy(dtype=float)[order] if len(df) else np.empty(0),
+            quantity=quantity[order],
+            venues=venues[order],
+            _positions={name: i for i, name in enumerate(dish_names)},
+            _venue_dishes=venue_dishes,
+        )
+
+    def names(self, venue: Optional[str] = None) -> Tuple[str, ...]:
+        """Sorted dish names, optionally only those sold at `venue`."""
+        if venue is None:
+            return self.dishes
+        return self._venue_dishes.get(venue, ())
+
+    def history(self, dish: str, venue: Optional[str] = None) -> pd.DataFrame:
+        """Date-sorted rows of one dish with Дата_Отчета / Unit_Cost / Количество."""
+        pos = self._positions.get(dish)
+        if pos is None:
+            return pd.DataFrame(columns=['Дата_Отчета', 'Unit_Cost', 'Количество'])
+        sl = slice(self.offsets[pos], self.offsets[pos + 1])
+        out = pd.DataFrame({
+            'Дата_Отчета': self.dates[sl],
+            'Unit_Cost': self.unit_cost[sl],
+            'Количество': self.quantity[sl],
+        })
+        if venue is not None:
+            out = out[self.venues[sl] == venue].reset_index(drop=True)
+        return out
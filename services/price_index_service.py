@@ -0,0 +1,195 @@
+"""
+Daily price index per dish and venue.
+
+One row per (dish, venue, report date) with first / last / summed unit cost,
+row count and quantity. Built once per loaded dataset, i.e. after every sync
+(sync reloads the cache). Inflation for any window is then a date-range slice
+(binary search on the sorted dates) plus a groupby over that slice, and the
+chain-linked basket index is a groupby over the daily rows, not raw sales.
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+INDEX_COLUMNS = [
+    'Блюдо', 'Точка', 'Дата_Отчета',
+    'pos_first', 'cost_first', 'pos_last', 'cost_last',
+    'cost_sum', 'rows', 'qty',
+]
+
+
+def build_daily_index(df: pd.DataFrame) -> pd.DataFrame:
+    """Daily (dish, venue) rows sorted by date, then by original row order."""
+    if df.empty:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    venue_col = 'Точка' if 'Точка' in df.columns else 'Venue'
+    work = pd.DataFrame({
+        'Блюдо': df['Блюдо'].to_numpy(),
+        'Точка': df[venue_col].astype(str).to_numpy() if venue_col in df.columns else '',
+        'Дата_Отчета': pd.to_datetime(df['Дата_Отчета']).to_numpy(),
+        'Unit_Cost': df['Unit_Cost'].to_numpy(dtype=float),
+        'Количество': df['Количество'].to_numpy(dtype=float),
+        'pos': np.arange(len(df)),
+    })
+    daily = work.groupby(['Блюдо', 'Точка', 'Дата_Отчета'], sort=False).agg(
+        pos_first=('pos', 'first'),
+        cost_first=('Unit_Cost', 'first'),
+        pos_last=('pos', 'last'),
+        cost_last=('Unit_Cost', 'last'),
+        cost_sum=('Unit_Cost', 'sum'),
+        rows=('Unit_Cost', 'count'),
+        qty=('Количество', 'sum'),
+    ).reset_index()
+    return daily.sort_values(['Дата_Отчета', 'pos_first'], kind='stable').reset_index(drop=True)[INDEX_COLUMNS]
+
+
+@dataclass(frozen=True)
+class PriceIndex:
+    daily: pd.DataFrame
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "PriceIndex":
+        return cls(build_daily_index(df))
+
+    @cached_property
+    def _arrays(self):
+        d = self.daily
+        codes, dishes = pd.factorize(d['Блюдо'])
+        venue_codes, venues = pd.factorize(d['Точка'])
+        # Global order of "last" candidates: by date, then by the last source row
+        last_rank = np.empty(len(d), dtype=np.int64)
+        last_rank[np.lexsort((d['pos_last'].to_numpy(), d['Дата_Отчета'].to_numpy()))] = np.arange(len(d))
+        return {
+            'dates': d['Дата_Отчета'].to_numpy(dtype='datetime64[ns]'),
+            'codes': codes,
+            'dishes': dishes,
+            'venue_codes': venue_codes,
+            'venues': {v: i for i, v in enumerate(venues)},
+            'last_rank': last_rank,
+            'cost_first': d['cost_first'].to_numpy(dtype=float),
+            'cost_last': d['cost_last'].to_numpy(dtype=float),
+            'cost_sum': d['cost_sum'].to_numpy(dtype=float),
+            'rows': d['rows'].to_numpy(dtype=float),
+            'qty': d['qty'].to_numpy(dtype=float),
+        }
+
+    def _bounds(self, start, end) -> Tuple[int, int]:
+        dates = self._arrays['dates']
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'ns'), 'left'))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end), 'ns'), 'right'))
+        return lo, hi
+
+    def _select(self, start, end, venue: Optional[str]) -> np.ndarray:
+        """Positions of daily rows in [start, end] (and venue)."""
+        lo, hi = self._bounds(start, end)
+        rows = np.arange(lo, hi)
+        if venue is not None:
+            code = self._arrays['venues'].get(venue, -1)
+            rows = rows[self._arrays['venue_codes'][lo:hi] == code]
+        return rows
+
+    def window(self, start=None, end=None, venue: Optional[str] = None) -> pd.DataFrame:
+        """Daily rows with start <= date <= end (both optional)."""
+        return self.daily.iloc[self._select(start, end, venue)]
+
+    def window_prices(self, start=None, end=None, venue: Optional[str] = None) -> pd.DataFrame:
+        """Per dish: first / last / mean unit cost and quantity sold within the window."""
+        a = self._arrays
+        sel = self._select(start, end, venue)
+        if not len(sel):
+            return pd.DataFrame(columns=['first', 'last', 'mean', 'qty'])
+        m = len(a['dishes'])
+        codes = a['codes'][sel]
+
+        # Rows are date-sorted, so the first occurrence of a code is its first price
+        first_row = np.full(m, len(a['codes']), dtype=np.int64)
+        np.minimum.at(first_row, codes, sel)
+        best_rank = np.full(m, -1, dtype=np.int64)
+        np.maximum.at(best_rank, codes, a['last_rank'][sel])
+        is_last = a['last_rank'][sel] == best_rank[codes]
+        last = np.full(m, np.nan)
+        last[codes[is_last]] = a['cost_last'][sel[is_last]]
+
+        cost_sum = np.bincount(codes, a['cost_sum'][sel], minlength=m)
+        n_rows = np.bincount(codes, a['rows'][sel], minlength=m)
+        qty = np.bincount(codes, a['qty'][sel], minlength=m)
+
+        present = np.unique(codes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(n_rows > 0, cost_sum / n_rows, np.nan)
+        return pd.DataFrame({
+            'first': a['cost_first'][first_row[present]],
+            'last': last[present],
+            'mean': mean[present],
+            'qty': qty[present],
+        }, index=pd.Index(a['dishes'][present], name='Блюдо'))
+
+    def inflation(
+        self,
+        base_start,
+        base_end,
+        cur_start,
+        cur_end,
+        venue: Optional[str] = None,
+        base_price: str = 'first',
+        drop_infinite: bool = True,
+    ) -> Tuple[float, float, pd.DataFrame]:
+        """
+        (loss, save, detail): current mean cost vs the base window's first (or last)
+        cost, weighted by current quantity — same figures as the row-level version.
+        """
+        base = self.window_prices(base_start, base_end, venue)
+        cur = self.window_prices(cur_start, cur_end, venue)
+        if base.empty or cur.empty:
+            return 0, 0, pd.DataFrame()
+        return inflation_detail(base[base_price], cur['mean'], cur['qty'], drop_infinite)
+
+    def chain_index(self, freq: str = 'M', start=None, end=None, venue: Optional[str] = None) -> pd.DataFrame:
+        """
+        Chain-linked basket index (Laspeyres links): each period is compared with the
+        previous one on dishes sold in both, weighted by the previous period's quantity.
+        Columns: Период, Звено, Индекс (base 100), Инфляция %.
+        """
+        part = self.window(start, end, venue)
+        cols = ['Период', 'Звено', 'Индекс', 'Инфляция %']
+        if part.empty:
+            return pd.DataFrame(columns=cols)
+        period = part['Дата_Отчета'].dt.to_period(freq)
+        agg = part.groupby([period, part['Блюдо']])[['cost_sum', 'rows', 'qty']].sum()
+        price = (agg['cost_sum'] / agg['rows'].where(agg['rows'] > 0)).unstack()
+        qty = agg['qty'].unstack()
+
+        prev_price, prev_qty = price.shift(1), qty.shift(1)
+        both = price.notna() & prev_price.notna() & (prev_qty > 0)
+        num = (price * prev_qty).where(both).sum(axis=1)
+        den = (prev_price * prev_qty).where(both).sum(axis=1)
+        link = (num / den.where(den > 0)).fillna(1.0)
+        link.iloc[0] = 1.0
+        chained = link.cumprod() * 100
+        return pd.DataFrame({
+            'Период': price.index.to_timestamp(),
+            'Звено': link.to_numpy(),
+            'Индекс': chained.to_numpy(),
+            'Инфляция %': (chained.to_numpy() / 100 - 1) * 100,
+        })
+
+
+def inflation_detail(old: pd.Series, new: pd.Series, qty: pd.Series, drop_infinite: bool = True) -> Tuple[float, float, pd.DataFrame]:
+    merged = pd.concat([old, new], axis=1, keys=['Old', 'New']).dropna()
+    merged['Diff'] = merged['New'] - merged['Old']
+    merged['Pct'] = (merged['Diff'] / merged['Old']) * 100
+    if drop_infinite:
+        merged = merged.replace([float('inf'), float('-inf')], pd.NA).dropna(subset=['Pct'])
+    merged['Qty'] = qty
+    merged['Effect'] = merged['Diff'] * merged['Qty']
+    loss = merged[merged['Effect'] > 0]['Effect'].sum()
+    save = abs(merged[merged['Effect'] < 0]['Effect'].sum())
+    detail = merged[merged['Effect'] != 0].copy()
+    detail['Товар'] = detail.index
+    detail['Рост %'] = detail['Pct']
+    detail['Эффект (₽)'] = detail['Effect']
+    return loss, save, detail
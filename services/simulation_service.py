@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from functools import cached_property
+from typing import List, Dict, Any, Optional, Tuple
+from services import parsing_service
+
+
+@dataclass(frozen=True)
+class RecipeMatrix:
+    """
+    Sparse dish x ingredient quantity matrix in CSR layout.
+
+    Row i (dish) holds ingredients indices[indptr[i]:indptr[i+1]]
+    with quantities data[indptr[i]:indptr[i+1]].
+    """
+    dishes: Tuple[str, ...]
+    ingredients: Tuple[str, ...]
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+
+    @cached_property
+    def dish_index(self) -> Dict[str, int]:
+        return {d: i for i, d in enumerate(self.dishes)}
+
+    @cached_property
+    def ingredient_index(self) -> Dict[str, int]:
+        return {ing: i for i, ing in enumerate(self.ingredients)}
+
+
+_MATRIX_CACHE: Optional[Tuple[Dict[str, Any], RecipeMatrix]] = None
+
+
+def build_recipe_matrix(recipes_db: Dict[str, List[Dict[str, Any]]]) -> RecipeMatrix:
+    """Build the CSR matrix. Dish keys are normalized with parsing_service.normalize_name."""
+    by_dish: Dict[str, List[Dict[str, Any]]] = {}
+    for dish_name, ingredients in (recipes_db or {}).items():
+        norm_dish = parsing_service.normalize_name(str(dish_name))
+        if norm_dish:
+            by_dish[norm_dish] = ingredients
+
+    ingredient_pos: Dict[str, int] = {}
+    dishes, indptr, indices, data = [], [0], [], []
+    for dish, ingredients in by_dish.items():
+        row = [
+            (ing['ingredient'], float(ing.get('qty_per_dish', 0) or 0))
+            for ing in ingredients
+            if ing.get('ingredient')
+        ]
+        if not row:
+            continue
+        for ing_name, qty in row:
+            indices.append(ingredient_pos.setdefault(ing_name, len(ingredient_pos)))
+            data.append(qty)
+        dishes.append(dish)
+        indptr.append(len(indices))
+
+    return RecipeMatrix(
+        dishes=tuple(dishes),
+        ingredients=tuple(ingredient_pos),
+        indptr=np.asarray(indptr, dtype=np.int64),
+        indices=np.asarray(indices, dtype=np.int64),
+        data=np.asarray(data, dtype=float),
+    )
+
+
+def get_recipe_matrix(recipes_db: Dict[str, List[Dict[str, Any]]]) -> RecipeMatrix:
+    """Cached build: recipes_db is replaced as a whole on sync, so identity is a safe key."""
+    global _MATRIX_CACHE
+    if _MATRIX_CACHE is None or _MATRIX_CACHE[0] is not recipes_db:
+        _MATRIX_CACHE = (recipes_db, build_recipe_matrix(recipes_db))
+    return _MATRIX_CACHE[1]
+
+
+def delta_vector(matrix: RecipeMatrix, ingredient_deltas: Dict[str, float]) -> np.ndarray:
+    """Price delta per ingredient (₽/unit) aligned to matrix.ingredients."""
+    vec = np.zeros(len(matrix.ingredients), dtype=float)
+    pos = matrix.ingredient_index
+    for ing, delta in ingredient_deltas.items():
+        if ing in pos:
+            vec[pos[ing]] = delta
+    return vec
+
+
+def dish_cost_impacts(matrix: RecipeMatrix, deltas: np.ndarray) -> np.ndarray:
+    """
+    Unit cost growth per dish for one or many scenarios.
+
+    Args:
+        deltas: shape (n_ingredients,) or (n_scenarios, n_ingredients)
+
+    Returns:
+        shape (n_dishes,) or (n_scenarios, n_dishes)
+    """
+    deltas = np.asarray(deltas, dtype=float)
+    single = deltas.ndim == 1
+    scen = np.atleast_2d(deltas)
+    if len(matrix.dishes) == 0:
+        out = np.zeros((scen.shape[0], 0))
+    else:
+        contrib = scen[:, matrix.indices] * matrix.data
+        out = np.add.reduceat(contrib, matrix.indptr[:-1], axis=1)
+    return out[0] if single else out
+
+
+def sold_quantities(matrix: RecipeMatrix, df_current: pd.DataFrame) -> np.ndarray:
+    """Units sold per matrix dish (0 for dishes without sales)."""
+    qty = np.zeros(len(matrix.dishes), dtype=float)
+    if df_current.empty:
+        return qty
+    codes, uniques = pd.factorize(df_current['Блюдо'].astype(str))
+    weights = df_current['Количество'].fillna(0).to_numpy(dtype=float)
+    sold = np.bincount(codes, weights=weights, minlength=len(uniques))
+    pos = matrix.dish_index
+    for name, units in zip(uniques, sold):
+        i = pos.get(parsing_service.normalize_name(name))
+        if i is not None:
+            qty[i] += units
+    return qty
+
+
+def scenario_cost_increase(matrix: RecipeMatrix, deltas: np.ndarray, df_current: pd.DataFrame) -> np.ndarray:
+    """Total cost growth (₽) on current sales volume, one value per scenario row."""
+    impacts = dish_cost_impacts(matrix, np.atleast_2d(deltas))
+    return impacts @ sold_quantities(matrix, df_current)
+
+
+def sweep_price_scale(
+    matrix: RecipeMatrix,
+    ingredient_deltas: Dict[str, float],
+    df_current: pd.DataFrame,
+    scales: np.ndarray
+) -> pd.DataFrame:
+    """Evaluate base deltas multiplied by each scale factor in one product."""
+    scales = np.asarray(scales, dtype=float)
+    scenarios = scales[:, None] * delta_vector(matrix, ingredient_deltas)[None, :]
+    return pd.DataFrame({
+        'Множитель': scales,
+        'Рост с/с итого': scenario_cost_increase(matrix, scenarios, df_current),
+    })
+
+
+# Label for rows without a category, so the selection round-trips through the UI
+UNCATEGORIZED = "Без категории"
+
+
+@dataclass(frozen=True)
+class CategoryTotals:
+    """Revenue/cost totals per category, precomputed once per data slice."""
+    categories: Tuple[str, ...]
+    revenue: np.ndarray
+    cost: np.ndarray
+
+
+def precompute_category_totals(df: pd.DataFrame) -> CategoryTotals:
+    if df.empty:
+        return CategoryTotals((), np.zeros(0), np.zeros(0))
+    keys = df['Категория'].astype(object).fillna(UNCATEGORIZED).astype(str)
+    grp = df.groupby(keys)[['Выручка с НДС', 'Себестоимость']].sum()
+    return CategoryTotals(
+        categories=tuple(grp.index),
+        revenue=grp['Выручка с НДС'].to_numpy(dtype=float),
+        cost=grp['Себестоимость'].to_numpy(dtype=float),
+    )
+
+
+def evaluate_scenarios(
+    totals: CategoryTotals,
+    cats: List[str],
+    d_price,
+    d_cost,
+    d_vol
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluate price/cost/volume changes (in %) for the selected categories.
+    d_price, d_cost, d_vol may be scalars or equally shaped arrays (one item per scenario).
+    """
+    mask = np.isin(np.asarray(totals.categories, dtype=object), list(cats))
+    base_rev = totals.revenue.sum()
+    base_cost = totals.cost.sum()
+    base_margin = base_rev - base_cost
+    target_rev = totals.revenue[mask].sum()
+    target_cost = totals.cost[mask].sum()
+
+    d_price = np.asarray(d_price, dtype=float)
+    d_cost = np.asarray(d_cost, dtype=float)
+    vol_k = 1 + np.asarray(d_vol, dtype=float) / 100
+
+    sim_rev = (base_rev - target_rev) + target_rev * (1 + d_price / 100) * vol_k
+    sim_cost = (base_cost - target_cost) + target_cost * (1 + d_cost / 100) * vol_k
+    sim_margin = sim_rev - sim_cost
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new_profitability = np.where(sim_rev != 0, sim_margin / sim_rev * 100, 0.0)
+
+    return {
+        'base_revenue': base_rev,
+        'base_margin': base_margin,
+        'sim_revenue': sim_rev,
+        'sim_margin': sim_margin,
+        'diff_rev': sim_rev - base_rev,
+        'diff_margin': sim_margin - base_margin,
+        'old_profitability': (base_margin / base_rev * 100) if base_rev else 0,
+        'new_profitability': new_profitability,
+    }
+
+
+def sample_scenarios(
+    n: int,
+    price: Tuple[float, float],
+    cost: Tuple[float, float],
+    vol: Tuple[float, float],
+    seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Draw n normal (mean, std) samples of d_price, d_cost, d_vol in %."""
+    rng = np.random.default_rng(seed)
+    return (
+        rng.normal(price[0], price[1], n),
+        rng.normal(cost[0], cost[1], n),
+        rng.normal(vol[0], vol[1], n),
+    )
+
+
+def run_monte_carlo(
+    totals: CategoryTotals,
+    cats: List[str],
+    n: int,
+    price: Tuple[float, float],
+    cost: Tuple[float, float],
+    vol: Tuple[float, float],
+    percentiles: Tuple[int, ...] = (5, 25, 50, 75, 95),
+    seed: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Distribution of margin outcomes over n sampled scenarios.
+
+    Returns:
+        DataFrame indexed by metric ('sim_margin', 'diff_margin', 'new_profitability')
+        with one column per percentile (P5, P25, ...).
+    """
+    d_price, d_cost, d_vol = sample_scenarios(n, price, cost, vol, seed)
+    res = evaluate_scenarios(totals, cats, d_price, d_cost, d_vol)
+    metrics = ['sim_margin', 'diff_margin', 'new_profitability']
+    values = np.percentile(np.vstack([res[m] for m in metrics]), percentiles, axis=1).T
+    return pd.DataFrame(values, index=metrics, columns=[f"P{p}" for p in percentiles])
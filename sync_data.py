@@ -4,7 +4,7 @@ from io import BytesIO
 import toml
 import time
 import logging
-from services import data_loader
+from services import data_loader, dataset_store
 from infrastructure.storage.yandex_disk_storage import YandexDiskStorage
 
 from infrastructure.observability import setup_observability
@@ -19,7 +19,6 @@ try:
 except:
     YANDEX_TOKEN = os.getenv("YANDEX_TOKEN")
 
-CACHE_FILE = "data_cache.parquet"
 YANDEX_PATH = "Отчеты_Ресторан" # Make sure this matches your Yandex Disk folder
 
 def sync_from_yandex():
@@ -103,9 +102,10 @@ def sync_from_yandex():
             if 'Дата_Отчета' in full_df.columns:
                 full_df = full_df.sort_values(by='Дата_Отчета')
             
-            # 3. Save to Parquet Cache
-            full_df.to_parquet(CACHE_FILE, index=False)
-            print(f"✅ Success! Saved {len(full_df)} rows to {CACHE_FILE}")
+            # 3. Publish a new dataset version; recipes and stock are not synced here, keep the current ones
+            tables = dataset_store.load_tables(dataset_store.resolve())
+            ref = dataset_store.publish(full_df, data_loader.SCHEMA_VERSION, source=YANDEX_PATH, tables=tables)
+            print(f"✅ Success! Saved {len(full_df)} rows as dataset {ref.version}")
             print(f"ℹ️ Dropped {dropped_summary['count']} rows (Total Cost: {dropped_summary['cost']:.2f})")
         else:
             print("⚠️ No data frames to save.")
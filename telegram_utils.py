@@ -1,43 +1,45 @@
-from services import analytics_service, data_loader
+from services import analytics_service, data_loader, period_summary_service
 import pandas as pd
 import threading
 from infrastructure.messaging.telegram_provider import TelegramProvider
 
-def format_report(df_full, target_date):
+def format_report(df_full, target_date, dataset_version=None, venue=None):
     """
     Formates a text report for Telegram based on the latest data.
     Includes insights and comparisons.
+    With dataset_version the period totals are shared with the dashboard cache.
     """
     if df_full is None or df_full.empty:
         return "⚠️ Нет данных для отчета."
 
-    # Ensure date format
-    if not pd.api.types.is_datetime64_any_dtype(df_full['Дата_Отчета']):
-         df_full['Дата_Отчета'] = pd.to_datetime(df_full['Дата_Отчета'])
+    # Ensure date format; the caller's frame (session data, warm scheduler cache) is never modified
+    dates = df_full['Дата_Отчета']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
 
-    latest_date = df_full['Дата_Отчета'].max()
+    latest_date = dates.max()
     
     # --- 1. DAILY STATS ---
-    df_day = df_full[df_full['Дата_Отчета'] == latest_date]
-    day_rev = df_day['Выручка с НДС'].sum()
-    day_cost = df_day['Себестоимость'].sum()
-    day_fc = (day_cost / day_rev * 100) if day_rev > 0 else 0
+    df_day = df_full[dates == latest_date]
+    day = period_summary_service.period_summary(df_day, dataset_version, venue)
+    day_rev = day.revenue
+    day_fc = day.food_cost_pct
 
     # --- 2. MONTHLY STATS (Current vs Previous) ---
     # Current Month
     current_period = latest_date.to_period('M')
-    df_full['Month_Year'] = df_full['Дата_Отчета'].dt.to_period('M')
+    month_year = dates.dt.to_period('M')
     
-    df_month = df_full[df_full['Month_Year'] == current_period]
-    month_rev = df_month['Выручка с НДС'].sum()
-    month_cost = df_month['Себестоимость'].sum()
-    month_profit = month_rev - month_cost
-    month_fc = (month_cost / month_rev * 100) if month_rev > 0 else 0
+    df_month = df_full[month_year == current_period]
+    month = period_summary_service.period_summary(df_month, dataset_version, venue)
+    month_rev = month.revenue
+    month_profit = month.margin
+    month_fc = month.food_cost_pct
     
     # Previous Month (for insights)
     prev_period = current_period - 1
-    df_prev = df_full[df_full['Month_Year'] == prev_period]
-    prev_month_rev = df_prev['Выручка с НДС'].sum()
+    df_prev = df_full[month_year == prev_period]
+    prev_month_rev = period_summary_service.period_summary(df_prev, dataset_version, venue).revenue
 
     # --- 3. INSIGHTS ---
     insights = analytics_service.calculate_insights(
@@ -71,7 +73,7 @@ def format_report(df_full, target_date):
 🔸 **За {month_name} ({latest_date.year}):**
 💰 Выручка: {int(month_rev):,} ₽
 📉 Фуд-кост: {month_fc:.1f}%
-💸 Себестоимость: {int(month_cost):,} ₽
+💸 Себестоимость: {int(month.cost):,} ₽
 💵 Маржа: {int(month_profit):,} ₽
 
 🔎 **Аналитика:**{insight_text}
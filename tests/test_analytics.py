@@ -75,3 +75,32 @@ def test_compute_abc_empty():
     assert abc.empty
     assert avg_qty == 0
     assert avg_margin == 0
+
+def test_classify_menu_engineering_matches_quadrants():
+    from services.analytics_service import classify_menu_engineering
+    qty = pd.Series([10, 10, 1, 1, 1])
+    margin = pd.Series([5.0, 1.0, 5.0, 1.0, np.nan])
+    res = classify_menu_engineering(qty, margin, 5, 3.0)
+    assert list(res) == ["⭐ Звезда", "🐎 Лошадка", "❓ Загадка", "🐶 Собака", "🐶 Собака"]
+
+def test_abc_history_matches_per_month_abc():
+    from services.analytics_service import compute_abc_history, compute_abc_transitions
+    df = pd.DataFrame({
+        'Дата_Отчета': pd.to_datetime(['2026-01-05', '2026-01-06', '2026-01-07', '2026-02-03', '2026-02-04', '2026-02-05']),
+        'Блюдо': ['A', 'B', 'C', 'A', 'B', 'C'],
+        'Количество': [100, 10, 50, 5, 80, 50],
+        'Выручка с НДС': [10000.0, 500.0, 3000.0, 400.0, 9000.0, 3000.0],
+        'Себестоимость': [2000.0, 100.0, 1000.0, 300.0, 1000.0, 1000.0],
+    })
+    history = compute_abc_history(df)
+    for month, part in df.groupby(df['Дата_Отчета'].dt.to_period('M')):
+        abc, _, _ = compute_abc_data(part)
+        expected = dict(zip(abc['Блюдо'], abc['Класс']))
+        got = history[history['Месяц'] == month]
+        assert dict(zip(got['Блюдо'], got['Класс'])) == expected
+
+    transitions = compute_abc_transitions(history)
+    assert {'A', 'B'} <= set(transitions['Блюдо'])
+    star_drop = compute_abc_transitions(history, from_class="⭐ Звезда", to_class="🐶 Собака")
+    assert star_drop['Блюдо'].tolist() == ['A']
+    assert str(star_drop['Месяц_по'].iloc[0]) == '2026-02'
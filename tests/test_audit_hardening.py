@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import MagicMock, patch
 from use_cases import rbac_policy
 from use_cases.session_models import UserSession
-from infrastructure.repositories.sqlite_audit_repository import AuditAction, SQLiteAuditRepository
+from infrastructure.repositories.sqlite_audit_repository import AuditAction, AuditBatchWriter, SQLiteAuditRepository
 import auth
 
 @patch("auth.get_audit_repo")
@@ -64,3 +64,90 @@ def test_audit_log_failure_does_not_crash_main_operation(mock_get_user_repo, moc
             assert passed
             # Ensure the user repo actually did its job
             mock_user_repo.update_user_status.assert_called_once_with(1, "approved")
+
+
+def _audit_repo_with_schema(db_path, **kwargs):
+    auth.SQLiteUserRepository(db_path).init_auth_db()
+    return SQLiteAuditRepository(db_path, **kwargs)
+
+
+def test_async_audit_batches_and_reads_through(tmp_path):
+    repo = _audit_repo_with_schema(str(tmp_path / "audit.db"))
+    batches = []
+    repo._writer = AuditBatchWriter(lambda rows: (batches.append(len(rows)), repo._insert_rows(rows)), flush_interval=60)
+    for i in range(5):
+        repo.log_action(AuditAction.LOGIN_SUCCESS, "system", target_id=f"user{i}")
+    assert repo.stats()["pending"] == 5
+
+    assert len(repo.get_logs()) == 5
+    assert batches == [5]
+    repo.close()
+
+
+def test_async_audit_drops_when_queue_full(tmp_path):
+    repo = _audit_repo_with_schema(str(tmp_path / "audit.db"))
+    repo._writer = AuditBatchWriter(repo._insert_rows, max_queue=2, batch_size=100, flush_interval=60)
+    for _ in range(4):
+        repo.log_action(AuditAction.LOGOUT, "system")
+    assert repo.stats()["dropped"] == 2
+
+    repo.close()
+    assert len(repo.get_logs()) == 2
+
+
+def _seed_logs(repo, n, ts="2026-01-01 10:00:00"):
+    rows = [(ts, i % 3, "user", "LOGIN_SUCCESS" if i % 2 else "LOGOUT", "system", None, None, None, "success") for i in range(n)]
+    repo._insert_rows(rows)
+
+
+def test_keyset_pages_cover_all_rows_once(tmp_path):
+    repo = _audit_repo_with_schema(str(tmp_path / "audit.db"))
+    _seed_logs(repo, 7)  # identical timestamps: the id tie-breaker must hold pages apart
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = repo.get_logs_page(limit=3, action_filter="LOGOUT", before=cursor)
+        seen.extend(r[0] for r in rows)
+        if cursor is None:
+            break
+    assert seen == [7, 5, 3, 1]
+
+
+def test_archive_old_logs_to_parquet(tmp_path):
+    import pyarrow.parquet as pq
+
+    repo = _audit_repo_with_schema(str(tmp_path / "audit.db"))
+    _seed_logs(repo, 4, ts="2020-01-01 10:00:00")
+    repo.log_action(AuditAction.LOGIN_SUCCESS, "system")
+
+    archived = repo.archive_old_logs(retention_days=30, archive_dir=str(tmp_path / "archive"))
+    assert archived == 4
+    assert len(repo.get_logs()) == 1
+
+    files = list((tmp_path / "archive").iterdir())
+    assert len(files) == 1
+    assert pq.read_table(files[0]).num_rows == 4
+    with repo._conn() as conn:
+        assert conn.execute("SELECT SUM(events) FROM audit_daily_rollup").fetchone()[0] == 4
+
+
+def test_concurrent_archiving_exports_rows_once(tmp_path):
+    import threading
+
+    db_path = str(tmp_path / "audit.db")
+    repo = _audit_repo_with_schema(db_path)
+    _seed_logs(repo, 50, ts="2020-01-01 10:00:00")
+    archive_dir = str(tmp_path / "archive")
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(SQLiteAuditRepository(db_path).archive_old_logs(30, archive_dir, vacuum=False)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(results) == [0, 0, 0, 50]
+    assert len(list((tmp_path / "archive").iterdir())) == 1
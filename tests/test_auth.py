@@ -55,3 +55,114 @@ def test_brute_force_lockout(test_db):
         auth.authenticate_user("bruteuser", "wrong_pass")
         
     assert "Слишком много попыток входа" in str(excinfo.value)
+
+def test_user_cache_busted_on_status_change(test_db):
+    auth.create_user("Test User", "cacheuser", "cache@test.com", "12345", "password123", status="approved")
+    user_id = auth.get_user_repo().get_user_by_login("cacheuser")["id"]
+
+    with patch.object(auth.get_user_repo(), "get_user_by_id", wraps=auth.get_user_repo().get_user_by_id) as spy:
+        assert auth.get_user_by_id(user_id)[6] == "approved"
+        assert auth.get_user_by_id(user_id)[6] == "approved"
+        assert spy.call_count == 1
+
+        with patch.object(auth.st, "session_state", {}):
+            auth.update_user_status(user_id, "rejected")
+        assert auth.get_user_by_id(user_id)[6] == "rejected"
+        assert spy.call_count == 2
+
+def test_session_last_seen_writes_coalesced(test_db):
+    auth.create_user("Test User", "seenuser", "seen@test.com", "12345", "password123", status="approved")
+    user_id = auth.get_user_repo().get_user_by_login("seenuser")["id"]
+    with patch("auth._get_session_secret", return_value=b"secret"):
+        token = auth.create_runtime_session(user_id)
+
+    repo = auth.get_user_repo()
+    with patch.object(repo, "update_session_last_seen") as mock_touch, patch.object(repo, "get_session") as mock_get:
+        for _ in range(5):
+            assert auth.resolve_runtime_session(token) == user_id
+        mock_touch.assert_not_called()
+        mock_get.assert_not_called()
+
+        auth._last_seen_writes.clear()
+        auth.resolve_runtime_session(token)
+        auth.resolve_runtime_session(token)
+        assert mock_touch.call_count == 1
+
+    auth.drop_runtime_session(token)
+    assert auth._session_cache.get(token) is None
+
+def test_epoch_bump_from_other_process_drops_cached_sessions(test_db):
+    auth.create_user("Test User", "epochuser", "epoch@test.com", "12345", "password123", status="approved")
+    user_id = auth.get_user_repo().get_user_by_login("epochuser")["id"]
+    with patch("auth._get_session_secret", return_value=b"secret"):
+        token = auth.create_runtime_session(user_id)
+    assert auth.resolve_runtime_session(token) == user_id
+
+    repo = auth.get_user_repo()
+    with patch.object(repo, "get_session", wraps=repo.get_session) as spy:
+        auth.resolve_runtime_session(token)
+        spy.assert_not_called()
+
+        # Another replica sharing users.db bumps the epoch
+        auth.VersionFile(test_db + auth.AUTH_EPOCH_SUFFIX).bump()
+        assert auth.resolve_runtime_session(token) == user_id
+        assert spy.call_count == 1
+
+def test_sweeper_deletes_expired_sessions(test_db):
+    repo = auth.get_user_repo()
+    repo.create_session("old", 1, "2020-01-01T00:00:00", "2020-01-01T00:00:00", None)
+    repo.create_session("live", 1, "2999-01-01T00:00:00", "2020-01-01T00:00:00", None)
+    assert tuple(repo.count_sessions("2026-01-01T00:00:00")) == (1, 1)
+
+    assert auth.sweep_expired_sessions() == 1
+    assert repo.get_session("old") is None
+    assert repo.get_session("live") is not None
+    assert auth.session_metrics()["last_sweep_deleted"] == 1
+
+def test_only_the_designated_process_pulls_users_db(test_db, monkeypatch):
+    calls = []
+
+    class Storage:
+        def download_file_if_changed(self, *a, **kw):
+            calls.append("refresh")
+            return "unchanged"
+
+        def download_file(self, *a, **kw):
+            calls.append("download")
+            return True
+
+    monkeypatch.setattr(auth, "_storage_provider", Storage())
+
+    monkeypatch.setattr(auth, "USERS_DB_PULL", False)
+    assert auth.refresh_users_from_yandex("t") == "skipped"
+    assert auth.sync_users_from_yandex("t", force=True)
+    assert calls == []
+
+    monkeypatch.setattr(auth, "USERS_DB_PULL", True)
+    # Another process is replacing users.db right now
+    with auth.FileLock(test_db + auth.USERS_DB_PULL_LOCK_SUFFIX):
+        assert auth.refresh_users_from_yandex("t") == "locked"
+        assert auth.sync_users_from_yandex("t", force=True)
+    assert calls == []
+
+    assert auth.refresh_users_from_yandex("t") == "unchanged"
+    assert calls == ["refresh"]
+
+def test_forced_pull_keeps_users_db_with_unpushed_local_writes(test_db, monkeypatch):
+    calls = []
+
+    class Storage:
+        def download_file_if_changed(self, *a, **kw):
+            calls.append(("refresh", kw.get("keep_local_changes")))
+            return "unknown"
+
+        def has_newer_local_changes(self, path, info=None):
+            return True
+
+        def download_file(self, *a, **kw):
+            calls.append(("download", None))
+            return True
+
+    monkeypatch.setattr(auth, "_storage_provider", Storage())
+    assert auth.sync_users_from_yandex("t", force=True)
+    assert calls == [("refresh", True)]
@@ -23,3 +23,130 @@ def test_detect_category_normalization():
     # It normalizes input to lowercase
     cat = detect_category_granular(' BURGER ', mapping)
     assert cat == '🍔 Еда (Кухня)'
+
+def _reference_detect(text, priority, categories, exclusions):
+    for cat in priority:
+        cat_ex = exclusions.get(cat, [])
+        for k in categories.get(cat, []):
+            if k in text and not (cat_ex and any(ex in text for ex in cat_ex)):
+                return cat
+    return None
+
+def test_keyword_matcher_respects_priority_prefixes_and_exclusions():
+    from services.category_service import KeywordMatcher
+    priority = ["A", "B", "C"]
+    categories = {"A": ["сок"], "B": ["сокол", "лимонад"], "C": ["со", "ром"]}
+    exclusions = {"A": ["томат"], "B": ["черноголовка"]}
+    matcher = KeywordMatcher(priority, categories, exclusions)
+    cases = [
+        "сок яблочный", "томатный сок", "сокол", "лимонад черноголовка",
+        "ромашка", "стакан", "коктейль сокол томат", "сосна", "",
+    ]
+    for text in cases:
+        assert matcher.match(text) == _reference_detect(text, priority, categories, exclusions), text
+
+def test_compiled_detection_matches_reference_on_config():
+    from services import category_service
+    config = category_service.load_config()
+    categories = config.get("categories", {})
+    names = [f"{k} 0,5" for kws in categories.values() for k in kws]
+    names += [f"{a} {b}" for a, b in zip(names, reversed(names))]
+    for name in names:
+        expected = _reference_detect(name, category_service.PRIORITY_ORDER, categories, config.get("exclusions", {}))
+        assert category_service.detect_category_granular(name) == (expected or category_service.FALLBACK_CATEGORY)
+
+def test_get_macro_category_reverse_lookup():
+    from services import category_service
+    config = category_service.load_config()
+    macro, subcats = next(iter(config["macro_categories"].items()))
+    assert category_service.get_macro_category(subcats[0]) == macro
+    assert category_service.get_macro_category("нет такой") == "нет такой"
+
+@pytest.fixture
+def category_files(tmp_path, monkeypatch):
+    from services import category_service
+    monkeypatch.setattr(category_service, "MAPPING_FILE", str(tmp_path / "categories.json"))
+    monkeypatch.setattr(category_service, "CATEGORY_TABLE_FILE", str(tmp_path / "category_assignments.parquet"))
+    monkeypatch.setattr(category_service, "_TABLE_CACHE", None)
+    return category_service
+
+def test_apply_categories_persists_versioned_table(category_files):
+    import pandas as pd
+    cs = category_files
+    cs.save_categories_full({"тыквенный суп": "🍔 Еда (Кухня)"})
+    df = pd.DataFrame({"Блюдо": ["Тыквенный суп", "Неведомое", "Тыквенный суп"], "Количество": [1, 2, 3]})
+
+    out = cs.apply_categories(df)
+    assert out["Категория"].tolist() == ["🍔 Еда (Кухня)", "📦 Прочее", "🍔 Еда (Кухня)"]
+    assert "Категория" not in df.columns
+
+    # Fresh process: table comes from disk, no detection needed
+    cs._TABLE_CACHE = None
+    table = cs.load_category_table()
+    assert set(table.index) == {"Тыквенный суп", "Неведомое"}
+
+def test_category_table_saves_use_unique_temp_files(category_files, monkeypatch, tmp_path):
+    import pandas as pd
+    cs = category_files
+    written = []
+    original = cs.pq.write_table
+    monkeypatch.setattr(cs.pq, "write_table", lambda table, path: written.append(path) or original(table, path))
+
+    table = cs._detect_rows(["Суп"], {})
+    cs._save_category_table("v1", table)
+    cs._save_category_table("v1", table)
+
+    assert len(set(written)) == 2
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+    assert len(pd.read_parquet(cs.CATEGORY_TABLE_FILE)) == 1
+
+def test_category_edit_patches_only_affected_dishes(category_files, monkeypatch):
+    import pandas as pd
+    cs = category_files
+    df = cs.apply_categories(pd.DataFrame({"Блюдо": ["Неведомое", "Другое блюдо"], "Количество": [1, 2]}))
+    assert df["Категория"].tolist() == ["📦 Прочее", "📦 Прочее"]
+
+    detected = []
+    original = cs._detect_rows
+    monkeypatch.setattr(cs, "_detect_rows", lambda names, mapping: detected.extend(names) or original(names, mapping))
+    cs.save_categories({"неведомое": "🍷 Вино"})
+    assert detected == ["Неведомое"]
+
+    shared = df
+    df = cs.reapply_categories(df, ["неведомое"])
+    assert df["Категория"].tolist() == ["🍷 Вино", "📦 Прочее"]
+    # Copy-on-write: the frame other sessions hold is not touched
+    assert shared["Категория"].tolist() == ["📦 Прочее", "📦 Прочее"]
+    assert cs.load_category_table().loc["Неведомое", "Категория"] == "🍷 Вино"
+
+def test_config_change_invalidates_table(category_files):
+    import pandas as pd
+    cs = category_files
+    cs.apply_categories(pd.DataFrame({"Блюдо": ["X"]}))
+    with open(cs.MAPPING_FILE, "w", encoding="utf-8") as f:
+        f.write('{"x": "🍷 Вино"}')
+    assert cs.load_category_table().empty
+
+def test_prepared_dataset_is_shared_until_categories_change(category_files, tmp_path, monkeypatch):
+    import pandas as pd
+    from services import data_loader, dataset_store
+    cs = category_files
+    monkeypatch.setattr(dataset_store, "_PREPARED", None)
+    df = pd.DataFrame({
+        "Дата_Отчета": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+        "Блюдо": ["Неведомое", "Другое блюдо"],
+        "Количество": [1.0, 2.0],
+        "Unit_Cost": [10.0, 20.0],
+    })
+    ref = dataset_store.publish(df, "s1", store_dir=str(tmp_path / "ds"))
+
+    first = data_loader.load_prepared(ref)
+    assert data_loader.load_prepared(ref) is first
+    assert first.df["Категория"].tolist() == ["📦 Прочее", "📦 Прочее"]
+    assert first.key[0] == ref.version
+
+    cs.save_categories({"неведомое": "🍷 Вино"})
+    second = data_loader.load_prepared(ref)
+    assert second is not first and second.key != first.key
+    assert second.df["Категория"].tolist() == ["🍷 Вино", "📦 Прочее"]
+    assert first.df["Категория"].tolist() == ["📦 Прочее", "📦 Прочее"]
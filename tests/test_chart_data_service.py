@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from services import chart_data_service as cds
+
+
+def test_choose_resolution_by_span():
+    assert cds.choose_resolution("2024-01-01", "2024-03-01") == 'D'
+    assert cds.choose_resolution("2024-01-01", "2025-06-01") == 'W'
+    assert cds.choose_resolution("2020-01-01", "2024-01-01") == 'M'
+
+
+def test_resample_series_weighted_monthly():
+    df = pd.DataFrame({
+        'Дата_Отчета': pd.to_datetime(["2021-01-05", "2021-01-20", "2023-06-01"]),
+        'Unit_Cost': [10.0, 20.0, 30.0],
+        'Количество': [3.0, 1.0, 0.0],
+    })
+    out = cds.resample_series(df, 'Дата_Отчета', 'Unit_Cost', 'Количество')
+    assert out['Дата_Отчета'].tolist() == [pd.Timestamp("2021-01-01"), pd.Timestamp("2023-06-01")]
+    assert out['Unit_Cost'].iloc[0] == 12.5  # (10*3 + 20*1) / 4
+    assert out['Unit_Cost'].iloc[1] == 30.0  # zero weight -> plain mean
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[537] = 10.0
+    idx = cds.lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert 537 in idx
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_downsample_line_bounds_payload_and_keeps_columns():
+    n = 5000
+    df = pd.DataFrame({
+        'Дата_Отчета': pd.date_range("2015-01-01", periods=n, freq='D'),
+        'Выручка с НДС': np.random.default_rng(0).random(n),
+        'label': [str(i) for i in range(n)],
+    })
+    out = cds.downsample_line(df, 'Дата_Отчета', 'Выручка с НДС', max_points=200)
+    assert len(out) == 200
+    assert list(out.columns) == list(df.columns)
+    assert cds.downsample_line(df.head(50), 'Дата_Отчета', 'Выручка с НДС') is not None
+    assert len(cds.line_series(df, 'Дата_Отчета', 'Выручка с НДС')) <= cds.MAX_LINE_POINTS
@@ -0,0 +1,149 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from services import dataset_store
+
+
+def _df(n):
+    return pd.DataFrame({"Блюдо": [f"Блюдо {i}" for i in range(n)], "Количество": [1.0] * n})
+
+
+def test_publish_writes_manifest_and_swaps_current(tmp_path):
+    store = str(tmp_path / "ds")
+    ref = dataset_store.publish(_df(3), "s1", source="Root", store_dir=store)
+
+    assert dataset_store.current_version(store) == ref.version
+    assert ref.schema_version == "s1"
+    manifest = json.loads((tmp_path / "ds" / ref.version / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["rows"] == 3
+    assert manifest["files"][0]["name"] == "data.parquet"
+    assert dataset_store.verify(ref.version, store)
+    assert len(pd.read_parquet(dataset_store.resolve(store_dir=store).path)) == 3
+    assert not [n for n in os.listdir(store) if n.startswith(dataset_store.TMP_PREFIX)]
+
+
+def test_verify_detects_corruption(tmp_path):
+    store = str(tmp_path / "ds")
+    ref = dataset_store.publish(_df(3), "s1", store_dir=store)
+    with open(ref.path, "ab") as f:
+        f.write(b"garbage")
+    assert not dataset_store.verify(ref.version, store)
+
+
+def test_rollback_to_previous_and_explicit_version(tmp_path):
+    store = str(tmp_path / "ds")
+    first = dataset_store.publish(_df(1), "s1", store_dir=store)
+    second = dataset_store.publish(_df(2), "s1", store_dir=store)
+    third = dataset_store.publish(_df(3), "s1", store_dir=store)
+
+    assert dataset_store.rollback(store_dir=store) == second.version
+    assert dataset_store.current_version(store) == second.version
+    dataset_store.rollback(third.version, store_dir=store)
+    assert dataset_store.resolve(store_dir=store).version == third.version
+    dataset_store.rollback(first.version, store_dir=store)
+    assert dataset_store.rollback(store_dir=store) is None
+
+
+def test_rollback_rejects_corrupted_version(tmp_path):
+    store = str(tmp_path / "ds")
+    first = dataset_store.publish(_df(1), "s1", store_dir=store)
+    dataset_store.publish(_df(2), "s1", store_dir=store)
+    os.remove(first.path)
+    with pytest.raises(ValueError):
+        dataset_store.rollback(first.version, store_dir=store)
+
+
+def test_gc_keeps_newest_and_current(tmp_path):
+    store = str(tmp_path / "ds")
+    refs = [dataset_store.publish(_df(i + 1), "s1", store_dir=store, make_current=(i == 0)) for i in range(4)]
+
+    removed = dataset_store.gc(keep=2, store_dir=store)
+
+    remaining = [m["version"] for m in dataset_store.list_versions(store)]
+    assert remaining == [refs[3].version, refs[2].version, refs[0].version]
+    assert removed == [refs[1].version]
+
+
+def test_legacy_cache_is_current_until_first_publish(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _df(2).to_parquet(dataset_store.LEGACY_CACHE_FILE)
+    (tmp_path / dataset_store.LEGACY_META_FILE).write_text(json.dumps({"schema_version": "old"}), encoding="utf-8")
+
+    ref = dataset_store.resolve()
+    assert ref.version == dataset_store.LEGACY_VERSION
+    assert ref.schema_version == "old"
+
+    published = dataset_store.publish(_df(3), "new")
+    assert dataset_store.resolve().version == published.version
+    assert dataset_store.resolve(store_dir=str(tmp_path / "other")) is None
+
+
+def test_load_reads_each_version_once(tmp_path, monkeypatch):
+    store = str(tmp_path / "ds")
+    first = dataset_store.publish(_df(2), "s1", store_dir=store)
+    reads = []
+    real_read = pd.read_parquet
+    monkeypatch.setattr(dataset_store.pd, "read_parquet", lambda *a, **kw: reads.append(a[0]) or real_read(*a, **kw))
+
+    a = dataset_store.load(first)
+    assert dataset_store.load(dataset_store.resolve(store_dir=store)) is a
+    second = dataset_store.publish(_df(5), "s1", store_dir=store)
+    assert len(dataset_store.load(second)) == 5
+    assert reads == [first.path, second.path]
+
+
+def test_side_tables_are_part_of_the_version(tmp_path):
+    store = str(tmp_path / "ds")
+    stock = pd.DataFrame({"ingredient": ["вода"], "stock_qty": [5.0]})
+    first = dataset_store.publish(_df(1), "s1", store_dir=store, tables={"stock": stock, "recipes": None})
+    second = dataset_store.publish(_df(2), "s1", store_dir=store)
+
+    assert [f["name"] for f in first.manifest["files"]] == ["data.parquet", "stock.parquet"]
+    assert first.tables == ["stock"] and second.tables == []
+    assert dataset_store.load_tables(second) == {}
+
+    dataset_store.rollback(store_dir=store)
+    tables = dataset_store.load_tables(dataset_store.resolve(store_dir=store))
+    assert tables["stock"]["stock_qty"].tolist() == [5.0]
+
+    with open(os.path.join(store, first.version, "stock.parquet"), "ab") as f:
+        f.write(b"garbage")
+    assert not dataset_store.verify(first.version, store)
+
+
+def test_load_prepared_builds_once_per_version_and_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, "_PREPARED", None)
+    store = str(tmp_path / "ds")
+    first = dataset_store.publish(_df(2), "s1", store_dir=store)
+    builds = []
+
+    def build(df):
+        builds.append(len(df))
+        return df.assign(extra=1)
+
+    a = dataset_store.load_prepared(first, "k1", build)
+    assert dataset_store.load_prepared(first, "k1", build) is a
+    assert dataset_store.load_prepared(first, "k2", build) is not a
+    second = dataset_store.publish(_df(3), "s1", store_dir=store)
+    dataset_store.load_prepared(second, "k2", build)
+    assert builds == [2, 2, 3]
+    assert "extra" not in dataset_store.load(second).columns
+
+
+def test_version_names_sort_in_publish_order_across_second_boundary(tmp_path, monkeypatch):
+    store = str(tmp_path / "ds")
+    # Last nanosecond of one second, then the very next one
+    stamps = iter([1_767_225_600_999_999_999, 1_767_225_601_000_000_000, 1_767_225_601_000_000_000])
+    monkeypatch.setattr(dataset_store, "_LAST_VERSION_NS", 0)
+    monkeypatch.setattr(dataset_store.time, "time_ns", lambda: next(stamps))
+
+    refs = [dataset_store.publish(_df(i + 1), "s1", store_dir=store) for i in range(3)]
+
+    names = [r.version for r in refs]
+    assert names == sorted(names) and len(set(names)) == 3
+    assert names[1].endswith("-000000000") and names[2].endswith("-000000001")
+    assert [m["version"] for m in dataset_store.list_versions(store)] == names[::-1]
+    assert dataset_store.rollback(store_dir=store) == names[1]
@@ -0,0 +1,42 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from services import export_service
+
+
+def _sales(multi=False):
+    return pd.DataFrame({
+        'Блюдо': ['Суп', 'Салат', 'Чай'],
+        'Количество': [1, 2, 3],
+        'Себестоимость': [10.0, 20.0, np.nan],
+        'Выручка с НДС': [100.0, 50.0, 0.0],
+        'Категория': ['Еда', 'Еда', 'Напитки'],
+        'Макро_Категория': ['КУХНЯ', 'КУХНЯ', 'БАР'],
+        'Точка': ['A', 'B' if multi else 'A', 'A'],
+        'Дата_Отчета': pd.to_datetime(['2026-01-01', '2026-02-01' if multi else '2026-01-02', '2026-01-05']),
+    })
+
+
+def test_report_sorted_with_cost_share_and_blank_nans():
+    data = export_service.build_excel_report(_sales(), "📉 По Фуд-косту")
+    report = pd.read_excel(io.BytesIO(data), sheet_name='Report')
+    assert list(report.columns) == ['Наименование', 'Кол-во', 'Себест.', 'Выручка', 'Кост %', 'Категория', 'Макро_Категория']
+    assert report['Наименование'].tolist() == ['Салат', 'Суп', 'Чай']
+    assert report['Кост %'].tolist() == [0.4, 0.1, 0.0]
+    assert pd.isna(report.loc[2, 'Себест.'])
+
+
+def test_multi_venue_month_columns_and_group_totals():
+    data = export_service.build_excel_report(_sales(multi=True), "💰 По Выручке")
+    sheets = pd.read_excel(io.BytesIO(data), sheet_name=None)
+    assert sheets['Report'].columns[:2].tolist() == ['Точка', 'Месяц']
+    totals = sheets['Charts'].iloc[:, 14:16].dropna()
+    assert totals.values.tolist() == [['Еда', 150], ['Напитки', 0]]
+
+
+def test_group_totals_sorted_desc():
+    keys, sums = export_service.group_totals(np.array(['x', 'y', 'x', None], dtype=object), np.array([1.0, 5.0, 2.0, 1.0]))
+    assert keys[:2] == ['y', 'x'] and pd.isna(keys[2])
+    assert sums.tolist() == [5.0, 3.0, 1.0]
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from utils.grid_paging import page_count, query_page, schema_key
+
+
+def _df():
+    return pd.DataFrame({
+        "ingredient": ["Мука", "Сахар", "Молоко", "Мука ржаная", None],
+        "stock_qty": [5.0, 1.0, 3.0, None, 2.0],
+    }, index=[10, 10, 11, 12, 13])  # duplicate labels on purpose
+
+
+def test_query_page_slices_after_filter_and_sort():
+    page, total = query_page(_df(), "мука", sort_col="stock_qty", ascending=True, page=1, page_size=1)
+    assert total == 2
+    assert page["ingredient"].tolist() == ["Мука"]
+
+    page, _ = query_page(_df(), "мука", sort_col="stock_qty", ascending=True, page=2, page_size=1)
+    # NaN sorts last
+    assert page["ingredient"].tolist() == ["Мука ржаная"]
+
+
+def test_query_page_descending_and_clamps_page():
+    page, total = query_page(_df(), sort_col="stock_qty", ascending=False, page=99, page_size=2)
+    assert total == 5
+    assert len(page) == 1
+    assert pd.isna(page["stock_qty"].iloc[0])
+
+    page, _ = query_page(_df(), sort_col="stock_qty", ascending=False, page=1, page_size=2)
+    assert page["stock_qty"].tolist() == [5.0, 3.0]
+
+
+def test_query_page_without_sort_keeps_order():
+    page, total = query_page(_df(), page=1, page_size=3)
+    assert total == 5
+    assert page["ingredient"].tolist() == ["Мука", "Сахар", "Молоко"]
+
+
+def test_schema_key_ignores_rows():
+    df = _df()
+    assert schema_key(df, {"stock_qty": "%.0f"}) == schema_key(df.head(1), {"stock_qty": "%.0f"})
+    assert schema_key(df) != schema_key(df.astype({"stock_qty": "object"}))
+    assert page_count(0, 50) == 1
+    assert page_count(101, 50) == 3
+
+
+def test_server_side_grid_requires_explicit_key(monkeypatch):
+    import pytest
+    import ui
+
+    big = pd.DataFrame({"ingredient": ["x"] * 1500})
+    with pytest.raises(ValueError):
+        ui.render_aggrid(big, server_side=True)
+
+    # Auto mode without a key stays client-side instead of sharing widget state
+    calls = []
+    monkeypatch.setattr(ui, "_server_side_controls", lambda df, key, page_size: calls.append(key) or df.head(page_size))
+    monkeypatch.setattr(ui, "AgGrid", lambda *a, **kw: calls.append(kw["key"]))
+    ui.render_aggrid(big)
+    ui.render_aggrid(big, key="a")
+    assert calls == [None, "a", "a"]
@@ -0,0 +1,77 @@
+import json
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+
+import health_server
+from services import dataset_store, health_service
+
+
+def _db(tmp_path):
+    path = str(tmp_path / "users.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER)")
+    return path
+
+
+def test_readiness_reports_dataset_and_last_sync(tmp_path, monkeypatch):
+    monkeypatch.setattr(health_service, "check_app", lambda url=None: True)
+    store = str(tmp_path / "ds")
+    ref = dataset_store.publish(pd.DataFrame({"a": [1, 2]}), "s1", store_dir=store)
+    status = tmp_path / "status.json"
+    status.write_text(json.dumps({"runs": [
+        {"job": "sync", "status": "synced", "started_at": "2020-01-01T00:00:00"},
+        {"job": "sync", "status": "error", "started_at": "2099-01-01T00:00:00"},
+        {"job": "report", "status": "sent", "started_at": "2099-01-02T00:00:00"},
+    ]}), encoding="utf-8")
+
+    report = health_service.readiness(store_dir=store, db_path=_db(tmp_path), status_path=str(status))
+
+    assert report["ready"] is True
+    assert report["dataset"]["version"] == ref.version
+    assert report["dataset"]["rows"] == 2
+    assert 0 <= report["dataset"]["age_sec"] < 60
+    # The fresh publish is newer than the last successful scheduler sync
+    assert report["last_sync_at"] == ref.manifest["created_at"]
+    assert report["stale"] is False
+    assert health_service.readiness(store_dir=store, db_path=_db(tmp_path), max_age_sec=1)["stale"] is False
+
+
+def test_not_ready_without_dataset_or_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(health_service, "check_app", lambda url=None: True)
+    report = health_service.readiness(store_dir=str(tmp_path / "ds"), db_path=str(tmp_path / "missing.db"))
+    assert report["db"] is False
+    assert report["dataset"]["version"] is None
+    assert report["ready"] is False
+
+
+def test_check_db_rejects_non_sqlite_file(tmp_path):
+    assert health_service.check_db(_db(tmp_path)) is True
+    bad = tmp_path / "broken.db"
+    bad.write_bytes(b"not a database" * 100)
+    assert health_service.check_db(str(bad)) is False
+
+
+def test_server_routes(monkeypatch):
+    monkeypatch.setattr(health_server, "_cache", health_server.TTLCache(0))
+    monkeypatch.setattr(health_service, "check_app", lambda url=None: True)
+    monkeypatch.setattr(health_service, "readiness", lambda: {"ready": False, "db": False})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), health_server.HealthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(base + "/health") as resp:
+            assert json.load(resp) == {"status": "ok"}
+        try:
+            urllib.request.urlopen(base + "/ready")
+            raise AssertionError("expected 503")
+        except urllib.error.HTTPError as e:
+            assert e.code == 503
+            assert json.load(e)["db"] is False
+    finally:
+        server.shutdown()
+        server.server_close()
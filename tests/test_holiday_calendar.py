@@ -0,0 +1,67 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from services import holiday_calendar
+
+
+@pytest.fixture(autouse=True)
+def extra_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(holiday_calendar, "EXTRA_HOLIDAYS_FILE", str(tmp_path / "extra_holidays.json"))
+    monkeypatch.setattr(holiday_calendar, "_EXTRAS_CACHE", None)
+    monkeypatch.setattr(holiday_calendar, "BRIDGE_BOOST_SHARE", 0.0)
+    holiday_calendar._CALENDAR_CACHE.clear()
+    yield
+    holiday_calendar._CALENDAR_CACHE.clear()
+
+
+def test_calendar_flags_official_and_base_holidays():
+    cal = holiday_calendar.build_holiday_calendar(2026, 2027)
+    assert cal.loc["2026-01-09", "is_holiday"]  # перенос 2026
+    assert cal.loc["2027-03-08", "is_holiday"]  # базовая дата
+    assert not cal.loc["2026-03-11", "is_holiday"]
+    assert len(cal) == 365 * 2
+
+
+def test_bridge_day_between_days_off():
+    cal = holiday_calendar.build_holiday_calendar(2024, 2024, extra_dates={date(2024, 6, 11)})
+    # 2024-06-10 (пн): вс 09.06 выходной, вт 11.06 доп. праздник
+    assert cal.loc["2024-06-10", "is_bridge"]
+    assert cal.loc["2024-06-10", "boost_weight"] == 0.0  # мостики не усиливаются без явной настройки
+    assert not cal.loc["2024-06-11", "is_bridge"]
+
+    opted_in = holiday_calendar.build_holiday_calendar(2024, 2024, extra_dates={date(2024, 6, 11)}, bridge_share=0.5)
+    assert opted_in.loc["2024-06-10", "boost_weight"] == 0.5
+
+
+def test_extra_holidays_persist_and_lookup():
+    holiday_calendar.save_extra_holidays(holiday_calendar.parse_holiday_text("15.07.2026\nмусор\n2026-07-20"))
+    assert holiday_calendar.load_extra_holidays() == {date(2026, 7, 15), date(2026, 7, 20)}
+
+    res = holiday_calendar.lookup(pd.to_datetime(["2026-07-15", "2026-07-16", "2026-07-20"]))
+    assert res["is_holiday"].tolist() == [True, False, True]
+
+
+def test_boost_factors_vectorized():
+    dates = pd.to_datetime(["2026-01-02", "2026-03-11"])
+    factors = holiday_calendar.boost_factors(dates, 20)
+    assert factors.tolist() == pytest.approx([1.2, 1.0])
+
+    factors = holiday_calendar.boost_factors(dates, 20, extra_dates={date(2026, 3, 11)})
+    assert factors.tolist() == pytest.approx([1.2, 1.2])
+
+
+def test_extra_holidays_read_once_until_file_changes(extra_file, monkeypatch):
+    holiday_calendar.save_extra_holidays({date(2026, 7, 15)})
+    reads = []
+    real_load = holiday_calendar.json.load
+    monkeypatch.setattr(holiday_calendar.json, "load", lambda f: reads.append(1) or real_load(f))
+
+    for _ in range(3):
+        assert holiday_calendar.load_extra_holidays() == {date(2026, 7, 15)}
+    assert len(reads) == 1
+
+    holiday_calendar.save_extra_holidays({date(2026, 7, 20)})
+    assert holiday_calendar.load_extra_holidays() == {date(2026, 7, 20)}
+    assert len(reads) == 2
@@ -0,0 +1,151 @@
+from datetime import datetime
+import threading
+
+import pandas as pd
+import pytest
+
+from services import dataset_store
+from use_cases import job_scheduler
+from use_cases.job_scheduler import JobScheduler, WarmDataset, remote_fingerprint
+from utils.file_lock import FileLock
+
+
+class FakeStorage:
+    def __init__(self, tree):
+        self.tree = tree
+
+    def list_directory(self, path, token, limit=1000):
+        return [dict(i) for i in self.tree.get(path, [])]
+
+
+TREE = {
+    "Root": [
+        {"type": "file", "name": "a.xlsx", "path": "Root/a.xlsx", "md5": "1", "size": 10},
+        {"type": "dir", "name": "Bar", "path": "Root/Bar"},
+    ],
+    "Root/Bar": [
+        {"type": "file", "name": "b.csv", "path": "Root/Bar/b.csv", "md5": "2", "size": 5},
+        {"type": "file", "name": "notes.txt", "path": "Root/Bar/notes.txt", "md5": "3", "size": 1},
+    ],
+}
+
+
+def _scheduler(tmp_path, storage, monkeypatch, **kw):
+    return JobScheduler(
+        "ytoken", "tg", "chat", yandex_path="Root",
+        lock_path=str(tmp_path / "scheduler.lock"), status_path=str(tmp_path / "status.json"),
+        dataset=WarmDataset(str(tmp_path / "datasets")), storage=storage, **kw,
+    )
+
+
+def test_remote_fingerprint_tracks_data_files_only():
+    fp = remote_fingerprint(FakeStorage(TREE), "t", "Root")
+    changed = {**TREE, "Root/Bar": [dict(TREE["Root/Bar"][0], md5="9"), TREE["Root/Bar"][1]]}
+    notes_changed = {**TREE, "Root/Bar": [TREE["Root/Bar"][0], dict(TREE["Root/Bar"][1], md5="9")]}
+    assert fp == remote_fingerprint(FakeStorage(notes_changed), "t", "Root")
+    assert fp != remote_fingerprint(FakeStorage(changed), "t", "Root")
+    assert remote_fingerprint(FakeStorage({}), "t", "Root") is None
+
+
+def test_sync_skips_unchanged_remote_and_records_stages(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_sync(token, path):
+        calls.append(path)
+        df = pd.DataFrame({"Дата_Отчета": pd.to_datetime(["2024-01-01"])})
+        dataset_store.publish(df, "s", store_dir=str(tmp_path / "datasets"))
+        return True, "ok"
+
+    monkeypatch.setattr(job_scheduler.data_loader, "download_and_process_yandex", fake_sync)
+    sched = _scheduler(tmp_path, FakeStorage(TREE), monkeypatch)
+
+    first = sched.run_sync()
+    assert first["status"] == "synced"
+    assert set(first["stages"]) == {"list_remote", "download_process", "load_dataset"}
+    assert sched.run_sync()["status"] == "unchanged"
+    assert calls == ["Root"]
+
+    # Fingerprint survives a restart via the status file
+    assert _scheduler(tmp_path, FakeStorage(TREE), monkeypatch).run_sync()["status"] == "unchanged"
+
+
+def test_run_is_skipped_while_lock_is_held(tmp_path, monkeypatch):
+    sched = _scheduler(tmp_path, FakeStorage(TREE), monkeypatch)
+    with FileLock(str(tmp_path / "scheduler.lock")) as held:
+        assert held.acquired
+        assert sched.run_sync()["status"] == "locked"
+
+
+def test_audit_retention_runs_under_scheduler_lock(tmp_path, monkeypatch):
+    archived = []
+
+    class FakeAuditRepo:
+        def archive_old_logs(self):
+            archived.append(1)
+            return 3
+
+    sched = _scheduler(tmp_path, FakeStorage(TREE), monkeypatch, audit_repo=FakeAuditRepo())
+    run = sched.run_retention()
+    assert run["status"] == "archived" and "archive" in run["stages"]
+
+    with FileLock(str(tmp_path / "scheduler.lock")):
+        assert sched.run_retention()["status"] == "locked"
+    assert len(archived) == 1
+
+
+def test_report_uses_warm_dataset_without_mutating_it(tmp_path, monkeypatch):
+    dataset_store.publish(pd.DataFrame({
+        "Дата_Отчета": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+        "Блюдо": ["Суп", "Чай"],
+        "Выручка с НДС": [100.0, 50.0],
+        "Себестоимость": [30.0, 10.0],
+        "Количество": [1.0, 1.0],
+    }), "s", store_dir=str(tmp_path / "datasets"))
+    sent = []
+
+    def fake_send(token, chat, text):
+        sent.append(text)
+        return True, "ok"
+
+    monkeypatch.setattr(job_scheduler.telegram_utils, "send_to_all", fake_send)
+    sched = _scheduler(tmp_path, FakeStorage(TREE), monkeypatch, clock=lambda: datetime(2024, 1, 2, 9, 0))
+
+    run = sched.run_report()
+    assert run["status"] == "sent" and sent
+    df = sched.dataset.get()
+    assert "Month_Year" not in df.columns
+    assert sched.dataset.get() is df  # not re-read while the file is unchanged
+
+
+def test_locked_report_is_retried_instead_of_skipped_for_the_day(tmp_path, monkeypatch):
+    # Started a second before report time, every later reading is past it
+    times = iter([datetime(2024, 1, 1, 8, 59, 59)])
+    sched = _scheduler(
+        tmp_path, FakeStorage(TREE), monkeypatch, sync_interval=0,
+        clock=lambda: next(times, datetime(2024, 1, 1, 9, 0, 5)),
+    )
+    statuses = iter(["locked", "locked", "sent"])
+    reports = []
+
+    def fake_report():
+        reports.append(1)
+        status = next(statuses)
+        if status == "sent":
+            sched.stop()
+        return {"status": status}
+
+    monkeypatch.setattr(sched, "run_report", fake_report)
+    monkeypatch.setattr(sched, "run_retention", lambda: {"status": "nothing"})
+    # Without the retry the report would not run again today: give up after a second
+    threading.Timer(1.0, sched.stop).start()
+    sched.run_forever(tick_sec=0.01)
+
+    assert len(reports) == 3
+
+
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2024, 1, 1, 8, 0), datetime(2024, 1, 1, 9, 0)),
+    (datetime(2024, 1, 1, 9, 0), datetime(2024, 1, 2, 9, 0)),
+])
+def test_next_report_at(tmp_path, monkeypatch, now, expected):
+    assert _scheduler(tmp_path, FakeStorage(TREE), monkeypatch).next_report_at(now) == expected
@@ -0,0 +1,53 @@
+import hashlib
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import auth
+from infrastructure.password_hashing import HashCapacityError, PasswordHashExecutor
+
+
+def test_executor_matches_pbkdf2_and_records_metrics():
+    executor = PasswordHashExecutor(workers=2, max_pending=4)
+    salt = "00" * 16
+    expected = hashlib.pbkdf2_hmac("sha256", b"secret", bytes.fromhex(salt), 1000).hex()
+    assert executor.hash("secret", salt, 1000) == expected
+
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["pending"] == 0
+
+
+def test_executor_rejects_when_full():
+    executor = PasswordHashExecutor(workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hash(*_args):
+        started.set()
+        release.wait(5)
+        return b"x"
+
+    with patch("infrastructure.password_hashing.hashlib.pbkdf2_hmac", side_effect=slow_hash):
+        worker = threading.Thread(target=lambda: executor.hash("a", "00", 1))
+        worker.start()
+        started.wait(5)
+        with pytest.raises(HashCapacityError):
+            executor.hash("b", "00", 1)
+        release.set()
+        worker.join()
+    assert executor.stats()["rejected"] == 1
+
+
+def test_login_with_failures_shed_under_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, "USERS_DB", str(tmp_path / "users.db"))
+    auth.init_auth_db()
+    auth.get_user_repo().record_failed_attempt("shed", "2026-01-01T00:00:00")
+    auth.get_user_repo().record_failed_attempt("shed", "2026-01-01T00:00:01")
+
+    with patch("auth.get_hash_executor") as mock_executor:
+        mock_executor.return_value.is_saturated.return_value = True
+        with pytest.raises(auth.AuthBusyError):
+            auth.authenticate_user("shed", "password")
+        mock_executor.return_value.hash.assert_not_called()
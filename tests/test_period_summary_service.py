@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from services import period_summary_service as pss
+
+
+@pytest.fixture(autouse=True)
+def _clear():
+    pss.clear_cache()
+    yield
+    pss.clear_cache()
+
+
+def _df(rev=(100.0, 300.0)):
+    return pd.DataFrame({
+        'Дата_Отчета': pd.to_datetime(["2024-01-01", "2024-01-31"]),
+        'Блюдо': ["Суп", "Суп"],
+        'Выручка с НДС': list(rev),
+        'Себестоимость': [40.0, 60.0],
+        'Количество': [1.0, 3.0],
+    })
+
+
+def test_summarize_totals():
+    s = pss.summarize(_df())
+    assert (s.revenue, s.cost, s.quantity, s.lines, s.dishes) == (400.0, 100.0, 4.0, 2, 1)
+    assert s.margin == 300.0
+    assert s.food_cost_pct == 25.0
+    assert pss.summarize(pd.DataFrame()) is pss.EMPTY_SUMMARY
+    assert pss.EMPTY_SUMMARY.food_cost_pct == 0.0
+
+
+def test_period_summary_is_cached_per_dataset_version_and_venue():
+    first = pss.period_summary(_df(), dataset_version="v1", venue="A")
+    assert pss.period_summary(_df(), dataset_version="v1", venue="A") is first
+    assert pss.period_summary(_df(rev=(1.0, 1.0)), dataset_version="v1", venue="B").revenue == 2.0
+    # No dataset_version: computed directly
+    assert pss.period_summary(_df(rev=(5.0, 5.0))).revenue == 10.0
+
+
+def test_new_dataset_version_with_same_shape_is_not_served_stale():
+    # A sync that changes values but keeps dates and row count
+    assert pss.period_summary(_df(), dataset_version="v1", venue="A").revenue == 400.0
+    assert pss.period_summary(_df(rev=(1.0, 1.0)), dataset_version="v2", venue="A").revenue == 2.0
+    assert pss.period_summary(_df(), dataset_version="v1", venue="A").revenue == 400.0
@@ -16,7 +16,7 @@ def test_persistence_restart_flow(mock_get_info, mock_upload, mock_download):
     mock_get_info.return_value = {"size": 8192, "modified": "2024-01-01"}
     
     # Normally download_file would write the bytes. We'll mock it to create a DB with 3 users
-    def mock_download_effect(remote, local, token, force):
+    def mock_download_effect(remote, local, token, force, replace=None):
         if os.path.exists(local):
             os.remove(local)
         with sqlite3.connect(local) as conn:
@@ -38,6 +38,7 @@ def test_persistence_restart_flow(mock_get_info, mock_upload, mock_download):
         
     # Reset auth cache
     auth._user_repo = None
+    bootstrap.reset_process_startup()
     
     # 3. Run bootstrap (this runs on every app.py start)
     bootstrap.run_startup()
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from services.price_history_index import DishHistoryIndex
+
+
+def _df():
+    return pd.DataFrame({
+        'Блюдо': ["Сыр", "Мука", "Сыр", "Мука", "Сыр"],
+        'Дата_Отчета': pd.to_datetime(["2024-03-01", "2024-01-01", "2024-01-01", "2024-02-01", "2024-02-01"]),
+        'Unit_Cost': [30.0, 5.0, 10.0, 6.0, 20.0],
+        'Количество': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'Точка': ["A", "A", "A", "B", "B"],
+    })
+
+
+def test_names_sorted_and_per_venue():
+    index = DishHistoryIndex.build(_df())
+    assert index.names() == ("Мука", "Сыр")
+    assert index.names("B") == ("Мука", "Сыр")
+    assert index.names("A") == ("Мука", "Сыр")
+    assert index.names("нет") == ()
+
+
+def test_history_is_date_sorted_slice():
+    index = DishHistoryIndex.build(_df())
+    hist = index.history("Сыр")
+    assert hist['Unit_Cost'].tolist() == [10.0, 20.0, 30.0]
+    assert hist['Дата_Отчета'].is_monotonic_increasing
+    assert index.history("Сыр", venue="B")['Unit_Cost'].tolist() == [20.0]
+    assert index.history("Мука", venue="A")['Количество'].tolist() == [2.0]
+
+
+def test_unknown_dish_and_empty_frame():
+    assert DishHistoryIndex.build(_df().iloc[0:0]).names() == ()
+    assert DishHistoryIndex.build(_df()).history("Соль").empty
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import analytics_service
+from services.price_index_service import PriceIndex
+
+
+def _sales(seed=1):
+    # Unique (dish, date): the row-level version sorts unstably, so ties would be ambiguous
+    rng = np.random.default_rng(seed)
+    parts = []
+    for i in range(40):
+        days = rng.choice(120, size=60, replace=False)
+        parts.append(pd.DataFrame({
+            'Блюдо': f"Товар {i}",
+            'Точка': rng.choice(["A", "B"], len(days)),
+            'Дата_Отчета': pd.Timestamp("2024-01-01") + pd.to_timedelta(days, 'D'),
+            'Unit_Cost': rng.uniform(10, 100, len(days)).round(2),
+            'Количество': rng.integers(1, 10, len(days)).astype(float),
+        }))
+    return pd.concat(parts, ignore_index=True).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def test_inflation_matches_row_level_computation():
+    df = _sales()
+    index = PriceIndex.build(df)
+    target = pd.Timestamp("2024-04-30")
+    cur = df[(df['Дата_Отчета'] >= "2024-04-01") & (df['Дата_Отчета'] <= target)]
+
+    loss, save, det = index.inflation(None, target, cur['Дата_Отчета'].min(), target, base_price='last', drop_infinite=False)
+    exp_loss, exp_save, exp_det = analytics_service.compute_inflation_metrics(df[df['Дата_Отчета'] <= target], cur)
+    assert loss == pytest.approx(exp_loss)
+    assert save == pytest.approx(exp_save)
+    pd.testing.assert_series_equal(det['Эффект (₽)'].sort_index(), exp_det['Эффект (₽)'].sort_index(), check_names=False)
+
+
+def test_inflation_first_price_and_venue_filter():
+    df = pd.DataFrame({
+        'Блюдо': ["Сыр"] * 4,
+        'Точка': ["A", "A", "B", "A"],
+        'Дата_Отчета': pd.to_datetime(["2024-01-01", "2024-01-15", "2024-01-01", "2024-02-10"]),
+        'Unit_Cost': [100.0, 110.0, 50.0, 120.0],
+        'Количество': [1.0, 1.0, 1.0, 2.0],
+    })
+    index = PriceIndex.build(df)
+    loss, save, det = index.inflation("2024-01-01", "2024-02-29", "2024-02-01", "2024-02-29", venue="A")
+    assert det.loc["Сыр", 'Рост %'] == pytest.approx(20.0)
+    assert loss == pytest.approx(40.0)
+    assert save == 0
+
+    prices = index.window_prices("2024-01-01", "2024-01-31")
+    assert prices.loc["Сыр", 'first'] == 100.0  # earliest row in load order
+    assert prices.loc["Сыр", 'last'] == 110.0
+    assert prices.loc["Сыр", 'mean'] == pytest.approx((100 + 110 + 50) / 3)
+
+
+def test_chain_index_links_on_common_basket():
+    df = pd.DataFrame({
+        'Блюдо': ["Сыр", "Мука", "Сыр", "Мука", "Соль", "Сыр"],
+        'Точка': ["A"] * 6,
+        'Дата_Отчета': pd.to_datetime(["2024-01-05", "2024-01-05", "2024-02-05", "2024-02-05", "2024-02-05", "2024-03-05"]),
+        'Unit_Cost': [100.0, 10.0, 110.0, 10.0, 5.0, 121.0],
+        'Количество': [1.0, 10.0, 1.0, 10.0, 3.0, 1.0],
+    })
+    chain = PriceIndex.build(df).chain_index('M')
+    assert list(chain['Период']) == list(pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01"]))
+    # Feb: (110*1 + 10*10) / (100*1 + 10*10); Соль is new and doesn't enter the link
+    assert chain['Звено'].iloc[1] == pytest.approx(210 / 200)
+    # Mar: only Сыр is common
+    assert chain['Звено'].iloc[2] == pytest.approx(121 / 110)
+    assert chain['Индекс'].iloc[2] == pytest.approx(100 * 210 / 200 * 1.1)
+
+
+def test_empty_index():
+    index = PriceIndex.build(_sales().iloc[0:0])
+    loss, save, det = index.inflation(None, "2024-01-01", None, None)
+    assert (loss, save) == (0, 0) and det.empty
+    assert index.chain_index().empty
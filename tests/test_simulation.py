@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import simulation_service
+from services.analytics_service import simulate_forecast
+
+
+@pytest.fixture
+def recipes_db():
+    return {
+        "бургер": [
+            {"ingredient": "булка", "unit": "шт", "qty_per_dish": 1.0},
+            {"ingredient": "говядина", "unit": "кг", "qty_per_dish": 0.15},
+        ],
+        "Чизбургер, 1 пор": [
+            {"ingredient": "булка", "unit": "шт", "qty_per_dish": 1.0},
+            {"ingredient": "сыр", "unit": "кг", "qty_per_dish": 0.02},
+        ],
+        "пустой": [],
+    }
+
+
+@pytest.fixture
+def sales_df():
+    return pd.DataFrame({
+        "Блюдо": ["Бургер", "Чизбургер, 1 пор.", "Бургер", "Кола"],
+        "Количество": [10, 5, 2, 7],
+        "Unit_Cost": [100.0, 80.0, 100.0, 20.0],
+    })
+
+
+def test_build_recipe_matrix_normalizes_and_skips_empty(recipes_db):
+    matrix = simulation_service.build_recipe_matrix(recipes_db)
+    assert matrix.dishes == ("бургер", "чизбургер")
+    assert set(matrix.ingredients) == {"булка", "говядина", "сыр"}
+    assert matrix.indptr.tolist() == [0, 2, 4]
+
+
+def test_dish_cost_impacts_many_scenarios(recipes_db):
+    matrix = simulation_service.build_recipe_matrix(recipes_db)
+    base = simulation_service.delta_vector(matrix, {"булка": 10.0, "сыр": 100.0})
+    impacts = simulation_service.dish_cost_impacts(matrix, np.vstack([base, 2 * base]))
+    assert impacts.shape == (2, 2)
+    assert impacts[0].tolist() == pytest.approx([10.0, 12.0])
+    assert impacts[1].tolist() == pytest.approx([20.0, 24.0])
+
+
+def test_simulate_forecast_matches_normalized_names(recipes_db, sales_df):
+    res = simulate_forecast(recipes_db, {"говядина": 100.0, "сыр": 50.0}, sales_df)
+    assert list(res.columns) == ["Блюдо", "Текущая с/с", "Рост с/с", "Новая с/с", "Количество"]
+    assert res["Блюдо"].tolist() == ["Бургер", "Чизбургер, 1 пор.", "Бургер"]
+    assert res["Рост с/с"].tolist() == pytest.approx([15.0, 1.0, 15.0])
+    assert res["Новая с/с"].tolist() == pytest.approx([115.0, 81.0, 115.0])
+
+
+def test_sweep_price_scale_is_linear(recipes_db, sales_df):
+    matrix = simulation_service.build_recipe_matrix(recipes_db)
+    sweep = simulation_service.sweep_price_scale(matrix, {"булка": 1.0}, sales_df, np.array([0.0, 1.0, 2.0]))
+    assert sweep["Рост с/с итого"].tolist() == pytest.approx([0.0, 17.0, 34.0])
+
+
+@pytest.fixture
+def category_df():
+    return pd.DataFrame({
+        "Категория": ["Еда", "Еда", "Кофе", None],
+        "Выручка с НДС": [1000.0, 500.0, 300.0, 200.0],
+        "Себестоимость": [400.0, 200.0, 60.0, 100.0],
+    })
+
+
+def test_compute_simulation_matches_manual_totals(category_df):
+    from services.analytics_service import compute_simulation
+
+    res = compute_simulation(category_df, ["Еда"], 10, 20, -10)
+    target_rev = 1500 * 1.1 * 0.9
+    target_cost = 600 * 1.2 * 0.9
+    assert res["base_revenue"] == pytest.approx(2000.0)
+    assert res["sim_revenue"] == pytest.approx(500 + target_rev)
+    assert res["sim_margin"] == pytest.approx(500 + target_rev - 160 - target_cost)
+    assert res["old_profitability"] == pytest.approx((2000 - 760) / 2000 * 100)
+
+
+def test_evaluate_scenarios_batched(category_df):
+    totals = simulation_service.precompute_category_totals(category_df)
+    res = simulation_service.evaluate_scenarios(
+        totals, ["Кофе"], np.array([0.0, 10.0]), np.array([0.0, 0.0]), np.array([0.0, 0.0])
+    )
+    assert res["diff_rev"].tolist() == pytest.approx([0.0, 30.0])
+
+
+def test_run_monte_carlo_percentiles_ordered(category_df):
+    totals = simulation_service.precompute_category_totals(category_df)
+    bands = simulation_service.run_monte_carlo(
+        totals, ["Еда"], 5000, price=(5, 2), cost=(8, 4), vol=(0, 5), seed=1
+    )
+    assert list(bands.columns) == ["P5", "P25", "P50", "P75", "P95"]
+    margin = bands.loc["sim_margin"].to_numpy()
+    assert (np.diff(margin) >= 0).all()
+
+
+def test_run_monte_carlo_zero_sigma_is_deterministic(category_df):
+    totals = simulation_service.precompute_category_totals(category_df)
+    bands = simulation_service.run_monte_carlo(totals, ["Еда"], 100, price=(10, 0), cost=(0, 0), vol=(0, 0))
+    assert bands.loc["diff_margin"].tolist() == pytest.approx([150.0] * 5)
+
+
+def test_missing_category_is_a_selectable_label():
+    df = pd.DataFrame({
+        "Категория": ["Еда", None, np.nan],
+        "Выручка с НДС": [100.0, 50.0, 30.0],
+        "Себестоимость": [40.0, 20.0, 10.0],
+    })
+    totals = simulation_service.precompute_category_totals(df)
+    assert sorted(totals.categories) == [simulation_service.UNCATEGORIZED, "Еда"]
+
+    res = simulation_service.evaluate_scenarios(totals, [simulation_service.UNCATEGORIZED], 10.0, 0.0, 0.0)
+    assert float(res["diff_rev"]) == pytest.approx(8.0)
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from infrastructure.repositories.sqlite_connection import get_connection_manager
+from infrastructure.repositories.sqlite_user_repository import SQLiteUserRepository
+
+
+def test_connection_reused_per_thread_in_wal_mode(tmp_path):
+    manager = get_connection_manager(str(tmp_path / "users.db"))
+    conn = manager.connection()
+    assert manager.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(manager.connection()))
+    t.start()
+    t.join()
+    assert other[0] is not conn
+
+
+def test_reconnects_after_file_replaced(tmp_path):
+    db_path = str(tmp_path / "users.db")
+    repo = SQLiteUserRepository(db_path)
+    repo.init_auth_db()
+    repo.create_user("A", "a", "a@a", "1", "salt", "hash", "user", "approved", "2026-01-01")
+
+    fresh = SQLiteUserRepository(str(tmp_path / "fresh.db"))
+    fresh.init_auth_db()
+    get_connection_manager(fresh.db_path).checkpoint()
+
+    get_connection_manager(db_path).close_all()
+    os.replace(fresh.db_path, db_path)
+    assert repo.get_all_users() == []
+
+
+def test_checkpoint_flushes_wal_into_main_file(tmp_path):
+    db_path = str(tmp_path / "users.db")
+    repo = SQLiteUserRepository(db_path)
+    repo.init_auth_db()
+    repo.create_user("A", "a", "a@a", "1", "salt", "hash", "user", "approved", "2026-01-01")
+    get_connection_manager(db_path).checkpoint()
+    assert os.path.getsize(db_path + "-wal") == 0
+
+
+def test_close_all_leaves_other_threads_connections_to_their_owner(tmp_path):
+    manager = get_connection_manager(str(tmp_path / "users.db"))
+    ready, release, result = threading.Event(), threading.Event(), {}
+
+    def worker():
+        conn = manager.connection()
+        with conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.execute("INSERT INTO t VALUES (1)")
+            ready.set()
+            release.wait(5)
+            # Still usable mid-transaction after another thread called close_all()
+            conn.execute("INSERT INTO t VALUES (2)")
+        result["reopened"] = manager.connection() is not conn
+
+    t = threading.Thread(target=worker)
+    t.start()
+    ready.wait(5)
+    manager.close_all()
+    release.set()
+    t.join()
+
+    assert result["reopened"] is True
+    assert manager.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
+
+
+def test_restore_from_swaps_data_in_place_under_open_connections(tmp_path):
+    db_path = str(tmp_path / "users.db")
+    repo = SQLiteUserRepository(db_path)
+    repo.init_auth_db()
+    repo.create_user("A", "a", "a@a", "1", "salt", "hash", "user", "approved", "2026-01-01")
+    inode = os.stat(db_path).st_ino
+    # Stands in for another process still attached to the database
+    other = sqlite3.connect(db_path)
+    other.execute("SELECT COUNT(*) FROM sqlite_master").fetchall()
+
+    downloaded = SQLiteUserRepository(str(tmp_path / "downloaded.db"))
+    downloaded.init_auth_db()
+    for login in ("b", "c"):
+        downloaded.create_user(login, login, f"{login}@a", "1", "salt", "hash", "user", "approved", "2026-01-01")
+    get_connection_manager(downloaded.db_path).checkpoint()
+
+    try:
+        get_connection_manager(db_path).restore_from(downloaded.db_path)
+        assert os.stat(db_path).st_ino == inode
+        assert os.path.exists(db_path + "-wal")
+        assert other.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 2
+        # Writes after the swap land in the restored data, through the same pooled connection
+        repo.create_user("D", "d", "d@a", "1", "salt", "hash", "user", "approved", "2026-01-01")
+        assert sorted(u[2] for u in repo.get_all_users()) == ["b", "c", "d"]
+    finally:
+        other.close()
+
+
+def test_restore_from_rejects_a_broken_download(tmp_path):
+    db_path = str(tmp_path / "users.db")
+    repo = SQLiteUserRepository(db_path)
+    repo.init_auth_db()
+    repo.create_user("A", "a", "a@a", "1", "salt", "hash", "user", "approved", "2026-01-01")
+    broken = tmp_path / "broken.db"
+    broken.write_bytes(b"<html>not a database</html>")
+
+    with pytest.raises(sqlite3.DatabaseError):
+        get_connection_manager(db_path).restore_from(str(broken))
+    assert len(repo.get_all_users()) == 1
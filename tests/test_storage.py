@@ -139,3 +139,81 @@ def test_download_file_stream_yields_bytes(mock_get, storage):
     assert isinstance(data, bytes)
     assert len(data) > 0
     assert data == b"fake byte stream generator output"
+
+def _info_resp(md5):
+    resp = MagicMock()
+    resp.status_code = 200
+    resp.json.return_value = {"type": "file", "size": 15, "modified": "2026-01-01T00:00:00+00:00", "md5": md5}
+    return resp
+
+@patch('requests.get')
+def test_download_if_changed_skips_same_md5(mock_get, storage, tmp_path):
+    link = MagicMock(status_code=200)
+    link.json.return_value = {"href": "http://fake-url.com/download"}
+    body = MagicMock(status_code=200, content=b"fake db content")
+    mock_get.side_effect = [_info_resp("abc"), link, body, _info_resp("abc")]
+
+    local_path = tmp_path / "test.db"
+    assert storage.download_file_if_changed("remote/path", str(local_path), "fake_token") == "downloaded"
+    assert storage.read_sync_meta(str(local_path))["md5"] == "abc"
+
+    local_path.write_bytes(b"local edits")
+    assert storage.download_file_if_changed("remote/path", str(local_path), "fake_token") == "unchanged"
+    assert local_path.read_bytes() == b"local edits"
+    assert mock_get.call_count == 4
+
+@patch('requests.get')
+def test_download_if_changed_replaces_atomically(mock_get, storage, tmp_path):
+    link = MagicMock(status_code=200)
+    link.json.return_value = {"href": "http://fake-url.com/download"}
+    body = MagicMock(status_code=200, content=b"new content")
+    mock_get.side_effect = [_info_resp("new"), link, body]
+
+    local_path = tmp_path / "test.db"
+    local_path.write_bytes(b"old content")
+    storage.write_sync_meta(str(local_path), {"md5": "old"})
+
+    assert storage.download_file_if_changed("remote/path", str(local_path), "fake_token") == "downloaded"
+    assert local_path.read_bytes() == b"new content"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["test.db", "test.db.sync.json"]
+
+def test_write_file_atomic_custom_replace_gets_temp_file_and_cleans_up(tmp_path):
+    from infrastructure.storage.yandex_disk_storage import write_file_atomic
+    target = tmp_path / "users.db"
+    target.write_bytes(b"live")
+    seen = []
+
+    def restore(src, dst):
+        with open(src, "rb") as f:
+            seen.append((f.read(), dst))
+
+    write_file_atomic(str(target), b"downloaded", replace=restore)
+    assert seen == [(b"downloaded", str(target))]
+    assert target.read_bytes() == b"live"
+    assert [p.name for p in tmp_path.iterdir()] == ["users.db"]
+
+@patch('requests.get')
+def test_download_if_changed_keeps_newer_local_writes(mock_get, storage, tmp_path):
+    import os
+    local_path = tmp_path / "users.db"
+    local_path.write_bytes(b"synced")
+    synced_at = 1_767_225_600  # 2026-01-01T00:00:00Z
+    os.utime(local_path, (synced_at, synced_at))
+    storage.write_sync_meta(str(local_path), {"md5": "old"})
+    # Local session/audit writes an hour after the sync, not pushed yet
+    local_path.write_bytes(b"local writes")
+    os.utime(local_path, (synced_at + 3600, synced_at + 3600))
+
+    # Cloud copy changed before those writes: keep the local file
+    mock_get.side_effect = [_info_resp("new")]
+    status = storage.download_file_if_changed("remote/path", str(local_path), "fake_token", keep_local_changes=True)
+    assert status == "local_newer"
+    assert local_path.read_bytes() == b"local writes"
+    assert storage.has_newer_local_changes(str(local_path))
+
+    # Without the flag the old behaviour (replace) stays available
+    link = MagicMock(status_code=200)
+    link.json.return_value = {"href": "http://fake-url.com/download"}
+    mock_get.side_effect = [_info_resp("new"), link, MagicMock(status_code=200, content=b"cloud")]
+    assert storage.download_file_if_changed("remote/path", str(local_path), "fake_token") == "downloaded"
+    assert not storage.has_newer_local_changes(str(local_path))
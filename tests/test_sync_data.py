@@ -34,8 +34,8 @@ def test_sync_from_yandex_uses_storage_adapter(mock_data_loader, mock_storage_cl
     # Inject a fake token to avoid the early exit condition
     sync_data.YANDEX_TOKEN = "fake_token_for_test"
     
-    # Catch parquet writes to prevent modifying actual files
-    with patch('pandas.DataFrame.to_parquet') as mock_to_parquet:
+    # Catch dataset publishing to prevent modifying actual files
+    with patch('sync_data.dataset_store.publish') as mock_publish:
         sync_data.sync_from_yandex()
         
         # 1. Assert we used the Storage Adapter properly
@@ -45,5 +45,5 @@ def test_sync_from_yandex_uses_storage_adapter(mock_data_loader, mock_storage_cl
         # 2. Prevent requests from being used
         assert not hasattr(sync_data, "requests"), "sync_data should not import or use 'requests'"
         
-        # 3. Assert successful completion resulting in disk write
-        mock_to_parquet.assert_called_once()
+        # 3. Assert successful completion resulting in a published dataset
+        mock_publish.assert_called_once()
@@ -0,0 +1,148 @@
+import threading
+
+import pandas as pd
+
+from use_cases.sync_jobs import SyncJob, SyncJobManager
+from utils.file_lock import FileLock
+
+
+def test_single_flight_and_progress(tmp_path):
+    release = threading.Event()
+    calls = []
+
+    def runner(token, path, progress):
+        calls.append(path)
+        progress({"stage": "listed", "files_total": 4, "files_done": 0})
+        progress({"stage": "processing", "files_total": 4, "files_done": 2, "files_parsed": 2, "rows": 100})
+        release.wait(5)
+        return True, "ok"
+
+    manager = SyncJobManager(runner=runner, lock_path=str(tmp_path / "sync.lock"))
+    started, job = manager.start("t", "Root", started_by="admin")
+    again, same = manager.start("t", "Root", started_by="other")
+    assert started and not again and same is job
+
+    for _ in range(100):
+        if job.snapshot()["files_done"] == 2:
+            break
+        threading.Event().wait(0.01)
+    snap = job.snapshot()
+    assert snap["state"] == "running"
+    assert (snap["files_total"], snap["rows"]) == (4, 100)
+    assert snap["eta_sec"] is not None
+
+    release.set()
+    manager.wait(5)
+    snap = job.snapshot()
+    assert snap["state"] == "done" and snap["version"] == 1
+    assert manager.version == 1
+    assert calls == ["Root"]
+
+    # A finished job doesn't block the next one
+    started, job2 = manager.start("t", "Root")
+    manager.wait(5)
+    assert started and job2.snapshot()["version"] == 2
+
+
+def test_failed_sync_keeps_version(tmp_path):
+    manager = SyncJobManager(runner=lambda t, p, progress: (False, "нет доступа"), lock_path=str(tmp_path / "sync.lock"))
+    _, job = manager.start("t", "Root")
+    manager.wait(5)
+    assert job.snapshot()["state"] == "error"
+    assert job.snapshot()["message"] == "нет доступа"
+    assert manager.version == 0
+
+
+def test_sync_refused_while_scheduler_holds_lock(tmp_path):
+    lock_path = str(tmp_path / "sync.lock")
+    manager = SyncJobManager(runner=lambda t, p, progress: (True, "ok"), lock_path=lock_path)
+    with FileLock(lock_path):
+        _, job = manager.start("t", "Root")
+        manager.wait(5)
+    assert job.snapshot()["state"] == "error"
+    assert manager.version == 0
+
+
+def test_eta_from_clock():
+    now = [100.0]
+    job = SyncJob(1, clock=lambda: now[0])
+    job.update({"files_total": 10, "files_done": 2, "unknown": 1})
+    now[0] = 110.0
+    snap = job.snapshot()
+    assert snap["eta_sec"] == 40.0
+    assert "unknown" not in snap
+
+
+def _fake_yandex(monkeypatch, data_loader):
+    """Root folder with one sales file, one recipe card and one turnover report."""
+    class Resp:
+        status_code = 200
+        content = b""
+
+        def __init__(self, items=None):
+            self._items = items
+
+        def json(self):
+            return {"_embedded": {"items": self._items}}
+
+    root = [
+        {"type": "file", "name": "sales.xlsx", "path": "Root/sales.xlsx", "file": "u1"},
+        {"type": "file", "name": "ttk.xlsx", "path": "Root/TechnologicalMaps/ttk.xlsx", "file": "u2"},
+        {"type": "file", "name": "osv.xlsx", "path": "Root/ProductTurnover/osv.xlsx", "file": "u3"},
+    ]
+    monkeypatch.setattr(data_loader.requests, "get", lambda url, **kw: Resp(root if "params" in kw else None))
+    sales = pd.DataFrame({"Дата_Отчета": ["2024-01-01"], "Блюдо": ["Суп"], "Количество": [1.0]})
+    monkeypatch.setattr(data_loader, "process_single_file", lambda *a, **kw: (sales.copy(), None, [], {}))
+    monkeypatch.setattr(data_loader.parsing_service, "parse_ttk", lambda *a: (
+        [{"dish_name": "суп", "ingredients": [{"ingredient": "вода", "unit": "л", "qty_per_dish": 0.3}]}], None))
+    monkeypatch.setattr(data_loader.parsing_service, "parse_turnover", lambda *a: (
+        pd.DataFrame({"ingredient": ["вода"], "stock_qty": [5.0]}),
+        pd.DataFrame({"date": ["2024-01-01"], "ingredient": ["вода"], "qty_out": [1.0]}), None))
+
+
+def test_side_tables_are_swapped_together_with_the_published_version(tmp_path, monkeypatch):
+    from services import data_loader
+
+    monkeypatch.chdir(tmp_path)
+    _fake_yandex(monkeypatch, data_loader)
+    old = (None, {"старое": []}, None, None)
+    monkeypatch.setattr(data_loader, "_SIDE_TABLES", old)
+
+    def failing_publish(*a, **kw):
+        raise OSError("disk full")
+
+    real_publish = data_loader.dataset_store.publish
+    monkeypatch.setattr(data_loader.dataset_store, "publish", failing_publish)
+    ok, _ = data_loader.download_and_process_yandex("t", "Root")
+    # Nothing published: the old recipes, stock and history all stay
+    assert not ok
+    assert data_loader.get_recipes_map() is old[1] and data_loader.get_stock_data() is None
+
+    monkeypatch.setattr(data_loader.dataset_store, "publish", real_publish)
+    ok, _ = data_loader.download_and_process_yandex("t", "Root")
+    assert ok
+    assert list(data_loader.get_recipes_map()) == ["суп"]
+    assert data_loader.get_stock_data()["stock_qty"].tolist() == [5.0]
+    assert len(data_loader.get_turnover_history()) == 1
+
+
+def test_side_tables_follow_the_current_dataset_version(tmp_path, monkeypatch):
+    from services import data_loader, dataset_store
+
+    monkeypatch.chdir(tmp_path)
+    _fake_yandex(monkeypatch, data_loader)
+    monkeypatch.setattr(data_loader, "_SIDE_TABLES", (None, {}, None, None))
+    sales = pd.DataFrame({"Блюдо": ["Суп"], "Количество": [1.0]})
+    first = dataset_store.publish(sales, data_loader.SCHEMA_VERSION)
+    assert data_loader.get_recipes_map() == {} and data_loader.get_stock_data() is None
+
+    ok, _ = data_loader.download_and_process_yandex("t", "Root")
+    assert ok
+    # Another process (fresh memory) reads them from the version on disk
+    monkeypatch.setattr(data_loader, "_SIDE_TABLES", (None, {}, None, None))
+    assert data_loader.get_recipes_map() == {"суп": [{"ingredient": "вода", "unit": "л", "qty_per_dish": 0.3}]}
+    recipes = data_loader.get_recipes_map()
+    assert data_loader.get_recipes_map() is recipes  # read once per version
+
+    dataset_store.rollback(first.version)
+    assert data_loader.get_recipes_map() == {} and data_loader.get_turnover_history() is None
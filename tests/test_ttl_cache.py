@@ -0,0 +1,36 @@
+from utils.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_and_purge():
+    clock = FakeClock()
+    cache = TTLCache(10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+    clock.now = 15
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    cache.set("c", 3)
+    clock.now = 50
+    assert cache.purge_expired() == 2
+    assert len(cache) == 0
+
+
+def test_lru_bound_and_loader():
+    cache = TTLCache(60, maxsize=2)
+    calls = []
+    for key in ("a", "b", "c"):
+        cache.get_or_load(key, lambda k=key: calls.append(k) or k.upper())
+    assert cache.get("a") is None
+    assert cache.get_or_load("c", lambda: "reloaded") == "C"
+    assert cache.get_or_load("missing", lambda: None) is None
+    assert len(cache) == 2
+    assert cache.approx_bytes() > 0
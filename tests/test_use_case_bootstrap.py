@@ -1,8 +1,19 @@
 from unittest.mock import patch
 
+import pytest
+
 from use_cases import bootstrap
 
 
+@pytest.fixture(autouse=True)
+def fresh_process_startup():
+    bootstrap.reset_process_startup()
+    bootstrap.cloud_refresh.stop_background_refresh()
+    yield
+    bootstrap.reset_process_startup()
+    bootstrap.cloud_refresh.stop_background_refresh()
+
+
 @patch("services.category_service.sync_from_yandex")
 @patch("use_cases.bootstrap.auth.sync_users_from_yandex")
 @patch("use_cases.bootstrap.auth.bootstrap_admin")
@@ -58,3 +69,65 @@ def test_run_startup_init_happens_before_autosync(_mock_get_secret, _mock_getenv
     assert "sync_users_auto" in order
     assert order.index("init_session_state") < order.index("sync_categories")
     assert order.index("init_session_state") < order.index("sync_users_auto")
+
+
+@patch("services.category_service.sync_from_yandex")
+@patch("use_cases.bootstrap.auth.sync_users_from_yandex")
+@patch("use_cases.bootstrap.auth.bootstrap_admin")
+@patch("use_cases.bootstrap.auth.init_auth_db")
+@patch("use_cases.bootstrap.auth.get_secret", return_value="fake_token")
+@patch("use_cases.bootstrap.os.getenv", return_value=None)
+def test_process_steps_run_once_per_process(
+    _mock_getenv,
+    _mock_get_secret,
+    mock_init_db,
+    mock_bootstrap_admin,
+    mock_sync_users,
+    _mock_sync_categories,
+) -> None:
+    bootstrap.session_manager.st.session_state.clear()
+
+    first = bootstrap.run_startup()
+    assert "bootstrap_admin" in first.planned_steps
+    assert "start_cloud_refresh" in first.planned_steps
+    assert mock_init_db.call_count == 2
+    mock_sync_users.assert_any_call("fake_token", force=True)
+
+    # Rerun / widget interaction in the same session: no schema, network or admin work
+    mock_sync_users.reset_mock()
+    second = bootstrap.run_startup()
+    assert second.planned_steps == ("init_session_state",)
+    assert mock_init_db.call_count == 2
+    assert mock_bootstrap_admin.call_count == 1
+    mock_sync_users.assert_not_called()
+
+    # A new browser session only repeats session-scoped autosync
+    bootstrap.session_manager.st.session_state.clear()
+    third = bootstrap.run_startup()
+    assert "init_auth_db_pre_sync" not in third.planned_steps
+    mock_sync_users.assert_called_once_with("fake_token")
+
+
+@patch("services.category_service.sync_from_yandex")
+@patch("use_cases.bootstrap.auth.sync_users_from_yandex")
+@patch("use_cases.bootstrap.auth.bootstrap_admin")
+@patch("use_cases.bootstrap.auth.init_auth_db")
+@patch("use_cases.bootstrap.auth.get_secret", return_value="fake_token")
+@patch("use_cases.bootstrap.os.getenv", return_value=None)
+def test_replica_skips_users_db_pull(
+    _mock_getenv,
+    _mock_get_secret,
+    _mock_init_db,
+    _mock_bootstrap_admin,
+    mock_sync_users,
+    _mock_sync_categories,
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(bootstrap.auth, "USERS_DB_PULL", False)
+    bootstrap.session_manager.st.session_state.clear()
+
+    result = bootstrap.run_startup()
+
+    assert "sync_users_from_yandex_force" not in result.planned_steps
+    assert "sync_users_from_yandex" not in result.planned_steps
+    mock_sync_users.assert_not_called()
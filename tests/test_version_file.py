@@ -0,0 +1,29 @@
+from utils.version_file import VersionFile
+
+
+def test_first_check_only_records_state(tmp_path):
+    path = str(tmp_path / "v")
+    assert VersionFile(path).changed() is False
+    VersionFile(path).bump()
+    assert VersionFile(path).changed() is False
+
+
+def test_bump_from_another_instance_is_seen_once(tmp_path):
+    path = str(tmp_path / "v")
+    reader, writer = VersionFile(path), VersionFile(path)
+    reader.changed()
+
+    writer.bump()
+    assert reader.changed() is True
+    assert reader.changed() is False
+
+    writer.bump()
+    writer.bump()
+    assert reader.changed() is True
+
+
+def test_own_bump_is_not_a_change(tmp_path):
+    vf = VersionFile(str(tmp_path / "v"))
+    vf.changed()
+    vf.bump()
+    assert vf.changed() is False
@@ -1034,106 +1034,171 @@ def update_chart_layout(fig):
     )
     return fig
 
-def render_aggrid(df, height=400, pagination=False, formatting=None, fit_columns=False, theme="balham"):
-    if df.empty:
-        st.info("Нет данных для отображения")
-        return
-        
-    gb = GridOptionsBuilder.from_dataframe(df)
-    
-    # Enable filtering and sorting for all columns
-    gb.configure_default_column(filterable=True, sortable=True, resizable=True, wrapText=True, autoHeight=True)
-    
-    import pandas as pd
-    
-    for col in df.columns:
-        is_num = pd.api.types.is_numeric_dtype(df[col])
-        flex_val = 1 if is_num else 3
-        min_w = 80 if is_num else 150
-        max_w = {"maxWidth": 120} if is_num else {}
-        
-        col_kwargs = {"minWidth": min_w, "flex": flex_val, **max_w}
-        
-        if formatting and col in formatting:
-            fmt = formatting[col]
-            if fmt.startswith("%.") and ("f" in fmt or "%%" in fmt):
-                # Basic numeric formatting helper for AgGrid
-                js_fmt = f"val.toLocaleString('ru-RU', {{minimumFractionDigits: {fmt[2]}, maximumFractionDigits: {fmt[2]}}})"
-                if "%%" in fmt:
-                     js_fmt = f"({js_fmt} + ' %')"
-                elif "₽" in fmt:
-                     js_fmt = f"({js_fmt} + ' ₽')"
-                
-                jscode_str = f"""function(params) {{
+# Dark theme to match the rest of the app
+_AGGRID_CSS = {
+    ".ag-theme-alpine, .ag-theme-balham": {
+        "--ag-background-color": "rgba(11, 20, 35, 0.9)",
+        "--ag-foreground-color": "#eaf3ff",
+        "--ag-header-background-color": "rgba(24, 42, 70, 0.92)",
+        "--ag-header-foreground-color": "#f3f8ff",
+        "--ag-odd-row-background-color": "rgba(15, 27, 45, 0.88)",
+        "--ag-row-hover-color": "rgba(46, 77, 120, 0.45)",
+        "--ag-row-border-color": "rgba(160, 205, 255, 0.12)",
+        "--ag-border-color": "rgba(180, 220, 255, 0.25)",
+    },
+    ".ag-root-wrapper": {
+        "border-radius": "14px",
+        "overflow": "hidden",
+        "border": "1px solid rgba(180, 220, 255, 0.25)",
+        "box-shadow": "0 12px 32px rgba(0, 0, 0, 0.45), inset 0 0 14px rgba(255,255,255,0.07)",
+        "background": "linear-gradient(160deg, rgba(26, 44, 74, 0.42), rgba(13, 24, 43, 0.5)) !important",
+    },
+    ".ag-header": {
+        "background": "linear-gradient(180deg, rgba(38, 62, 96, 0.68), rgba(22, 37, 61, 0.7)) !important",
+        "border-bottom": "1px solid rgba(143, 205, 255, 0.28)"
+    },
+    ".ag-header-cell-label": {"color": "#f3f8ff !important", "font-weight": "600"},
+    ".ag-row": {"background-color": "rgba(15, 27, 45, 0.88) !important", "color": "#eaf3ff !important"},
+    ".ag-row-odd": {"background-color": "rgba(15, 27, 45, 0.88) !important", "color": "#eaf3ff !important"},
+    ".ag-row-even": {"background-color": "rgba(12, 23, 39, 0.88) !important", "color": "#eaf3ff !important"},
+    ".ag-row-hover": {"background-color": "rgba(46, 77, 120, 0.45) !important"},
+    ".ag-cell": {"color": "#eaf3ff !important", "background-color": "inherit !important", "border-right": "1px solid rgba(145, 188, 240, 0.12)"},
+    ".ag-center-cols-clipper": {"background-color": "rgba(11, 20, 35, 0.96) !important"},
+    ".ag-center-cols-container": {"background-color": "rgba(11, 20, 35, 0.96) !important"},
+    ".ag-body-viewport": {"background-color": "rgba(11, 20, 35, 0.96) !important"},
+}
+
+_GRID_OPTIONS_CACHE = {}
+_GRID_OPTIONS_CACHE_MAX = 64
+
+
+def _format_js(fmt=None):
+    if fmt is None:
+        js_fmt = "val.toLocaleString('ru-RU', {minimumFractionDigits: 0, maximumFractionDigits: 2})"
+    else:
+        # Basic numeric formatting helper for AgGrid
+        js_fmt = f"val.toLocaleString('ru-RU', {{minimumFractionDigits: {fmt[2]}, maximumFractionDigits: {fmt[2]}}})"
+        if "%%" in fmt:
+            js_fmt = f"({js_fmt} + ' %')"
+        elif "₽" in fmt:
+            js_fmt = f"({js_fmt} + ' ₽')"
+    return JsCode(f"""function(params) {{
                     if (params.value == null || params.value === 'nan' || params.value === 'NaN') return '';
                     const val = Number(params.value);
                     if (isNaN(val)) return params.value;
                     return {js_fmt};
-                }}"""
-                gb.configure_column(col, valueFormatter=JsCode(jscode_str), **col_kwargs)
+                }}""")
+
+
+def _grid_options(df, formatting, pagination, sortable, page_size):
+    """GridOptions depend only on the column schema, so they are built once per schema."""
+    import copy
+    import pandas as pd
+    from utils.grid_paging import schema_key
+
+    key = schema_key(df, formatting, pagination=pagination, sortable=sortable, page_size=page_size)
+    cached = _GRID_OPTIONS_CACHE.get(key)
+    if cached is None:
+        gb = GridOptionsBuilder.from_dataframe(df.head(0))
+        gb.configure_default_column(filterable=sortable, sortable=sortable, resizable=True)
+
+        for col in df.columns:
+            is_num = pd.api.types.is_numeric_dtype(df[col])
+            col_kwargs = {"minWidth": 80 if is_num else 150, "flex": 1 if is_num else 3}
+            if is_num:
+                col_kwargs["maxWidth"] = 120
             else:
-                 gb.configure_column(col, **col_kwargs)
-        elif pd.api.types.is_numeric_dtype(df[col]):
-            jscode_str = """function(params) {
-                if (params.value == null || params.value === 'nan' || params.value === 'NaN') return '';
-                const val = Number(params.value);
-                if (isNaN(val)) return params.value;
-                return val.toLocaleString('ru-RU', {minimumFractionDigits: 0, maximumFractionDigits: 2});
-            }"""
-            gb.configure_column(col, valueFormatter=JsCode(jscode_str), **col_kwargs)
-        else:
-             gb.configure_column(col, **col_kwargs)
-    
-    if pagination:
-        gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=25)
-        
-    gb.configure_grid_options(wrapHeaderText=True, autoHeaderHeight=True)
-    gridOptions = gb.build()
-    
+                # Row auto-height is measured per cell, so only text columns wrap
+                col_kwargs.update(wrapText=True, autoHeight=True)
+
+            fmt = (formatting or {}).get(col)
+            if fmt is not None:
+                if fmt.startswith("%.") and ("f" in fmt or "%%" in fmt):
+                    col_kwargs["valueFormatter"] = _format_js(fmt)
+            elif is_num:
+                col_kwargs["valueFormatter"] = _format_js()
+            gb.configure_column(col, **col_kwargs)
+
+        if pagination:
+            gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=page_size)
+        gb.configure_grid_options(wrapHeaderText=True, autoHeaderHeight=True)
+        cached = gb.build()
+        if len(_GRID_OPTIONS_CACHE) >= _GRID_OPTIONS_CACHE_MAX:
+            _GRID_OPTIONS_CACHE.pop(next(iter(_GRID_OPTIONS_CACHE)))
+        _GRID_OPTIONS_CACHE[key] = cached
+    # AgGrid writes rowData/domLayout into the dict it gets
+    return copy.deepcopy(cached)
+
+
+def _server_side_controls(df, key, page_size):
+    """Search / sort / page widgets; returns the page slice computed on the server."""
+    from utils.grid_paging import page_count, query_page
+
+    c_search, c_sort, c_dir = st.columns([3, 2, 1])
+    filter_text = c_search.text_input("🔎 Поиск", key=f"{key}_q", placeholder="Текст в любой колонке")
+    sort_col = c_sort.selectbox("Сортировка", ["—"] + [str(c) for c in df.columns], key=f"{key}_sort")
+    descending = c_dir.toggle("По убыванию", value=True, key=f"{key}_desc")
+
+    _, total = query_page(df, filter_text, page=1, page_size=1)
+    pages = page_count(total, page_size)
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+
+    c_page, c_info = st.columns([1, 3])
+    page = c_page.number_input("Страница", min_value=1, max_value=pages, step=1, key=page_key)
+    c_info.caption(f"Строк: {total:,} · страница {page} из {pages}".replace(",", " "))
+
+    page_df, _ = query_page(
+        df, filter_text,
+        sort_col=None if sort_col == "—" else sort_col,
+        ascending=not descending,
+        page=page, page_size=page_size,
+    )
+    return page_df
+
+
+def render_aggrid(df, height=400, pagination=False, formatting=None, fit_columns=False, theme="balham",
+                  server_side=None, page_size=None, key=None):
+    """
+    server_side=None switches to server paging automatically for large frames:
+    filtering/sorting run in pandas and only the visible page is sent to the browser.
+    Server paging keeps its widget state under `key`, so it needs an explicit one;
+    a large grid without a key stays client-side.
+    """
+    from utils.grid_paging import DEFAULT_PAGE_SIZE, SERVER_SIDE_THRESHOLD
+
+    if df.empty:
+        st.info("Нет данных для отображения")
+        return
+
+    if server_side and key is None:
+        raise ValueError("render_aggrid(server_side=True) requires an explicit key")
+    if server_side is None:
+        server_side = len(df) > SERVER_SIDE_THRESHOLD and key is not None
+
+    if server_side:
+        page_size = page_size or DEFAULT_PAGE_SIZE
+        df = _server_side_controls(df, key, page_size)
+        # The grid only holds one page: client-side sort/filter would be misleading
+        gridOptions = _grid_options(df, formatting, pagination=False, sortable=False, page_size=page_size)
+    else:
+        page_size = page_size or 25
+        gridOptions = _grid_options(df, formatting, pagination=pagination, sortable=True, page_size=page_size)
+
     # Safe fallback for themes
     valid_themes = ["streamlit", "alpine", "balham", "material"]
     safe_theme = theme if theme in valid_themes else "balham"
 
-    # Using dark theme to match the rest of the app
     AgGrid(
         df,
         gridOptions=gridOptions,
         height=height,
         theme=safe_theme,
-        custom_css={
-            ".ag-theme-alpine, .ag-theme-balham": {
-                "--ag-background-color": "rgba(11, 20, 35, 0.9)",
-                "--ag-foreground-color": "#eaf3ff",
-                "--ag-header-background-color": "rgba(24, 42, 70, 0.92)",
-                "--ag-header-foreground-color": "#f3f8ff",
-                "--ag-odd-row-background-color": "rgba(15, 27, 45, 0.88)",
-                "--ag-row-hover-color": "rgba(46, 77, 120, 0.45)",
-                "--ag-row-border-color": "rgba(160, 205, 255, 0.12)",
-                "--ag-border-color": "rgba(180, 220, 255, 0.25)",
-            },
-            ".ag-root-wrapper": {
-                "border-radius": "14px",
-                "overflow": "hidden",
-                "border": "1px solid rgba(180, 220, 255, 0.25)",
-                "box-shadow": "0 12px 32px rgba(0, 0, 0, 0.45), inset 0 0 14px rgba(255,255,255,0.07)",
-                "background": "linear-gradient(160deg, rgba(26, 44, 74, 0.42), rgba(13, 24, 43, 0.5)) !important",
-            },
-            ".ag-header": {
-                "background": "linear-gradient(180deg, rgba(38, 62, 96, 0.68), rgba(22, 37, 61, 0.7)) !important",
-                "border-bottom": "1px solid rgba(143, 205, 255, 0.28)"
-            },
-            ".ag-header-cell-label": {"color": "#f3f8ff !important", "font-weight": "600"},
-            ".ag-row": {"background-color": "rgba(15, 27, 45, 0.88) !important", "color": "#eaf3ff !important"},
-            ".ag-row-odd": {"background-color": "rgba(15, 27, 45, 0.88) !important", "color": "#eaf3ff !important"},
-            ".ag-row-even": {"background-color": "rgba(12, 23, 39, 0.88) !important", "color": "#eaf3ff !important"},
-            ".ag-row-hover": {"background-color": "rgba(46, 77, 120, 0.45) !important"},
-            ".ag-cell": {"color": "#eaf3ff !important", "background-color": "inherit !important", "border-right": "1px solid rgba(145, 188, 240, 0.12)"},
-            ".ag-center-cols-clipper": {"background-color": "rgba(11, 20, 35, 0.96) !important"},
-            ".ag-center-cols-container": {"background-color": "rgba(11, 20, 35, 0.96) !important"},
-            ".ag-body-viewport": {"background-color": "rgba(11, 20, 35, 0.96) !important"},
-        },
+        custom_css=_AGGRID_CSS,
         update_mode=GridUpdateMode.NO_UPDATE,
-        allow_unsafe_jscode=True
+        allow_unsafe_jscode=True,
+        key=key,
     )
 
 def render_skeleton_kpis(num_cols=3):
@@ -1,13 +1,18 @@
 """Startup orchestration for application bootstrap and autosync."""
 
 from dataclasses import dataclass
-from typing import Literal, Tuple
+from typing import Literal, Optional, Tuple
 
 import os
+import logging
+import threading
 
 import auth
+from use_cases import cloud_refresh
 from utils import session_manager
 
+log = logging.getLogger(__name__)
+
 StartupStatus = Literal["CONTINUE", "STOP"]
 
 
@@ -19,24 +24,61 @@ class StartupResult:
     planned_steps: Tuple[str, ...]
 
 
-def run_startup() -> StartupResult:
-    """Run startup bootstrap and autosync side-effects."""
-    executed_steps = []
+_PROCESS_LOCK = threading.Lock()
+_PROCESS_STEPS: Optional[Tuple[str, ...]] = None
+
+
+def run_process_startup() -> Tuple[str, ...]:
+    """Run process-scoped bootstrap once: schema checks, boot users sync, admin bootstrap.
+
+    Returns the steps executed by this call (empty when already done in this process).
+    Failures are not cached, so the next rerun retries.
+    """
+    global _PROCESS_STEPS
+    if _PROCESS_STEPS is not None:
+        return ()
+    with _PROCESS_LOCK:
+        if _PROCESS_STEPS is not None:
+            return ()
+        executed_steps = []
+
+        auth.init_auth_db()
+        executed_steps.append("init_auth_db_pre_sync")
+
+        # Pull users DB from cloud before auth checks, so registered users survive restarts.
+        # Replicas (USERS_DB_PULL=false) use the shared file the designated process keeps fresh.
+        yd_boot_token = auth.get_secret("YANDEX_TOKEN") or os.getenv("YANDEX_TOKEN")
+        if yd_boot_token and auth.USERS_DB_PULL:
+            auth.sync_users_from_yandex(yd_boot_token, force=True)
+            executed_steps.append("sync_users_from_yandex_force")
+
+        # Ensure schema exists after possible DB overwrite.
+        auth.init_auth_db()
+        executed_steps.append("init_auth_db_post_sync")
+        auth.bootstrap_admin()
+        executed_steps.append("bootstrap_admin")
 
-    auth.init_auth_db()
-    executed_steps.append("init_auth_db_pre_sync")
+        if auth.start_session_sweeper():
+            executed_steps.append("start_session_sweeper")
 
-    # Pull users DB from cloud before auth checks, so registered users survive restarts.
-    yd_boot_token = auth.get_secret("YANDEX_TOKEN") or os.getenv("YANDEX_TOKEN")
-    if yd_boot_token:
-        auth.sync_users_from_yandex(yd_boot_token, force=True)
-        executed_steps.append("sync_users_from_yandex_force")
+        # Keep users/categories fresh across replicas without blocking page loads.
+        if yd_boot_token and cloud_refresh.start_background_refresh(yd_boot_token):
+            executed_steps.append("start_cloud_refresh")
 
-    # Ensure schema exists after possible DB overwrite.
-    auth.init_auth_db()
-    executed_steps.append("init_auth_db_post_sync")
-    auth.bootstrap_admin()
-    executed_steps.append("bootstrap_admin")
+        _PROCESS_STEPS = tuple(executed_steps)
+        return _PROCESS_STEPS
+
+
+def reset_process_startup() -> None:
+    """Forget process-scoped bootstrap (tests, or after users.db was replaced out of band)."""
+    global _PROCESS_STEPS
+    with _PROCESS_LOCK:
+        _PROCESS_STEPS = None
+
+
+def run_session_startup() -> Tuple[str, ...]:
+    """Run session-scoped steps; autosync runs once per browser session (flags in session state)."""
+    executed_steps = []
 
     # Session state flags are needed for autosync idempotency.
     session_manager.init_session_state()
@@ -53,10 +95,16 @@ def run_startup() -> StartupResult:
 
     if not session_manager.st.session_state.users_synced:
         yd_token = auth.get_secret("YANDEX_TOKEN") or os.getenv("YANDEX_TOKEN")
-        if yd_token:
+        if yd_token and auth.USERS_DB_PULL:
             auth.sync_users_from_yandex(yd_token)
             executed_steps.append("sync_users_from_yandex")
         session_manager.st.session_state.users_synced = True
         executed_steps.append("set_users_synced_true")
 
-    return StartupResult(status="CONTINUE", planned_steps=tuple(executed_steps))
+    return tuple(executed_steps)
+
+
+def run_startup() -> StartupResult:
+    """Run startup bootstrap: process-scoped steps once, then session-scoped steps."""
+    executed_steps = run_process_startup() + run_session_startup()
+    return StartupResult(status="CONTINUE", planned_steps=executed_steps)
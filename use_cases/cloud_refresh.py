@@ -0,0 +1,55 @@
+"""Background refresh of cloud-synced config (users.db, categories.json) between replicas."""
+
+from typing import Dict, Optional
+
+import logging
+import os
+
+import auth
+from utils.periodic import PeriodicTask
+
+log = logging.getLogger(__name__)
+
+CLOUD_REFRESH_INTERVAL_SEC = int(os.getenv("CLOUD_REFRESH_INTERVAL_SEC", 300))
+
+_REFRESH_TASK: Optional[PeriodicTask] = None
+
+
+def refresh_once(token: str) -> Dict[str, str]:
+    """One conditional pull of both files. Errors are logged, never raised."""
+    result = {}
+    try:
+        result["users"] = auth.refresh_users_from_yandex(token)
+    except Exception as e:
+        log.warning(f"⚠️ Background users.db refresh failed: {e}")
+        result["users"] = "error"
+    try:
+        from services import category_service
+        result["categories"] = "ok" if category_service.sync_from_yandex(token) else "error"
+    except Exception as e:
+        log.warning(f"⚠️ Background categories refresh failed: {e}")
+        result["categories"] = "error"
+    if "downloaded" in result.values():
+        log.info(f"✅ Cloud refresh applied: {result}")
+    return result
+
+
+def start_background_refresh(token: str, interval: Optional[int] = None) -> bool:
+    """Start the refresh daemon once per process. interval <= 0 disables it."""
+    global _REFRESH_TASK
+    interval = CLOUD_REFRESH_INTERVAL_SEC if interval is None else interval
+    if not token:
+        return False
+    if _REFRESH_TASK is not None and _REFRESH_TASK.running:
+        return False
+    # Startup has just synced, so the first pass waits a full interval.
+    _REFRESH_TASK = PeriodicTask("cloud-refresh", interval, lambda: refresh_once(token))
+    if not _REFRESH_TASK.start():
+        return False
+    log.info(f"✅ Cloud refresh started (every {interval} sec)")
+    return True
+
+
+def stop_background_refresh(timeout: float = 5.0) -> None:
+    if _REFRESH_TASK is not None:
+        _REFRESH_TASK.stop(timeout)
@@ -0,0 +1,264 @@
+"""
+In-process scheduler for the data sync, the daily Telegram report and audit log retention.
+
+Runs as its own container entry point (scheduler.py). Jobs share one file
+lock, so a sync never overlaps a report or a second scheduler instance; the
+parsed dataset stays in memory between runs and is re-read only when a new
+dataset version is published. Each run records per-stage durations in STATUS_FILE.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+import telegram_utils
+from infrastructure.repositories.sqlite_audit_repository import SQLiteAuditRepository
+from infrastructure.storage.yandex_disk_storage import YandexDiskStorage
+from services import data_loader, dataset_store
+from utils.file_lock import FileLock
+from utils.periodic import PeriodicTask
+
+log = logging.getLogger(__name__)
+
+SYNC_INTERVAL_SEC = int(os.getenv("SCHEDULER_SYNC_INTERVAL_SEC", 3600))
+REPORT_TIME = os.getenv("SCHEDULER_REPORT_TIME", "09:00")
+LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE", "scheduler.lock")
+STATUS_FILE = os.getenv("SCHEDULER_STATUS_FILE", "scheduler_status.json")
+YANDEX_PATH = os.getenv("YANDEX_PATH", "RestoAnalytic")
+# Audit archiving runs only here, so replicas sharing users.db never race on it
+AUDIT_RETENTION_INTERVAL_SEC = int(os.getenv("SCHEDULER_AUDIT_RETENTION_INTERVAL_SEC", 6 * 3600))
+USERS_DB = os.getenv("USERS_DB", "users.db")
+STATUS_HISTORY = 50
+DATA_EXTENSIONS = (".xlsx", ".csv")
+
+
+def _secret(key: str) -> Optional[str]:
+    try:
+        import toml
+        value = toml.load(".streamlit/secrets.toml").get(key)
+        if value:
+            return value
+    except Exception:
+        pass
+    return os.getenv(key)
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(time.perf_counter() - start, 3)
+
+
+class WarmDataset:
+    """Live dataset version kept in memory; re-read only when the version changes."""
+
+    def __init__(self, store_dir: Optional[str] = None):
+        self.store_dir = store_dir
+        self._df: Optional[pd.DataFrame] = None
+        self._key = None
+
+    def exists(self) -> bool:
+        ref = dataset_store.resolve(store_dir=self.store_dir)
+        return ref is not None and os.path.exists(ref.path)
+
+    def get(self) -> Optional[pd.DataFrame]:
+        ref = dataset_store.resolve(store_dir=self.store_dir)
+        if ref is None or not os.path.exists(ref.path):
+            return None
+        # mtime only matters for the legacy single-file cache, versions are immutable
+        key = (ref.version, os.stat(ref.path).st_mtime_ns)
+        if self._df is None or key != self._key:
+            self._df = pd.read_parquet(ref.path)
+            self._key = key
+            log.info(f"✅ Dataset {ref.version} loaded into memory: {len(self._df)} rows")
+        return self._df
+
+
+def remote_fingerprint(storage: YandexDiskStorage, token: str, root: str) -> Optional[str]:
+    """Hash of (path, md5/modified, size) of every data file under root; None if root can't be listed."""
+    items = storage.list_directory(root, token)
+    if not items:
+        return None
+    entries: List[str] = []
+    while items:
+        item = items.pop()
+        if item.get("type") == "dir":
+            items.extend(storage.list_directory(item.get("path"), token))
+        elif str(item.get("name", "")).lower().endswith(DATA_EXTENSIONS):
+            entries.append(f"{item.get('path')}|{item.get('md5') or item.get('modified')}|{item.get('size')}")
+    return hashlib.sha1("\n".join(sorted(entries)).encode("utf-8")).hexdigest()
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        yandex_token: Optional[str],
+        tg_token: Optional[str],
+        tg_chat: Optional[str],
+        yandex_path: str = YANDEX_PATH,
+        sync_interval: int = SYNC_INTERVAL_SEC,
+        report_time: str = REPORT_TIME,
+        lock_path: str = LOCK_FILE,
+        status_path: str = STATUS_FILE,
+        dataset: Optional[WarmDataset] = None,
+        storage: Optional[YandexDiskStorage] = None,
+        audit_repo: Optional[SQLiteAuditRepository] = None,
+        retention_interval: int = AUDIT_RETENTION_INTERVAL_SEC,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self.yandex_token = yandex_token
+        self.tg_token = tg_token
+        self.tg_chat = tg_chat
+        self.yandex_path = yandex_path
+        self.sync_interval = sync_interval
+        hour, minute = (int(p) for p in report_time.split(":"))
+        self.report_hour, self.report_minute = hour, minute
+        self.lock_path = lock_path
+        self.status_path = status_path
+        self.dataset = dataset or WarmDataset()
+        self.storage = storage or YandexDiskStorage()
+        self.audit_repo = audit_repo
+        self.retention_interval = retention_interval
+        self._clock = clock
+        self._fingerprint: Optional[str] = self._load_status().get("fingerprint")
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "JobScheduler":
+        return cls(_secret("YANDEX_TOKEN"), _secret("TELEGRAM_TOKEN"), _secret("TELEGRAM_CHAT_ID"))
+
+    # --- status ---
+    def _load_status(self) -> dict:
+        try:
+            with open(self.status_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _record(self, run: dict) -> None:
+        status = self._load_status()
+        runs = status.get("runs", [])
+        runs.append(run)
+        status["runs"] = runs[-STATUS_HISTORY:]
+        status["fingerprint"] = self._fingerprint
+        tmp = f"{self.status_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(status, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, self.status_path)
+
+    def _run(self, job: str, body: Callable[[StageTimer], str]) -> dict:
+        started = self._clock()
+        timer = StageTimer()
+        run = {"job": job, "started_at": started.isoformat(timespec="seconds")}
+        with FileLock(self.lock_path) as lock:
+            if not lock.acquired:
+                log.warning(f"⚠️ {job}: another run holds {self.lock_path}, skipped")
+                run.update(status="locked", stages={})
+                return run
+            t0 = time.perf_counter()
+            try:
+                run["status"] = body(timer)
+            except Exception as e:
+                log.exception(f"❌ {job} failed: {e}")
+                run.update(status="error", error=str(e))
+            run["stages"] = timer.stages
+            run["total_sec"] = round(time.perf_counter() - t0, 3)
+            self._record(run)
+        log.info(f"⏱ {job}: {run['status']} in {run['total_sec']} sec {run['stages']}")
+        return run
+
+    # --- jobs ---
+    def _sync(self, timer: StageTimer) -> str:
+        if not self.yandex_token:
+            return "no_token"
+        with timer.stage("list_remote"):
+            fingerprint = remote_fingerprint(self.storage, self.yandex_token, self.yandex_path)
+        if fingerprint is None:
+            raise RuntimeError("Yandex.Disk listing failed")
+        if fingerprint == self._fingerprint and self.dataset.exists():
+            return "unchanged"
+        with timer.stage("download_process"):
+            ok, msg = data_loader.download_and_process_yandex(self.yandex_token, self.yandex_path)
+        if not ok:
+            raise RuntimeError(msg)
+        self._fingerprint = fingerprint
+        with timer.stage("load_dataset"):
+            self.dataset.get()
+        return "synced"
+
+    def _report(self, timer: StageTimer) -> str:
+        with timer.stage("load_dataset"):
+            df = self.dataset.get()
+        if df is None or df.empty:
+            return "no_data"
+        with timer.stage("format"):
+            report = telegram_utils.format_report(df, self._clock())
+        if not self.tg_token or not self.tg_chat:
+            return "no_token"
+        with timer.stage("send"):
+            ok, msg = telegram_utils.send_to_all(self.tg_token, self.tg_chat, report)
+        if not ok:
+            raise RuntimeError(msg)
+        return "sent"
+
+    def _audit_retention(self, timer: StageTimer) -> str:
+        if self.audit_repo is None:
+            self.audit_repo = SQLiteAuditRepository(USERS_DB)
+        with timer.stage("archive"):
+            archived = self.audit_repo.archive_old_logs()
+        return "archived" if archived else "nothing"
+
+    def run_sync(self) -> dict:
+        return self._run("sync", self._sync)
+
+    def run_report(self) -> dict:
+        return self._run("report", self._report)
+
+    def run_retention(self) -> dict:
+        return self._run("audit_retention", self._audit_retention)
+
+    # --- loop ---
+    def next_report_at(self, now: datetime) -> datetime:
+        at = now.replace(hour=self.report_hour, minute=self.report_minute, second=0, microsecond=0)
+        return at if at > now else at + timedelta(days=1)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_forever(self, tick_sec: float = 30.0) -> None:
+        """Sync now and then every sync_interval; report daily at report_time."""
+        now = self._clock()
+        next_sync = now
+        next_report = self.next_report_at(now)
+        log.info(f"✅ Scheduler started: sync every {self.sync_interval} sec, report at {next_report:%H:%M}")
+        # A run skipped because the lock was busy is retried on the next interval
+        retention = PeriodicTask("audit-retention", self.retention_interval, self.run_retention)
+        retention.start()
+        while not self._stop.is_set():
+            now = self._clock()
+            if self.sync_interval > 0 and now >= next_sync:
+                self.run_sync()
+                next_sync = self._clock() + timedelta(seconds=self.sync_interval)
+            if now >= next_report:
+                # Lock busy (e.g. a sync started from the UI): keep the date and retry on the next tick
+                if self.run_report()["status"] != "locked":
+                    next_report = self.next_report_at(self._clock())
+            wait = (min(next_sync if self.sync_interval > 0 else next_report, next_report) - self._clock()).total_seconds()
+            self._stop.wait(tick_sec if wait <= 0 else max(1.0, min(tick_sec, wait)))
+        retention.stop()
+        log.info("🛑 Scheduler stopped")
@@ -0,0 +1,133 @@
+"""
+Process-wide background sync from Yandex.Disk.
+
+One job at a time (single flight): a second start() while a sync is running
+returns the running job instead of launching another one. The scheduler
+container uses the same file lock, so the two never overlap either.
+Sessions poll snapshot() for progress; the finished sync publishes a new
+dataset version (services/dataset_store) that sessions then reload.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services import data_loader
+from use_cases.job_scheduler import LOCK_FILE
+from utils.file_lock import FileLock
+
+log = logging.getLogger(__name__)
+
+Runner = Callable[..., Tuple[bool, str]]
+
+
+class SyncJob:
+    def __init__(self, job_id: int, started_by: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.job_id = job_id
+        self.started_by = started_by
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {
+            "state": "running", "stage": "listing", "file": "",
+            "files_total": 0, "files_done": 0, "files_downloaded": 0, "files_parsed": 0, "rows": 0,
+            "started_at": clock(), "finished_at": None, "message": "", "version": None,
+            "dropped_stats": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._state["state"] == "running"
+
+    def update(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self._state.update({k: v for k, v in event.items() if k in self._state})
+
+    def finish(self, ok: bool, message: str, version: Optional[int] = None, dropped_stats=None) -> None:
+        with self._lock:
+            self._state.update(
+                state="done" if ok else "error", stage="finished", message=message,
+                version=version, dropped_stats=dropped_stats, finished_at=self._clock(),
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snap = dict(self._state)
+        end = snap["finished_at"] or self._clock()
+        snap["elapsed_sec"] = end - snap["started_at"]
+        done, total = snap["files_done"], snap["files_total"]
+        snap["eta_sec"] = (
+            snap["elapsed_sec"] / done * (total - done)
+            if snap["state"] == "running" and done and total else None
+        )
+        snap["job_id"] = self.job_id
+        return snap
+
+
+class SyncJobManager:
+    def __init__(self, runner: Optional[Runner] = None, lock_path: str = LOCK_FILE):
+        self._runner = runner
+        self.lock_path = lock_path
+        self._lock = threading.Lock()
+        self._job: Optional[SyncJob] = None
+        self._thread: Optional[threading.Thread] = None
+        self._next_id = 1
+        # Number of successful syncs in this process
+        self.version = 0
+
+    def current(self) -> Optional[SyncJob]:
+        return self._job
+
+    def start(self, token: str, yandex_path: str, started_by: Optional[str] = None) -> Tuple[bool, SyncJob]:
+        """(started, job): started=False means a sync was already running and that job is returned."""
+        with self._lock:
+            if self._job is not None and self._job.running:
+                return False, self._job
+            job = SyncJob(self._next_id, started_by)
+            self._next_id += 1
+            self._job = job
+            self._thread = threading.Thread(
+                target=self._run, args=(job, token, yandex_path), name=f"sync-job-{job.job_id}", daemon=True,
+            )
+            self._thread.start()
+        log.info(f"🔄 Sync job #{job.job_id} started by {started_by or 'unknown'}")
+        return True, job
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, job: SyncJob, token: str, yandex_path: str) -> None:
+        try:
+            with FileLock(self.lock_path) as file_lock:
+                if not file_lock.acquired:
+                    job.finish(False, "Синхронизация уже выполняется планировщиком. Попробуйте позже.")
+                    return
+                runner = self._runner or data_loader.download_and_process_yandex
+                ok, msg = runner(token, yandex_path, progress=job.update)
+                if not ok:
+                    job.finish(False, msg)
+                    log.warning(f"⚠️ Sync job #{job.job_id} failed: {msg}")
+                    return
+                with self._lock:
+                    self.version += 1
+                    version = self.version
+                dropped = data_loader.get_last_sync_meta().get("dropped_stats")
+                job.finish(True, msg, version=version, dropped_stats=dropped)
+                log.info(f"✅ Sync job #{job.job_id} done: {msg}")
+        except Exception as e:
+            log.exception(f"❌ Sync job #{job.job_id} crashed: {e}")
+            job.finish(False, f"Ошибка синхронизации: {e}")
+
+
+_manager: Optional[SyncJobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_sync_manager() -> SyncJobManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = SyncJobManager()
+    return _manager
@@ -0,0 +1,43 @@
+import fcntl
+import os
+from typing import Optional
+
+
+class FileLock:
+    """
+    Non-blocking exclusive lock on a file (flock), shared between processes
+    and containers that mount the same directory. Released on close or
+    when the holding process dies.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.acquired = False
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.acquired = True
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.acquired = False
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
@@ -0,0 +1,59 @@
+"""Server-side filter / sort / page for large AgGrid tables (pure pandas, no Streamlit)."""
+
+import math
+from typing import Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+SERVER_SIDE_THRESHOLD = 1000
+DEFAULT_PAGE_SIZE = 50
+
+
+def schema_key(df: pd.DataFrame, formatting: Optional[Dict[str, str]] = None, **options) -> Hashable:
+    """Grid options depend only on column names, dtypes, formatting and flags — not on rows."""
+    columns = tuple((str(c), str(t)) for c, t in df.dtypes.items())
+    fmt = tuple(sorted((formatting or {}).items()))
+    return columns, fmt, tuple(sorted(options.items()))
+
+
+def filter_mask(df: pd.DataFrame, text: str) -> Optional[pd.Series]:
+    """Case-insensitive substring match over text columns; None when there is nothing to filter."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    mask = pd.Series(False, index=df.index)
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s):
+            continue
+        mask |= s.astype(str).str.contains(text, case=False, regex=False, na=False)
+    return mask
+
+
+def page_count(total_rows: int, page_size: int) -> int:
+    return max(1, math.ceil(total_rows / page_size))
+
+
+def query_page(
+    df: pd.DataFrame,
+    filter_text: str = "",
+    sort_col: Optional[str] = None,
+    ascending: bool = True,
+    page: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Returns (page slice, total rows after filtering). Only the sort key is sorted;
+    the frame itself is sliced once, so a page costs O(n log n) on one column.
+    """
+    mask = filter_mask(df, filter_text)
+    view = df[mask.to_numpy()] if mask is not None else df
+    total = len(view)
+    page = min(max(1, int(page)), page_count(total, page_size))
+    start, stop = (page - 1) * page_size, page * page_size
+
+    if sort_col and sort_col in view.columns:
+        key = view[sort_col].reset_index(drop=True)
+        order = key.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        return view.iloc[order[start:stop]], total
+    return view.iloc[start:stop], total
@@ -0,0 +1,47 @@
+import threading
+import logging
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Daemon thread calling `fn` every `interval` seconds (first call after one interval)."""
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], None]):
+        self.name = name
+        self.interval = interval
+        self._fn = fn
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._fn()
+            except Exception as e:
+                log.warning(f"⚠️ Periodic task {self.name} failed: {e}")
+
+    def start(self) -> bool:
+        """Start once; returns False if already running or interval <= 0."""
+        if self.interval <= 0:
+            return False
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join(timeout)
@@ -26,6 +26,21 @@ df_full: pd.DataFrame | None
     default: None  
     owner: analytics  
 
+dish_index: DishHistoryIndex | None  
+    индекс истории цен по товарам, строится при загрузке df_full  
+    default: None  
+    owner: analytics  
+
+price_index: PriceIndex | None  
+    дневной индекс цен (товар x точка) для инфляции, строится при загрузке df_full  
+    default: None  
+    owner: analytics  
+
+loaded_dataset: str | None  
+    версия набора данных (dataset_store), из которой загружен df_full  
+    default: None  
+    owner: analytics  
+
 session_diag_seen: bool  
     флаг, предотвращающий повторный показ диагностики cookie  
     default: False  
@@ -37,6 +52,14 @@ def init_session_state():
         st.session_state.session_diag_seen = False
     if 'df_full' not in st.session_state:
         st.session_state.df_full = None
+    if 'dish_index' not in st.session_state:
+        st.session_state.dish_index = None
+    if 'price_index' not in st.session_state:
+        st.session_state.price_index = None
+    if 'loaded_dataset' not in st.session_state:
+        st.session_state.loaded_dataset = None
+    if 'dataset_key' not in st.session_state:
+        st.session_state.dataset_key = None
     if 'dropped_stats' not in st.session_state:
         st.session_state.dropped_stats = {'count': 0, 'cost': 0.0, 'items': []}
     if 'is_admin' not in st.session_state:
@@ -0,0 +1,80 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache: entries expire after `ttl` seconds,
+    the oldest entry is evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires_at, value = item
+            if self._clock() >= expires_at:
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value or call loader(); None results are not cached."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        """Drop expired entries that were never read again; returns how many were removed."""
+        now = self._clock()
+        with self._lock:
+            expired = [k for k, (expires_at, _) in self._data.items() if now >= expires_at]
+            for k in expired:
+                del self._data[k]
+        return len(expired)
+
+    def approx_bytes(self) -> int:
+        """Shallow memory estimate of keys, values and entry tuples."""
+        with self._lock:
+            items = list(self._data.items())
+        total = sys.getsizeof(self._data)
+        for key, entry in items:
+            value = entry[1]
+            total += sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(value)
+            if isinstance(value, tuple):
+                total += sum(sys.getsizeof(v) for v in value)
+        return total
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+import uuid
+from typing import Optional, Tuple
+
+_UNSEEN = object()
+
+
+class VersionFile:
+    """
+    Cross-process change marker on a shared volume: writers bump() it with an
+    atomic replace, readers poll changed(), which is a single stat and cheap
+    enough to call on every rerun.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._seen = _UNSEEN
+        self._lock = threading.Lock()
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # A replace always brings a new inode, even within one mtime tick
+        return st.st_ino, st.st_mtime_ns
+
+    def bump(self) -> None:
+        tmp = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp, self.path)
+        # Our own bump is not news for this process
+        with self._lock:
+            self._seen = self._stamp()
+
+    def changed(self) -> bool:
+        """True once per change made since the previous call (the first call only records the state)."""
+        stamp = self._stamp()
+        with self._lock:
+            if self._seen is _UNSEEN:
+                self._seen = stamp
+                return False
+            if stamp != self._seen:
+                self._seen = stamp
+                return True
+            return False
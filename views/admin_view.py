@@ -4,12 +4,16 @@ import auth
 import os
 import requests
 from services import category_service
+from services import dataset_store
 from services import parsing_service
 from use_cases import rbac_policy
 from infrastructure.repositories.sqlite_audit_repository import AuditAction
+from infrastructure.password_hashing import get_hash_executor
 
 from datetime import datetime
 
+AUDIT_PAGE_SIZE = 250
+
 def _render_misc_tab():
     st.caption("Позиции с категорией '📦 Прочее'. Здесь можно быстро разнести их по правильным категориям.")
     df_full = st.session_state.get("df_full")
@@ -59,13 +63,47 @@ def _render_misc_tab():
             yd_token = auth.get_secret("YANDEX_TOKEN") or os.getenv("YANDEX_TOKEN")
             if yd_token:
                 category_service.sync_to_yandex(yd_token)
-            df_full = category_service.apply_categories(df_full)
+            # New frame for this session; the shared one stays as other sessions see it
+            df_full = category_service.reapply_categories(df_full, updates.keys())
             st.session_state.df_full = df_full
+            st.session_state.dataset_key = (st.session_state.get("loaded_dataset"), category_service.category_config_version())
+            st.session_state.data_version = st.session_state.get('data_version', 1) + 1
             st.success(f"Обновлено категорий: {len(updates)}")
             st.rerun()
         else:
             st.info("Нет выбранных назначений.")
 
+def _render_dataset_versions():
+    st.write("### 🗂 Версии данных")
+    versions = dataset_store.list_versions()
+    if not versions:
+        st.info("Опубликованных версий пока нет.")
+        return
+    current = dataset_store.current_version()
+    st.dataframe(pd.DataFrame([{
+        "Версия": m["version"],
+        "Текущая": "✅" if m["version"] == current else "",
+        "Создана": m.get("created_at"),
+        "Строк": m.get("rows"),
+        "Схема": m.get("schema_version"),
+    } for m in versions]), use_container_width=True, hide_index=True)
+    others = [m["version"] for m in versions if m["version"] != current]
+    if not others:
+        return
+    target = st.selectbox("Откатить на версию", others, key="dataset_rollback_target")
+    if st.button("↩️ Откатить данные", key="dataset_rollback_btn"):
+        if not rbac_policy.enforce(st.session_state.auth_user, "SYNC_DATA"):
+            st.error("Недостаточно прав.")
+            return
+        try:
+            dataset_store.rollback(target)
+        except ValueError as e:
+            st.error(f"Откат невозможен: {e}")
+            return
+        st.success(f"Текущая версия: {target}")
+        st.rerun()
+
+
 def render_admin_panel(main_loader_slot, default_tab=None):
     if not rbac_policy.enforce(st.session_state.auth_user, "ACCESS_ADMIN_PANEL"):
         st.error("Недостаточно прав для доступа к Панели Администратора.")
@@ -141,7 +179,7 @@ def render_admin_panel(main_loader_slot, default_tab=None):
             if st.button("☁️ Загрузить из Yandex.Disk"):
                 if not rbac_policy.enforce(st.session_state.auth_user, "SYNC_DATA"):
                     st.error("Недостаточно прав.")
-                elif category_service.sync_from_yandex(yd_token):
+                elif category_service.sync_from_yandex(yd_token, force=True):
                     auth.get_audit_repo().log_action(AuditAction.YANDEX_SYNC_DOWNLOAD, "category", actor_user_id=st.session_state.auth_user.id, actor_role=st.session_state.auth_user.role, result="success")
                     st.success("Категории обновлены из облака!")
                     st.rerun()
@@ -233,11 +271,28 @@ def render_admin_panel(main_loader_slot, default_tab=None):
         selected_action = c_filter1.selectbox("Действие:", options=action_options)
         selected_user = c_filter2.text_input("Пользователь (ID/Логин):", placeholder="Пусто = все")
         
-        logs = auth.get_audit_repo().get_logs(
-            limit=250,
+        # Keyset pagination: stack of cursors for the pages seen so far, reset when filters change
+        filter_key = (selected_action, selected_user.strip())
+        if st.session_state.get("audit_filter_key") != filter_key:
+            st.session_state.audit_filter_key = filter_key
+            st.session_state.audit_cursors = [None]
+        cursors = st.session_state.audit_cursors
+
+        logs, next_cursor = auth.get_audit_repo().get_logs_page(
+            limit=AUDIT_PAGE_SIZE,
             action_filter=selected_action if selected_action != "Все" else None,
-            user_filter=selected_user.strip() if selected_user.strip() else None
+            user_filter=selected_user.strip() if selected_user.strip() else None,
+            before=cursors[-1]
         )
+        c_prev, c_page, c_next = st.columns([1, 2, 1])
+        if c_prev.button("⬅️ Новее", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+        c_page.caption(f"Страница {len(cursors)}")
+        if c_next.button("Старее ➡️", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+
         if logs:
             df_audit = pd.DataFrame(
                 logs,
@@ -266,6 +321,16 @@ def render_admin_panel(main_loader_slot, default_tab=None):
         else:
             st.info("Нет отброшенных данных.")
 
+        st.divider()
+        _render_dataset_versions()
+
+        st.divider()
+        st.write("### 🔐 Debug: Хеширование паролей")
+        st.json(get_hash_executor().stats())
+
+        st.write("### 🎫 Debug: Сессии")
+        st.json({**auth.session_metrics(), "audit_queue": auth.get_audit_repo().stats()})
+
         st.divider()
         st.write("### ☁️ Debug: Yandex Disk")
         if st.button("🔍 Показать файлы на Yandex Disk"):
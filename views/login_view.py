@@ -120,3 +120,5 @@ def render_auth_screen():
                         st.success("Регистрация отправлена. Ожидайте одобрения администратора.")
                     except auth.UserAlreadyExistsError:
                         st.error("Логин или почта уже заняты.")
+                    except auth.AuthBusyError as e:
+                        st.error(str(e))
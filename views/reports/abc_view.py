@@ -4,19 +4,24 @@ import ui
 from services import analytics_service
 
 @st.cache_data(show_spinner=False)
-def _cached_abc_prepare(_df_current, selection_signature, data_version):
+def _cached_abc_prepare(_df_current, selection_signature, dataset_key):
     return analytics_service.compute_abc_data(_df_current)
 
-def render_abc(df_current, selection_signature=""):
+@st.cache_data(show_spinner=False)
+def _cached_abc_history(_df_full, selection_signature, dataset_key):
+    return analytics_service.compute_abc_history(_df_full)
+
+def render_abc(df_current, selection_signature="", df_full=None):
     placeholder = st.empty()
     with placeholder.container():
         ui.render_skeleton_chart()
         import time; time.sleep(0.01)
 
-    data_version = st.session_state.get('data_version', 1)
+    # Shared cache: keyed by the immutable dataset key, not the per-session counter
+    dataset_key = st.session_state.get('dataset_key')
     
     if True:
-        abc, aq, am = _cached_abc_prepare(df_current, selection_signature, data_version)
+        abc, aq, am = _cached_abc_prepare(df_current, selection_signature, dataset_key)
     
     placeholder.empty()
     if abc.empty:
@@ -64,3 +69,37 @@ def render_abc(df_current, selection_signature=""):
                 "Маржа/шт": st.column_config.NumberColumn("Маржа/шт", format="%d ₽"),
             }
         )
+
+    if df_full is not None and not df_full.empty:
+        _render_abc_transitions(df_full, selection_signature, dataset_key)
+
+def _render_abc_transitions(df_full, selection_signature, dataset_key):
+    with st.expander("🔄 Переходы между классами (по месяцам)", expanded=False):
+        history = _cached_abc_history(df_full, selection_signature, dataset_key)
+        if history['Месяц'].nunique() < 2:
+            st.info("Нужно минимум два месяца данных.")
+            return
+
+        any_label = "Любой"
+        options = [any_label] + analytics_service.ABC_CLASSES
+        c_f, c_t = st.columns(2)
+        with c_f:
+            from_class = st.selectbox("Из класса", options, index=1, key="abc_tr_from")
+        with c_t:
+            to_class = st.selectbox("В класс", options, index=4, key="abc_tr_to")
+
+        transitions = analytics_service.compute_abc_transitions(history)
+        matrix = transitions.pivot_table(index='Из', columns='В', values='Блюдо', aggfunc='count', fill_value=0)
+        st.dataframe(matrix, use_container_width=True)
+
+        picked = analytics_service.compute_abc_transitions(
+            history,
+            from_class=None if from_class == any_label else from_class,
+            to_class=None if to_class == any_label else to_class
+        )
+        picked = picked.assign(
+            Месяц_с=picked['Месяц_с'].astype(str),
+            Месяц_по=picked['Месяц_по'].astype(str)
+        ).sort_values('Месяц_по', ascending=False)
+        st.caption(f"Найдено переходов: {len(picked)}")
+        st.dataframe(picked, height=400, use_container_width=True, hide_index=True)
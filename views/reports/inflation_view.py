@@ -1,42 +1,39 @@
 import streamlit as st
 import pandas as pd
+import plotly.express as px
 import ui
-from services import analytics_service
+from services import price_index_service
 
 
-@st.cache_data(show_spinner=False)
-def _cached_prep_inflation_data(_df_full, _df_current, target_dt, start_dt, selection_signature, data_version):
-    scope = _df_full[(_df_full['Дата_Отчета'] >= start_dt) & (_df_full['Дата_Отчета'] <= target_dt)]
-    if scope.empty or _df_current.empty:
-        return 0, 0, pd.DataFrame()
-        
-    old_prices = scope.sort_values('Дата_Отчета').groupby('Блюдо')['Unit_Cost'].first()
-    current_prices = _df_current.groupby('Блюдо')['Unit_Cost'].mean()
-    merged = pd.concat([old_prices, current_prices], axis=1, keys=['Old', 'New']).dropna()
-    merged['Diff'] = merged['New'] - merged['Old']
-    merged['Pct'] = (merged['Diff'] / merged['Old']) * 100
-    merged = merged.replace([float('inf'), float('-inf')], pd.NA).dropna(subset=['Pct'])
-    qty_map = _df_current.groupby('Блюдо')['Количество'].sum()
-    merged['Qty'] = qty_map
-    merged['Effect'] = merged['Diff'] * merged['Qty']
-    loss = merged[merged['Effect'] > 0]['Effect'].sum()
-    save = abs(merged[merged['Effect'] < 0]['Effect'].sum())
-    det = merged[merged['Effect'] != 0].copy()
-    det['Товар'] = det.index
-    det['Рост %'] = det['Pct']
-    det['Эффект (₽)'] = det['Effect']
-    return loss, save, det
+def _price_index(df_full):
+    index = st.session_state.get("price_index")
+    if index is None:
+        # Built at load time; this only covers a dataset that bypassed the loader
+        source = st.session_state.get("df_full")
+        index = price_index_service.PriceIndex.build(df_full if source is None else source)
+        st.session_state.price_index = index
+    return index
 
-def render_inflation(df_full, df_current, target_date, inflation_start_date=None, selection_signature=None):
-    data_version = st.session_state.get('data_version', 1)
+
+def render_inflation(df_full, df_current, target_date, inflation_start_date=None, selection_signature=None, venue=None):
     target_dt = pd.to_datetime(target_date)
-    
-    if True:
+    index = _price_index(df_full)
+
+    if df_current.empty:
+        loss, save, det = 0, 0, pd.DataFrame()
+    else:
+        cur_start, cur_end = df_current['Дата_Отчета'].min(), df_current['Дата_Отчета'].max()
         if inflation_start_date is not None:
-            start_dt = pd.to_datetime(inflation_start_date)
-            loss, save, det = _cached_prep_inflation_data(df_full, df_current, target_dt, start_dt, selection_signature, data_version)
+            # Base price: first purchase price since the start of the inflation window
+            loss, save, det = index.inflation(
+                pd.to_datetime(inflation_start_date), target_dt, cur_start, cur_end, venue,
+                base_price='first',
+            )
         else:
-            loss, save, det = analytics_service.compute_inflation_metrics(df_full[df_full['Дата_Отчета'] <= target_dt], df_current)
+            loss, save, det = index.inflation(
+                None, target_dt, cur_start, cur_end, venue,
+                base_price='last', drop_infinite=False,
+            )
     col1, col2, col3 = st.columns(3)
     col1.metric("🔴 Потери", f"-{loss:,.0f} ₽")
     col2.metric("🟢 Экономия", f"+{save:,.0f} ₽")
@@ -51,3 +48,9 @@ def render_inflation(df_full, df_current, target_date, inflation_start_date=None
         with c2:
             st.caption("Топ падения (Экономия)")
             ui.render_aggrid(det[det['Эффект (₽)'] < 0].sort_values('Эффект (₽)', ascending=True).head(20)[['Товар', 'Рост %', 'Эффект (₽)']], height=300, formatting={"Рост %": "%.1f %%", "Эффект (₽)": "%.0f ₽"})
+
+    chain = index.chain_index('M', end=target_dt, venue=venue)
+    if len(chain) > 1:
+        fig = px.line(chain, x='Период', y='Индекс', title="Цепной индекс цен корзины (база = 100)", markers=True)
+        fig.update_traces(hovertemplate='%{x|%m.%Y}<br>Индекс: %{y:.1f}<extra></extra>')
+        st.plotly_chart(ui.update_chart_layout(fig), use_container_width=True)
@@ -2,7 +2,7 @@ import streamlit as st
 import plotly.express as px
 import pandas as pd
 import ui
-from services import analytics_service
+from services import analytics_service, chart_data_service, price_history_index
 import os
 import time
 from contextlib import contextmanager
@@ -18,15 +18,30 @@ def measure(name):
     else:
         yield
 
-def render_dynamics(df_full, df_current):
+def _dish_index(df_full):
+    index = st.session_state.get("dish_index")
+    if index is None:
+        # Built at load time; this only covers a dataset that bypassed the loader
+        source = st.session_state.get("df_full")
+        index = price_history_index.DishHistoryIndex.build(df_full if source is None else source)
+        st.session_state.dish_index = index
+    return index
+
+
+def render_dynamics(df_full, df_current, venue=None):
     c1, c2 = st.columns([2, 1])
     with c1:
         st.write("### Динамика цены закупки")
-        all_items = sorted(df_full['Блюдо'].unique())
+        index = _dish_index(df_full)
+        all_items = index.names(venue)
         if all_items:
             sel = st.selectbox("Товар:", all_items)
-            trend = df_full[df_full['Блюдо'] == sel].sort_values('Дата_Отчета')
-            fig = px.line(trend, x='Дата_Отчета', y='Unit_Cost', title=f"Цена: {sel}", markers=True)
+            history = index.history(sel, venue)
+            trend = chart_data_service.line_series(history, 'Дата_Отчета', 'Unit_Cost', 'Количество')
+            fig = px.line(
+                trend, x='Дата_Отчета', y='Unit_Cost', title=f"Цена: {sel}",
+                markers=chart_data_service.use_markers(len(trend)),
+            )
             st.plotly_chart(ui.update_chart_layout(fig), use_container_width=True)
     with c2:
         st.write("### Топ Поставщиков")
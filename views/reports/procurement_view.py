@@ -1,9 +1,10 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import timedelta
 import ui
 from use_cases.session_models import is_admin
-from services import data_loader, parsing_service
+from services import data_loader, parsing_service, holiday_calendar
 
 @st.fragment
 def render_procurement_v2(df_sales, df_full, period_days):
@@ -33,7 +34,7 @@ def render_procurement_v2(df_sales, df_full, period_days):
                 search_term = st.text_input("Поиск по Товарообороту:", value="рислинг")
                 if search_term:
                     debug_hits = stock_df[stock_df['ingredient'].str.contains(search_term, case=False, na=False)]
-                    ui.render_aggrid(debug_hits[['ingredient', 'unit', 'stock_qty']], height=300)
+                    ui.render_aggrid(debug_hits[['ingredient', 'unit', 'stock_qty']], height=300, key="proc_whitelist_hits")
                 else:
                     ui.render_aggrid(stock_df[['ingredient', 'unit', 'stock_qty']].head(10), height=300)
     
@@ -118,7 +119,15 @@ def render_procurement_v2(df_sales, df_full, period_days):
                 yoy_cap = st.slider("Ограничение YoY коэффициента", 0.5, 2.0, 1.5)
 
             st.caption("Праздники: введите даты в формате `YYYY-MM-DD` или `DD.MM.YYYY`, по одной в строке.")
-            holiday_text = st.text_area("Доп. праздники", value="", height=100)
+            saved_holidays = sorted(holiday_calendar.load_extra_holidays())
+            holiday_text = st.text_area(
+                "Доп. праздники",
+                value="\n".join(d.strftime("%d.%m.%Y") for d in saved_holidays),
+                height=100
+            )
+            if st.button("💾 Сохранить праздники"):
+                saved = holiday_calendar.save_extra_holidays(holiday_calendar.parse_holiday_text(holiday_text))
+                st.success(f"Сохранено дат: {len(saved)}")
     
         if preset_mode != "Пользовательский":
             p = preset_params[preset_mode]
@@ -177,9 +186,6 @@ def render_procurement_v2(df_sales, df_full, period_days):
         df_history = data_loader.get_turnover_history()
         use_history = df_history is not None and not df_history.empty
 
-        profile_trend = {}
-        profile_ly = {}
-
         # Ensure datetime in history
         if use_history and not pd.api.types.is_datetime64_any_dtype(df_history['date']):
             df_history['date'] = pd.to_datetime(df_history['date'])
@@ -191,71 +197,12 @@ def render_procurement_v2(df_sales, df_full, period_days):
         else:
             last_report_date = df_full['Дата_Отчета'].max()
         target_dates = [last_report_date + timedelta(days=i) for i in range(1, target_days + 1)]
-        target_weekdays = [d.weekday() for d in target_dates] # 0=Mon, 6=Sun
-
-        # Holidays (base + manual)
-        # РФ 2026 (производственный календарь): периоды отдыха с переносами
-        # Источник: КонсультантПлюс (праздники и перенос выходных в 2026 г.)
-        def get_ru_holidays(year):
-            holidays = set()
-            if year == 2025:
-                # 29.12.2024–08.01.2025
-                holidays.update(pd.date_range("2024-12-29", "2025-01-08").date)
-                # 22–23.02.2025
-                holidays.update(pd.date_range("2025-02-22", "2025-02-23").date)
-                # 08–09.03.2025
-                holidays.update(pd.date_range("2025-03-08", "2025-03-09").date)
-                # 01–04.05.2025
-                holidays.update(pd.date_range("2025-05-01", "2025-05-04").date)
-                # 08–11.05.2025
-                holidays.update(pd.date_range("2025-05-08", "2025-05-11").date)
-                # 12–15.06.2025
-                holidays.update(pd.date_range("2025-06-12", "2025-06-15").date)
-                # 02–04.11.2025
-                holidays.update(pd.date_range("2025-11-02", "2025-11-04").date)
-                # 31.12.2025
-                holidays.add(pd.to_datetime("2025-12-31").date())
-            if year == 2026:
-                # 31.12.2025–11.01.2026
-                holidays.update(pd.date_range("2025-12-31", "2026-01-11").date)
-                # 21–23.02.2026
-                holidays.update(pd.date_range("2026-02-21", "2026-02-23").date)
-                # 07–09.03.2026
-                holidays.update(pd.date_range("2026-03-07", "2026-03-09").date)
-                # 01–03.05.2026
-                holidays.update(pd.date_range("2026-05-01", "2026-05-03").date)
-                # 09–11.05.2026
-                holidays.update(pd.date_range("2026-05-09", "2026-05-11").date)
-                # 12–14.06.2026
-                holidays.update(pd.date_range("2026-06-12", "2026-06-14").date)
-                # 04.11.2026
-                holidays.add(pd.to_datetime("2026-11-04").date())
-                # 31.12.2026
-                holidays.add(pd.to_datetime("2026-12-31").date())
-            return holidays
-
-        base_holidays = {
-            "01-01", "01-02", "01-03", "01-04", "01-05", "01-06", "01-07", "01-08",
-            "02-23", "03-08", "05-01", "05-09", "06-12", "11-04"
-        }
-        manual_holidays = set()
-        for line in holiday_text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                manual_holidays.add(pd.to_datetime(line, dayfirst=True).date())
-            except Exception:
-                pass
-
-        holiday_dates = set(manual_holidays)
-        for d in target_dates:
-            if d.strftime("%m-%d") in base_holidays:
-                holiday_dates.add(d.date())
-
-        years_in_targets = {d.year for d in target_dates}
-        for y in years_in_targets:
-            holiday_dates.update(get_ru_holidays(y))
+        target_weekdays = np.array([d.weekday() for d in target_dates]) # 0=Mon, 6=Sun
+
+        # Holidays: precomputed calendar (base + RU + saved extra) joined by target date
+        holiday_factors = holiday_calendar.boost_factors(
+            target_dates, holiday_boost, extra_dates=holiday_calendar.parse_holiday_text(holiday_text)
+        )
 
         # Prepare Validation Set (Strict Whitelist from Stock/Turnover)
         valid_stock_items = set()
@@ -330,17 +277,12 @@ def render_procurement_v2(df_sales, df_full, period_days):
             return df_combined[["ingredient", "date", "qty"]].fillna(0)
 
         def get_weekday_profile_from_daily(df_daily):
+            # ingredient x weekday (0..6) matrix of median daily qty
             if df_daily.empty:
-                return {}
-            df_daily = df_daily.copy()
-            df_daily['weekday'] = df_daily['date'].dt.weekday
-            grp = df_daily.groupby(['ingredient', 'weekday'])['qty'].median()
-            profile = {}
-            for (ing, wd), qty in grp.items():
-                if ing not in profile:
-                    profile[ing] = {w: 0.0 for w in range(7)}
-                profile[ing][wd] = qty
-            return profile
+                return pd.DataFrame(columns=range(7), dtype=float)
+            weekday = pd.to_datetime(df_daily['date']).dt.weekday
+            grp = df_daily.groupby([df_daily['ingredient'], weekday.rename('weekday')])['qty'].median()
+            return grp.unstack(fill_value=0.0).reindex(columns=range(7), fill_value=0.0).astype(float)
 
         # Trend window
         trend_start = last_report_date - timedelta(days=trend_window_days)
@@ -384,7 +326,6 @@ def render_procurement_v2(df_sales, df_full, period_days):
         sigma_map = compute_sigma_map()
         
         # 4. Calculate Demand for Target Dates
-        final_forecast = []
 
         # Normalize weights
         wt = max(0.0, trend_weight)
@@ -394,64 +335,32 @@ def render_procurement_v2(df_sales, df_full, period_days):
         else:
             wt, wl = wt / (wt + wl), wl / (wt + wl)
         
-        # Get all ingredients
-        all_ings = set(profile_trend.keys()) | set(profile_ly.keys())
-        
-        for ing in all_ings:
-            p_trend = profile_trend.get(ing, {w: 0.0 for w in range(7)})
-            p_ly = profile_ly.get(ing, {w: 0.0 for w in range(7)})
-            avg_current = avg_current_map.get(ing, 0.0)
-            
-            total_need = 0.0
-            sum_trend = 0.0
-            sum_ly = 0.0
-            sum_holiday_factor = 0.0
-            
-            for dt, wd in zip(target_dates, target_weekdays):
-                # Forecast for this specific day = (Trend[wd] + LY[wd]) / 2
-                val_t = p_trend[wd]
-                val_l = p_ly[wd]
-
-                # Weekday YoY adjustment: compare this year's recent weekday vs last year's weekday
-                if use_weekday_yoy and val_l > 0:
-                    ratio = val_t / val_l
-                    if ratio < 1.0 / yoy_cap:
-                        ratio = 1.0 / yoy_cap
-                    elif ratio > yoy_cap:
-                        ratio = yoy_cap
-                    val_l = val_l * ratio
-                
-                sum_trend += val_t
-                sum_ly += val_l
-                
-                day_val = (val_t * wt) + (val_l * wl)
-                if day_val == 0.0 and avg_current > 0:
-                    day_val = avg_current
-
-                holiday_factor = 1.0
-                if dt.date() in holiday_dates:
-                    holiday_factor = (1 + holiday_boost / 100.0)
-                    day_val = day_val * holiday_factor
-                sum_holiday_factor += holiday_factor
-                
-                total_need += day_val
-                
-            # Avg metrics for display
-            avg_daily_trend = sum_trend / target_days
-            avg_daily_ly = sum_ly / target_days
-            daily_forecast = total_need / target_days
-            avg_holiday_factor = sum_holiday_factor / target_days if target_days > 0 else 1.0
-            
-            final_forecast.append({
-                "ingredient": ing,
-                "daily_forecast": daily_forecast, # This is technically "Avg Need for Target Period"
-                "avg_trend": avg_daily_trend,
-                "avg_ly": avg_daily_ly,
-                "holiday_factor": avg_holiday_factor,
-                "wt": wt,
-                "wl": wl,
-            })
-            
+        # Get all ingredients: vectorized over (ingredient x target day)
+        all_ings = profile_trend.index.union(profile_ly.index)
+        trend_days = profile_trend.reindex(all_ings, fill_value=0.0).to_numpy()[:, target_weekdays]
+        ly_days = profile_ly.reindex(all_ings, fill_value=0.0).to_numpy()[:, target_weekdays]
+        avg_current = np.array([avg_current_map.get(ing, 0.0) for ing in all_ings], dtype=float)
+
+        # Weekday YoY adjustment: compare this year's recent weekday vs last year's weekday
+        if use_weekday_yoy:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.clip(trend_days / ly_days, 1.0 / yoy_cap, yoy_cap)
+            ly_days = np.where(ly_days > 0, ly_days * ratio, ly_days)
+
+        day_vals = (trend_days * wt) + (ly_days * wl)
+        day_vals = np.where((day_vals == 0.0) & (avg_current[:, None] > 0), avg_current[:, None], day_vals)
+        day_vals = day_vals * holiday_factors[None, :]
+
+        final_forecast = {
+            "ingredient": list(all_ings),
+            "daily_forecast": day_vals.sum(axis=1) / target_days, # This is technically "Avg Need for Target Period"
+            "avg_trend": trend_days.sum(axis=1) / target_days,
+            "avg_ly": ly_days.sum(axis=1) / target_days,
+            "holiday_factor": float(holiday_factors.mean()) if target_days > 0 else 1.0,
+            "wt": wt,
+            "wl": wl,
+        }
+
         df_forecast = pd.DataFrame(final_forecast)
         if df_forecast.empty:
             df_forecast = pd.DataFrame(columns=["ingredient", "daily_forecast", "avg_trend", "avg_ly"])
@@ -596,5 +505,6 @@ def render_procurement_v2(df_sales, df_full, period_days):
         df_display,
         height=600,
         pagination=True,
-        formatting=format_dict
+        formatting=format_dict,
+        key="proc_plan_grid",
     )
@@ -1,17 +1,28 @@
+import numpy as np
+import plotly.express as px
 import streamlit as st
 import ui
-from services import analytics_service, data_loader
+from services import analytics_service, data_loader, simulation_service
+
+@st.cache_data(show_spinner=False)
+def _cached_category_totals(_df_current, selection_signature, dataset_key):
+    return simulation_service.precompute_category_totals(_df_current)
 
 @st.fragment
-def render_simulator(df_current, df_full):
+def render_simulator(df_current, df_full, selection_signature=""):
     st.header("🧪 Симулятор роста цен (Ингредиенты)")
     st.info("Выберите ингредиенты, укажите рост цены (в рублях за единицу), и увидите, как это повлияет на себестоимость блюд.")
     
     recipes_db = data_loader.get_recipes_map()
     if not recipes_db:
         st.warning("⚠️ Нет данных о рецептах (ТТК). Загрузите файлы TechnologicalMaps.")
-        return
+    else:
+        _render_ingredient_simulator(df_current, recipes_db)
+
+    st.divider()
+    _render_risk_bands(df_current, selection_signature)
 
+def _render_ingredient_simulator(df_current, recipes_db):
     all_ingredients = analytics_service.get_unique_ingredients(recipes_db)
     
     # UI: Ingredient Selection
@@ -68,9 +79,70 @@ def render_simulator(df_current, df_full):
                             "Рост (+)": "%.2f ₽",
                             "Новая с/с": "%.2f ₽",
                             "Продажи (шт)": "%.0f"
-                        }
+                        },
+                        key="sim_results_grid",
                     )
+
+            st.divider()
+            st.subheader("📈 Диапазон цен")
+            scale_min, scale_max = st.slider(
+                "Множитель к указанному росту цен:", 0.0, 5.0, (0.0, 2.0), step=0.1, key="sim_sweep_range"
+            )
+            matrix = simulation_service.get_recipe_matrix(recipes_db)
+            sweep = simulation_service.sweep_price_scale(
+                matrix, ingredient_deltas, df_current, np.linspace(scale_min, scale_max, 41)
+            )
+            fig_sweep = px.line(
+                sweep, x='Множитель', y='Рост с/с итого',
+                title='Рост себестоимости на текущий объем продаж'
+            )
+            st.plotly_chart(ui.update_chart_layout(fig_sweep), use_container_width=True)
         else:
             st.info("Укажите рост цены хотя бы для одного ингредиента.")
     else:
         st.markdown("Use the multiselect above to add ingredients.")
+
+
+def _render_risk_bands(df_current, selection_signature):
+    st.header("🎲 Риск-сценарии (Монте-Карло)")
+    if df_current.empty or 'Категория' not in df_current.columns:
+        st.info("Нет данных для сценариев.")
+        return
+
+    # Shared cache: keyed by the immutable dataset key, not the per-session counter
+    totals = _cached_category_totals(df_current, selection_signature, st.session_state.get('dataset_key'))
+
+    cats = st.multiselect("Категории:", options=sorted(totals.categories), key="mc_cats")
+    if not cats:
+        st.info("Выберите категории, к которым применяются изменения.")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        price_mu = st.number_input("Цена: ожидание (%)", -50.0, 100.0, 5.0, step=1.0, key="mc_price_mu")
+        price_sigma = st.number_input("Цена: разброс σ (%)", 0.0, 50.0, 2.0, step=0.5, key="mc_price_sigma")
+    with c2:
+        cost_mu = st.number_input("Себестоимость: ожидание (%)", -50.0, 100.0, 8.0, step=1.0, key="mc_cost_mu")
+        cost_sigma = st.number_input("Себестоимость: разброс σ (%)", 0.0, 50.0, 4.0, step=0.5, key="mc_cost_sigma")
+    with c3:
+        vol_mu = st.number_input("Объем: ожидание (%)", -50.0, 100.0, -3.0, step=1.0, key="mc_vol_mu")
+        vol_sigma = st.number_input("Объем: разброс σ (%)", 0.0, 50.0, 5.0, step=0.5, key="mc_vol_sigma")
+    n_samples = st.select_slider("Сценариев:", options=[1000, 5000, 10000, 50000], value=10000, key="mc_n")
+
+    bands = simulation_service.run_monte_carlo(
+        totals, cats, n_samples,
+        price=(price_mu, price_sigma), cost=(cost_mu, cost_sigma), vol=(vol_mu, vol_sigma),
+        seed=42
+    )
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Маржа P5 (₽)", f"{bands.loc['sim_margin', 'P5']:,.0f}")
+    m2.metric("Маржа P50 (₽)", f"{bands.loc['sim_margin', 'P50']:,.0f}",
+              f"{bands.loc['diff_margin', 'P50']:,.0f}")
+    m3.metric("Маржа P95 (₽)", f"{bands.loc['sim_margin', 'P95']:,.0f}")
+
+    view = bands.rename(index={
+        'sim_margin': 'Маржа (₽)',
+        'diff_margin': 'Изменение маржи (₽)',
+        'new_profitability': 'Рентабельность (%)',
+    })
+    st.dataframe(view.round(1), use_container_width=True)
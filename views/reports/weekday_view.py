@@ -2,7 +2,7 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import ui
-from services import analytics_service
+from services import analytics_service, chart_data_service
 
 def render_weekdays(df_current, df_prev, current_label="", prev_label=""):
     daily_cur, weekday_cur = analytics_service.compute_weekday_stats(df_current)
@@ -43,28 +43,43 @@ def render_weekdays(df_current, df_prev, current_label="", prev_label=""):
     with c2:
         daily_cur = daily_cur.sort_values('Дата_Отчета').copy()
         daily_cur['ИндексДня'] = range(1, len(daily_cur) + 1)
+        # Holidays are drawn from the full series; only the line is thinned
+        line_cur = chart_data_service.downsample_line(daily_cur, 'ИндексДня', 'Выручка с НДС')
         fig_daily = go.Figure()
         fig_daily.add_trace(go.Scatter(
-            x=daily_cur['ИндексДня'],
-            y=daily_cur['Выручка с НДС'],
-            mode='lines+markers',
+            x=line_cur['ИндексДня'],
+            y=line_cur['Выручка с НДС'],
+            mode='lines+markers' if chart_data_service.use_markers(len(line_cur)) else 'lines',
             name=current_label or 'Текущий период',
-            text=daily_cur['ДеньРус'],
-            customdata=daily_cur['Дата_Подпись'],
+            text=line_cur['ДеньРус'],
+            customdata=line_cur['Дата_Подпись'],
             hovertemplate='День #%{x}<br>%{customdata} (%{text})<br>Выручка: %{y:,.0f} ₽<extra></extra>'
         ))
 
+        holidays_cur = daily_cur[daily_cur['Праздник']]
+        if not holidays_cur.empty:
+            fig_daily.add_trace(go.Scatter(
+                x=holidays_cur['ИндексДня'],
+                y=holidays_cur['Выручка с НДС'],
+                mode='markers',
+                name='Праздники',
+                marker=dict(symbol='star', size=12),
+                customdata=holidays_cur['Дата_Подпись'],
+                hovertemplate='🎉 %{customdata}<br>Выручка: %{y:,.0f} ₽<extra></extra>'
+            ))
+
         if not df_prev.empty:
             daily_prev, _ = analytics_service.compute_weekday_stats(df_prev)
             daily_prev = daily_prev.sort_values('Дата_Отчета').copy()
             daily_prev['ИндексДня'] = range(1, len(daily_prev) + 1)
+            line_prev = chart_data_service.downsample_line(daily_prev, 'ИндексДня', 'Выручка с НДС')
             fig_daily.add_trace(go.Scatter(
-                x=daily_prev['ИндексДня'],
-                y=daily_prev['Выручка с НДС'],
-                mode='lines+markers',
+                x=line_prev['ИндексДня'],
+                y=line_prev['Выручка с НДС'],
+                mode='lines+markers' if chart_data_service.use_markers(len(line_prev)) else 'lines',
                 name=prev_label or 'Период сравнения',
-                text=daily_prev['ДеньРус'],
-                customdata=daily_prev['Дата_Подпись'],
+                text=line_prev['ДеньРус'],
+                customdata=line_prev['Дата_Подпись'],
                 hovertemplate='День #%{x}<br>%{customdata} (%{text})<br>Выручка: %{y:,.0f} ₽<extra></extra>'
             ))
 
@@ -0,0 +1,78 @@
+import time
+
+import streamlit as st
+from services import dataset_store
+from use_cases import rbac_policy, sync_jobs
+
+# How long the result of the last sync stays visible in the sidebar
+RESULT_VISIBLE_SEC = 120
+
+
+def apply_completed_sync():
+    """
+    Reload when the live dataset version changed (a sync in this process or the
+    scheduler, or a rollback); runs for every session on its next rerun.
+    """
+    loaded = st.session_state.get("loaded_dataset")
+    if st.session_state.get("df_full") is None or loaded is None:
+        return
+    if dataset_store.current_version() == loaded:
+        return
+    job = sync_jobs.get_sync_manager().current()
+    dropped = job.snapshot().get("dropped_stats") if job is not None else None
+    if dropped:
+        st.session_state.dropped_stats = dropped
+    st.session_state.data_version = st.session_state.get('data_version', 1) + 1
+    st.session_state.df_full = None
+    st.session_state.dish_index = None
+    st.session_state.price_index = None
+
+
+def _progress_text(snap):
+    total, done = snap["files_total"], snap["files_done"]
+    if not total:
+        return "Получаю список файлов..."
+    text = f"Файлы: {done}/{total} · скачано {snap['files_downloaded']} · распознано {snap['files_parsed']} · строк {snap['rows']:,}".replace(",", " ")
+    if snap["eta_sec"] is not None:
+        text += f" · осталось ~{int(snap['eta_sec'])} с"
+    return text
+
+
+@st.fragment(run_every=1.0)
+def _render_progress():
+    job = sync_jobs.get_sync_manager().current()
+    if job is None:
+        return
+    snap = job.snapshot()
+    if snap["state"] != "running":
+        # Full rerun: apply_completed_sync picks up the new version and the fragment stops polling
+        st.rerun(scope="app")
+    total = snap["files_total"]
+    st.progress(snap["files_done"] / total if total else 0.0, text=_progress_text(snap))
+
+
+def render_sync_controls(yd_token, yandex_path):
+    manager = sync_jobs.get_sync_manager()
+    job = manager.current()
+    running = job is not None and job.running
+
+    if st.button("🔄 Скачать и Обновить", type="primary", use_container_width=True, disabled=running):
+        if not rbac_policy.enforce(st.session_state.auth_user, "SYNC_DATA"):
+            st.error("Недостаточно прав для выполнения синхронизации.")
+        else:
+            user = st.session_state.auth_user
+            started, job = manager.start(yd_token, yandex_path, started_by=getattr(user, "login", None))
+            if not started:
+                st.info("Синхронизация уже запущена другим пользователем — показываю её прогресс.")
+            running = True
+
+    if running:
+        _render_progress()
+    elif job is not None:
+        snap = job.snapshot()
+        if snap["finished_at"] and time.time() - snap["finished_at"] < RESULT_VISIBLE_SEC:
+            if snap["state"] == "done":
+                st.success(f"Данные обновлены! {snap['message']}")
+            else:
+                st.error(snap["message"])
+